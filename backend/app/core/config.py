@@ -16,17 +16,130 @@ ANNOTATED_VIDEOS_DIR = OUTPUT_DIR / "annotated_vids"
 FRAMES_FOLDER = OUTPUT_DIR / "temp_frames"
 PROCESSED_VIDEOS_FILE = OUTPUT_DIR / "processed_videos.json"
 FINAL_METRICS_FILE = OUTPUT_DIR / "pothole_events_metrics.json"
+CHECKPOINT_DIR = OUTPUT_DIR / "checkpoints"
 
 # Weights
 WEIGHTS_DIR = BASE_DIR / "weights"
 CONGESTION_MODEL_PATH = WEIGHTS_DIR / "best_Congestion.pt"
 POTHOLE_MODEL_PATH = WEIGHTS_DIR / "best_Pothole.pt"
 
+# Inference backend: "torch" runs the .pt weights directly; "onnx" and "openvino"
+# export them once (cached next to the .pt files) and run the exported model
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# Model input size (long side) for exports, warm-up and inference; lower it to
+# trade accuracy for speed
+INFERENCE_IMGSZ = int(os.getenv("INFERENCE_IMGSZ", "640"))
+# Letterbox each batch once and feed the same input to both detectors instead
+# of letting each model preprocess the frames itself. Off by default: check
+# that its boxes match per-model preprocessing on your weights first
+# (tests/test_shared_preprocess.py)
+INFERENCE_SHARED_PREPROCESS = os.getenv("INFERENCE_SHARED_PREPROCESS", "false").lower() == "true"
+# Precision of the onnx backend: "fp32", "int8-dynamic" (INT8 weights, no
+# calibration) or "int8-static" (INT8 weights and activations, calibrated on
+# frames sampled from QUANTIZATION_CALIBRATION_DIR). Quantized models are cached
+# next to the export; check accuracy with `python -m benchmarks.quantization`
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32")
+QUANTIZATION_CALIBRATION_DIR = Path(os.getenv("QUANTIZATION_CALIBRATION_DIR", str(VIDEO_DIR)))
+QUANTIZATION_CALIBRATION_FRAMES = 200
+
 # Pipeline Settings
 FRAMES_PER_SECOND = 4
 CONGESTION_CONFIDENCE = 0.40
 POTHOLE_CONFIDENCE = 0.35
 SAVE_ANNOTATED_VIDEOS = True
+# Load and warm up both models during API startup instead of on first use
+WARMUP_MODELS_ON_STARTUP = os.getenv("WARMUP_MODELS_ON_STARTUP", "false").lower() == "true"
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "8"))  # Frames per model call
+PIPELINE_QUEUE_SIZE = 4  # Batches buffered between decode, inference and post-processing
+# Worker processes for /process/all; each loads its own models and gets an equal
+# share of the cores for torch
+BATCH_PIPELINE_WORKERS = int(os.getenv("BATCH_PIPELINE_WORKERS", max(1, (os.cpu_count() or 1) // 4)))
+# Inference worker pool: each worker is pinned to its own set of cores and runs
+# torch with that many intra-op threads (0 splits the cores evenly between
+# workers). Use `python -m benchmarks.inference_pool` to pick the split
+INFERENCE_THREADS_PER_WORKER = int(os.getenv("INFERENCE_THREADS_PER_WORKER", "0"))
+INFERENCE_INTEROP_THREADS = int(os.getenv("INFERENCE_INTEROP_THREADS", "1"))
+INFERENCE_PIN_CORES = os.getenv("INFERENCE_PIN_CORES", "true").lower() == "true"
+# Frame sampling: "read" decodes every frame, "grab" skips decoding of unsampled
+# frames, "seek" jumps over gaps longer than FRAME_SEEK_MIN_GAP frames
+FRAME_SAMPLING_STRATEGY = os.getenv("FRAME_SAMPLING_STRATEGY", "grab")
+FRAME_SEEK_MIN_GAP = 60  # ~2s at 30 FPS, roughly one GOP for dashcam H.264
+# Velocity-adaptive sampling for S3 uploads: aim for one frame every
+# SAMPLING_METRES_PER_FRAME metres using the CSV velocity, within
+# [SAMPLING_MIN_FPS, SAMPLING_MAX_FPS]. CSV_VELOCITY_UNIT is "m/s", "km/h" or
+# "auto" (pick the unit that agrees with the speed derived from the GPS track,
+# or use that speed if the CSV has no velocity)
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "false").lower() == "true"
+CSV_VELOCITY_UNIT = os.getenv("CSV_VELOCITY_UNIT", "auto")
+SAMPLING_METRES_PER_FRAME = 5.0
+SAMPLING_MIN_FPS = 0.5
+SAMPLING_MAX_FPS = FRAMES_PER_SECOND
+# Sensor-triggered pothole inference: the pothole model runs on every sampled
+# frame only in windows around gyro/accelerometer spikes (robust z-score above
+# SENSOR_SPIKE_Z) and Pothole flag 0 -> 1 transitions in the upload's CSV, and
+# at SENSOR_SPARSE_FPS elsewhere. Windows open SENSOR_WINDOW_BEFORE_S before
+# the trigger, since the camera sees a pothole before the wheels hit it
+SENSOR_TRIGGERED_POTHOLES = os.getenv("SENSOR_TRIGGERED_POTHOLES", "false").lower() == "true"
+SENSOR_SPIKE_Z = 3.5
+SENSOR_WINDOW_BEFORE_S = 3.0
+SENSOR_WINDOW_AFTER_S = 1.0
+SENSOR_SPARSE_FPS = 1.0
+# Reuse the previous frame's detections for near-identical frames (stopped in
+# traffic, at lights): mean absolute difference of 32x32 grayscale thumbnails.
+# Off by default: reused frames can carry detections a fresh pass would not
+# have made, so event counts differ from uploads processed without it
+FRAME_DEDUP_ENABLED = os.getenv("FRAME_DEDUP_ENABLED", "false").lower() == "true"
+FRAME_DEDUP_THRESHOLD = float(os.getenv("FRAME_DEDUP_THRESHOLD", "0.02"))
+FRAME_DEDUP_MAX_REUSE = 8  # Always re-run the models after this many reused frames
+FRAME_SIGNATURE_SIZE = 32
+# Drop blurred, blacked-out and occluded (e.g. wiper) frames before inference.
+# Scores are computed on a grayscale copy downscaled to FRAME_QUALITY_WIDTH and
+# compared to their median over the video's last FRAME_QUALITY_HISTORY frames,
+# so a dusk or night drive is judged against itself rather than daylight
+FRAME_QUALITY_FILTER = os.getenv("FRAME_QUALITY_FILTER", "false").lower() == "true"
+FRAME_QUALITY_WIDTH = 320
+FRAME_QUALITY_HISTORY = 60
+FRAME_MIN_BRIGHTNESS = 5.0  # Mean luminance, 0-255, below which a frame is black in any light
+FRAME_RELATIVE_BRIGHTNESS = 0.5  # Share of the video's median luminance
+FRAME_RELATIVE_SHARPNESS = 0.3  # Share of the video's median variance of the Laplacian
+FRAME_DARK_PIXEL_LEVEL = 20  # Luminance at or below which a pixel counts as occluded
+FRAME_MAX_OCCLUDED_INCREASE = 0.35  # Near-black pixel share above the video's median
+# Road region for the pothole model: "none" runs it on the full frame, "fixed"
+# cuts the top POTHOLE_ROI_TOP of every frame, "horizon" estimates the cut per
+# video from the horizon line (clamped to POTHOLE_ROI_MIN_TOP..MAX_TOP)
+POTHOLE_ROI_MODE = os.getenv("POTHOLE_ROI_MODE", "none")
+POTHOLE_ROI_TOP = 0.4
+POTHOLE_ROI_HORIZON_SAMPLES = 12  # Frames spread over the video used to find the horizon
+POTHOLE_ROI_HORIZON_MARGIN = 0.05  # Keep this much of the frame above the horizon
+POTHOLE_ROI_MIN_TOP = 0.2
+POTHOLE_ROI_MAX_TOP = 0.7
+# Persist partial detection results every N processed frames so a retried
+# upload resumes where the previous attempt stopped (0 disables checkpoints)
+CHECKPOINT_EVERY_FRAMES = int(os.getenv("CHECKPOINT_EVERY_FRAMES", "200"))
+# Track potholes and cracks across sampled frames and emit one event per track
+# instead of one per frame. Detections of the same kind in nearby frames are
+# the same object if their boxes overlap (IoU >= TRACK_IOU_THRESHOLD) or their
+# centres are within TRACK_CENTROID_RATIO box diagonals of each other.
+# Off by default: a tracked upload stores one event per object instead of one
+# per frame, so pothole counts and sizes would differ between uploads processed
+# before and after enabling it; rebuild the tile aggregates
+# (python -m app.services.tile_aggregates) after turning it on
+POTHOLE_TRACKING = os.getenv("POTHOLE_TRACKING", "false").lower() == "true"
+TRACK_IOU_THRESHOLD = 0.2
+TRACK_CENTROID_RATIO = 1.0
+TRACK_MAX_GAP_FRAMES = 2  # Inferred frames a track may go unmatched before it ends
+TRACK_MIN_FRAMES = 1  # Tracks seen in fewer frames are dropped as noise
+# Fuse runs of same-type events into one: an event joins the current run if it
+# is at most EVENT_FUSION_MAX_GAP_S after the previous one and within
+# EVENT_FUSION_MAX_DISTANCE_M and EVENT_FUSION_MAX_SPAN_S of the run's start.
+# Applies to congestion, and to potholes/cracks when they are not tracked.
+# Off by default: a fused upload stores fewer events than the same upload
+# processed without it, so event counts and tile aggregates would differ
+# between uploads processed before and after enabling it
+EVENT_FUSION = os.getenv("EVENT_FUSION", "false").lower() == "true"
+EVENT_FUSION_MAX_GAP_S = 3.0
+EVENT_FUSION_MAX_DISTANCE_M = 100.0
+EVENT_FUSION_MAX_SPAN_S = 60.0
 
 # ===========================================
 # NEW: PostgreSQL & S3 Configuration
@@ -45,6 +158,11 @@ S3_BUCKET_PROCESSED = os.getenv("S3_BUCKET_PROCESSED", "road-monitoring-processe
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+# Streaming ingest: decode videos while they are still downloading from S3
+S3_STREAMING_INGEST = os.getenv("S3_STREAMING_INGEST", "false").lower() == "true"
+S3_STREAM_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes per ranged GET
+S3_STREAM_WORKERS = 4  # Concurrent ranged GETs
+S3_STREAM_HORIZON_SPAN = 0.1  # Share of a streamed video used to estimate the horizon
 
 # Tile Configuration
 TILE_SIZE_KM = 1.0
@@ -61,5 +179,5 @@ DELETE_AFTER_PROCESSING = os.getenv("DELETE_AFTER_PROCESSING", "true").lower() =
 # ===========================================
 
 # Ensure directories exist
-for path in [CSV_DIR, VIDEO_DIR, CONGESTION_OUTPUT_DIR, POTHOLE_OUTPUT_DIR, ANNOTATED_VIDEOS_DIR, FRAMES_FOLDER]:
+for path in [CSV_DIR, VIDEO_DIR, CONGESTION_OUTPUT_DIR, POTHOLE_OUTPUT_DIR, ANNOTATED_VIDEOS_DIR, FRAMES_FOLDER, CHECKPOINT_DIR]:
     path.mkdir(parents=True, exist_ok=True)
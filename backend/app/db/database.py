@@ -61,6 +61,23 @@ async def init_db():
         
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
+        
+        # create_all does not add columns to existing tables
+        await conn.execute(text("""
+            ALTER TABLE raw_uploads
+                ADD COLUMN IF NOT EXISTS content_hash VARCHAR(128),
+                ADD COLUMN IF NOT EXISTS etag_fingerprint VARCHAR(128),
+                ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES raw_uploads(upload_id)
+        """))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_raw_uploads_content_hash ON raw_uploads(content_hash)"
+        ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_raw_uploads_etag_fingerprint ON raw_uploads(etag_fingerprint)"
+        ))
+        await conn.execute(text(
+            "ALTER TABLE tile_aggregates ADD COLUMN IF NOT EXISTS window_state JSONB"
+        ))
     
     print("Database initialized successfully")
 
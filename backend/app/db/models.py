@@ -33,9 +33,16 @@ class RawUpload(Base):
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     processed_at = Column(DateTime, nullable=True)
     
-    # Processing status: pending, processing, completed, failed
+    # Processing status: pending, processing, completed, failed, duplicate
     processing_status = Column(String(50), default="pending", index=True)
     
+    # Content fingerprints of the video, used to recognise re-uploads: SHA-256 of
+    # the file, and the S3 ETag (checked before downloading, but only matching
+    # uploads made the same way); a duplicate points at the upload holding the results
+    content_hash = Column(String(128), nullable=True)
+    etag_fingerprint = Column(String(128), nullable=True)
+    duplicate_of = Column(UUID(as_uuid=True), ForeignKey("raw_uploads.upload_id"), nullable=True)
+    
     # Aggregated GPS/sensor data from CSV
     avg_lat = Column(Float, nullable=True)
     avg_lon = Column(Float, nullable=True)
@@ -57,6 +64,8 @@ class RawUpload(Base):
         Index("idx_raw_uploads_status", "processing_status"),
         Index("idx_raw_uploads_device", "device_id"),
         Index("idx_raw_uploads_uploaded", "uploaded_at"),
+        Index("idx_raw_uploads_content_hash", "content_hash"),
+        Index("idx_raw_uploads_etag_fingerprint", "etag_fingerprint"),
     )
 
 
@@ -147,6 +156,9 @@ class TileAggregate(Base):
     last_updated = Column(DateTime, default=datetime.utcnow)
     last_event_at = Column(DateTime, nullable=True)
     
+    # Last-N event window the aggregates are maintained from incrementally
+    window_state = Column(JSONB, nullable=True)
+    
     __table_args__ = (
         Index("idx_tile_agg_updated", "last_updated"),
         Index("idx_tile_agg_center", "center_lat", "center_lon"),
@@ -173,12 +185,17 @@ CREATE TABLE IF NOT EXISTS raw_uploads (
     gyro_max DOUBLE PRECISION,
     gyro_avg DOUBLE PRECISION,
     video_duration_seconds INTEGER,
-    extra_data JSONB
+    extra_data JSONB,
+    content_hash VARCHAR(128),
+    etag_fingerprint VARCHAR(128),
+    duplicate_of UUID REFERENCES raw_uploads(upload_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_raw_uploads_status ON raw_uploads(processing_status);
 CREATE INDEX IF NOT EXISTS idx_raw_uploads_device ON raw_uploads(device_id);
 CREATE INDEX IF NOT EXISTS idx_raw_uploads_uploaded ON raw_uploads(uploaded_at);
+CREATE INDEX IF NOT EXISTS idx_raw_uploads_content_hash ON raw_uploads(content_hash);
+CREATE INDEX IF NOT EXISTS idx_raw_uploads_etag_fingerprint ON raw_uploads(etag_fingerprint);
 
 -- Events table
 CREATE TABLE IF NOT EXISTS events (
@@ -238,6 +255,8 @@ CREATE TABLE IF NOT EXISTS tile_aggregates (
     last_updated TIMESTAMP DEFAULT NOW(),
     last_event_at TIMESTAMP,
     
+    window_state JSONB,
+    
     PRIMARY KEY (tile_id, window_type)
 );
 
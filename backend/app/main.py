@@ -2,12 +2,13 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import time
 import os
 
 from app.routers import upload, process, dashboard
 from app.routers.tiles_mock import router as tiles_mock_router
-from app.core.config import OUTPUT_DIR
+from app.core.config import OUTPUT_DIR, WARMUP_MODELS_ON_STARTUP
 
 USE_POSTGRES = os.getenv("USE_POSTGRES", "false").lower() == "true"
 
@@ -22,6 +23,10 @@ async def lifespan(app: FastAPI):
                 await init_db()
         except Exception as e:
             print(f"Database initialization failed: {e}")
+    if WARMUP_MODELS_ON_STARTUP:
+        from app.services.model_registry import model_registry
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, model_registry.warmup)
     yield
     print("Shutting down...")
 
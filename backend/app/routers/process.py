@@ -1,9 +1,13 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pathlib import Path
+from concurrent.futures import as_completed
+from contextlib import nullcontext
 import json
-from app.services.pipeline import process_video_pipeline
+from functools import partial
+from app.services.pipeline import process_video_pipeline, detect_video, save_video_detections
+from app.services.inference_pool import InferencePool
 from app.services.metrics import merge_metrics
-from app.core.config import VIDEO_DIR, CSV_DIR, PROCESSED_VIDEOS_FILE
+from app.core.config import VIDEO_DIR, CSV_DIR, PROCESSED_VIDEOS_FILE, BATCH_PIPELINE_WORKERS
 
 router = APIRouter()
 
@@ -129,15 +133,66 @@ async def process_video_endpoint(video_filename: str, csv_filename: str, backgro
     return {"message": "Processing started", "video": video_filename, "csv": csv_filename}
 
 
-def run_batch_pipeline(pairs: list):
-    """Process multiple video-CSV pairs."""
-    print(f"Starting batch pipeline for {len(pairs)} pairs", flush=True)
-    for video_path, csv_path in pairs:
-        try:
-            run_full_pipeline(video_path, csv_path)
-        except Exception as e:
-            print(f"Error processing {video_path.name}: {e}")
-    print("Batch pipeline complete!", flush=True)
+def run_batch_pipeline(pairs: list, workers: int = BATCH_PIPELINE_WORKERS):
+    """
+    Process multiple video-CSV pairs.
+
+    Detection runs in a pool of worker processes, each pinned to its own
+    cores with its own model instances (or in this process, one pair after
+    another, with a single worker). Merging into the shared JSON files and
+    metrics happens here, one pair at a time, as detection finishes.
+    Returns a result dict per pair.
+    """
+    workers = max(1, min(workers, len(pairs)))
+    print(f"Starting batch pipeline for {len(pairs)} pairs with {workers} worker(s)", flush=True)
+
+    results = []
+    with InferencePool(workers=workers) if workers > 1 else nullcontext() as pool:
+        # (pair, callable returning its detections) in completion order
+        if pool is None:
+            completed = ((pair, partial(detect_video, pair[0])) for pair in pairs)
+        else:
+            futures = {pool.submit(detect_video, pair[0]): pair for pair in pairs}
+            completed = ((futures[future], future.result) for future in as_completed(futures))
+
+        for (video_path, csv_path), detections in completed:
+            try:
+                results.append(_save_pair_results(video_path, csv_path, detections()))
+            except Exception as e:
+                print(f"Error processing {video_path.name}: {e}")
+                results.append(_pair_result(video_path, csv_path, "failed", error=str(e)))
+
+    _print_batch_summary(results)
+    return results
+
+
+def _pair_result(video_path: Path, csv_path: Path, status: str, **extra):
+    return {"video": video_path.name, "csv": csv_path.name, "status": status, **extra}
+
+
+def _save_pair_results(video_path: Path, csv_path: Path, detections):
+    """Store one pair's detections and merge its metrics."""
+    if detections is None:
+        print("Pipeline failed to generate JSONs")
+        return _pair_result(video_path, csv_path, "failed", error="No frames extracted")
+
+    congestion_json, pothole_json = save_video_detections(detections)
+    final_output = merge_metrics(csv_path, congestion_json, pothole_json)
+    print(f"Pipeline complete. Metrics saved to {final_output}")
+
+    return _pair_result(
+        video_path, csv_path, "completed",
+        congestion_frames=len(detections["congestion"]),
+        pothole_frames=len(detections["pothole"])
+    )
+
+
+def _print_batch_summary(results: list):
+    completed = sum(1 for r in results if r["status"] == "completed")
+    print(f"Batch pipeline complete! {completed}/{len(results)} pairs succeeded", flush=True)
+    for r in results:
+        if r["status"] != "completed":
+            print(f"  {r['video']}: {r['status']} ({r.get('error')})", flush=True)
 
 
 def run_full_pipeline(video_path: Path, csv_path: Path):
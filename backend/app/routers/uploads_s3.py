@@ -11,6 +11,7 @@ import uuid
 
 from app.db.database import get_db
 from app.services.video_pipeline import process_video_from_s3
+from app.services.event_service import upload_processing_lock
 
 
 router = APIRouter(prefix="/uploads", tags=["Uploads"])
@@ -40,6 +41,7 @@ class UploadStatus(BaseModel):
     processing_status: str
     uploaded_at: str
     processed_at: Optional[str] = None
+    duplicate_of: Optional[str] = None
 
 
 @router.post("", response_model=UploadResponse)
@@ -94,6 +96,7 @@ async def register_upload(
 async def trigger_processing(
     upload_id: str,
     background_tasks: BackgroundTasks,
+    resume: bool = Query(False, description="Restart an upload stuck in 'processing' from its last checkpoint"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -101,6 +104,9 @@ async def trigger_processing(
     
     Called after Android app successfully uploads to S3.
     Processing runs in background and updates status when complete.
+    Failed uploads, and with resume=true uploads whose worker died while
+    processing, continue from their last checkpoint. A resume is refused
+    while a worker still holds the upload's processing lock.
     """
     # Verify upload exists
     result = await db.execute(
@@ -117,11 +123,19 @@ async def trigger_processing(
         raise HTTPException(status_code=404, detail="Upload not found")
     
     if upload.processing_status == 'processing':
-        return {"status": "already_processing", "upload_id": upload_id}
+        if not resume:
+            return {"status": "already_processing", "upload_id": upload_id}
+        # Only resume if no worker is still processing it
+        async with upload_processing_lock(upload_id) as acquired:
+            if not acquired:
+                return {"status": "already_processing", "upload_id": upload_id}
     
     if upload.processing_status == 'completed':
         return {"status": "already_completed", "upload_id": upload_id}
     
+    if upload.processing_status == 'duplicate':
+        return {"status": "duplicate", "upload_id": upload_id}
+    
     # Mark as processing
     await db.execute(
         text("""
@@ -155,18 +169,23 @@ async def process_video_task(
     from app.db.database import AsyncSessionLocal
     from app.services.event_service import mark_upload_failed
     
-    async with AsyncSessionLocal() as db:
-        try:
-            await process_video_from_s3(
-                upload_id=upload_id,
-                s3_key_video=s3_key_video,
-                s3_key_csv=s3_key_csv,
-                device_id=device_id,
-                db_session=db
-            )
-        except Exception as e:
-            print(f"Error processing upload {upload_id}: {e}")
-            await mark_upload_failed(upload_id, str(e), db)
+    async with upload_processing_lock(upload_id) as acquired:
+        if not acquired:
+            print(f"Upload {upload_id} is already being processed by another worker")
+            return
+        
+        async with AsyncSessionLocal() as db:
+            try:
+                await process_video_from_s3(
+                    upload_id=upload_id,
+                    s3_key_video=s3_key_video,
+                    s3_key_csv=s3_key_csv,
+                    device_id=device_id,
+                    db_session=db
+                )
+            except Exception as e:
+                print(f"Error processing upload {upload_id}: {e}")
+                await mark_upload_failed(upload_id, str(e), db)
 
 
 @router.get("/{upload_id}/status", response_model=UploadStatus)
@@ -179,7 +198,7 @@ async def get_upload_status(
     """
     result = await db.execute(
         text("""
-            SELECT upload_id, processing_status, uploaded_at, processed_at
+            SELECT upload_id, processing_status, uploaded_at, processed_at, duplicate_of
             FROM raw_uploads 
             WHERE upload_id = :id
         """),
@@ -194,7 +213,8 @@ async def get_upload_status(
         'upload_id': str(upload.upload_id),
         'processing_status': upload.processing_status,
         'uploaded_at': upload.uploaded_at.isoformat() if upload.uploaded_at else None,
-        'processed_at': upload.processed_at.isoformat() if upload.processed_at else None
+        'processed_at': upload.processed_at.isoformat() if upload.processed_at else None,
+        'duplicate_of': str(upload.duplicate_of) if upload.duplicate_of else None
     }
 
 
@@ -208,7 +228,7 @@ async def list_uploads(
     """
     List uploads with optional filters.
     """
-    query = "SELECT upload_id, processing_status, uploaded_at, processed_at FROM raw_uploads WHERE 1=1"
+    query = "SELECT upload_id, processing_status, uploaded_at, processed_at, duplicate_of FROM raw_uploads WHERE 1=1"
     params = {'limit': limit}
     
     if status:
@@ -229,7 +249,8 @@ async def list_uploads(
             'upload_id': str(row.upload_id),
             'processing_status': row.processing_status,
             'uploaded_at': row.uploaded_at.isoformat() if row.uploaded_at else None,
-            'processed_at': row.processed_at.isoformat() if row.processed_at else None
+            'processed_at': row.processed_at.isoformat() if row.processed_at else None,
+            'duplicate_of': str(row.duplicate_of) if row.duplicate_of else None
         })
     
     return uploads
@@ -247,7 +268,9 @@ async def get_upload_stats(db: AsyncSession = Depends(get_db)):
                 COUNT(*) FILTER (WHERE processing_status = 'pending') as pending,
                 COUNT(*) FILTER (WHERE processing_status = 'processing') as processing,
                 COUNT(*) FILTER (WHERE processing_status = 'completed') as completed,
-                COUNT(*) FILTER (WHERE processing_status = 'failed') as failed
+                COUNT(*) FILTER (WHERE processing_status = 'failed') as failed,
+                COUNT(*) FILTER (WHERE processing_status = 'duplicate') as duplicate,
+                COUNT(*) FILTER (WHERE processing_status = 'no_usable_frames') as no_usable_frames
             FROM raw_uploads
         """)
     )
@@ -259,5 +282,7 @@ async def get_upload_stats(db: AsyncSession = Depends(get_db)):
         'pending': stats.pending,
         'processing': stats.processing,
         'completed': stats.completed,
-        'failed': stats.failed
+        'failed': stats.failed,
+        'duplicate': stats.duplicate,
+        'no_usable_frames': stats.no_usable_frames
     }
@@ -0,0 +1,188 @@
+"""
+Checkpoints for resumable video processing.
+Partial per-frame detection results are appended to a JSON Lines file per
+upload every few hundred frames, so a retry after a crash or deploy resumes
+from the last checkpoint instead of re-running inference from frame 0.
+
+The first line describes the job; each later line holds only the frames
+processed since the previous save, so writing a checkpoint costs the same
+at the end of a long video as at the start.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from app.core.config import CHECKPOINT_DIR, CHECKPOINT_EVERY_FRAMES
+
+
+# Bump when the stored result format changes so stale checkpoints are ignored
+CHECKPOINT_VERSION = 1
+
+
+class DetectionCheckpoint:
+    """
+    Local checkpoint of run_staged_detection's results for one upload.
+
+    The checkpoint is keyed by upload_id and tagged with a description of
+    the job (video key and every setting that changes per-frame results);
+    a checkpoint written for a different job description is discarded
+    instead of being resumed.
+    """
+
+    def __init__(
+        self,
+        upload_id: str,
+        job: Optional[Dict] = None,
+        every: int = CHECKPOINT_EVERY_FRAMES,
+        directory: Union[str, Path] = CHECKPOINT_DIR
+    ):
+        self.upload_id = upload_id
+        self.job = job or {}
+        self.every = every
+        self.path = Path(directory) / f"{upload_id}.jsonl"
+        self.state: Optional[Dict] = None
+        self._saved_frames = 0
+        self._has_header = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.every > 0
+
+    @property
+    def next_source_index(self) -> int:
+        """First source frame that still needs processing."""
+        if not self.state:
+            return 0
+        return self.state['last_source_index'] + 1
+
+    def load(self) -> Optional[Dict]:
+        """
+        Load the checkpoint for this upload, if a usable one exists.
+
+        A partly written last record (crash mid-append) is dropped and cut
+        from the file, so the checkpoint resumes from the record before it.
+
+        Returns:
+            Dict with 'congestion_results', 'pothole_results', 'frame_times',
+            'last_source_index' and 'counters' (cumulative gate counts), or
+            None to start from the beginning
+        """
+        self.state = None
+        self._saved_frames = 0
+        self._has_header = False
+        if not self.enabled or not self.path.exists():
+            return None
+
+        state = None
+        valid_bytes = 0
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b'\n'):
+                        break
+                    if state is None:
+                        if record.get('version') != CHECKPOINT_VERSION or record.get('job') != self.job:
+                            print(f"[Checkpoint] Ignoring checkpoint for a different job: {self.path}")
+                            return None
+                        state = {
+                            'congestion_results': [],
+                            'pothole_results': [],
+                            'frame_times': [],
+                            'last_source_index': -1,
+                            'counters': {},
+                        }
+                    else:
+                        state['congestion_results'].extend(record['congestion_results'])
+                        state['pothole_results'].extend(record['pothole_results'])
+                        state['frame_times'].extend(record['frame_times'])
+                        state['last_source_index'] = record['last_source_index']
+                        state['counters'] = record['counters']
+                    valid_bytes += len(line)
+        except (OSError, KeyError) as e:
+            print(f"[Checkpoint] Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+        if state is None:
+            return None
+
+        if valid_bytes < self.path.stat().st_size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        self._has_header = True
+
+        if not state['frame_times']:
+            return None
+
+        self.state = state
+        self._saved_frames = len(state['frame_times'])
+        print(
+            f"[Checkpoint] Resuming upload {self.upload_id} after source frame "
+            f"{state['last_source_index']} ({self._saved_frames} frames already processed)"
+        )
+        return state
+
+    def maybe_save(
+        self,
+        congestion_results: List[Dict],
+        pothole_results: List[Dict],
+        frame_times: List[float],
+        last_source_index: int,
+        counters: Optional[Dict] = None
+    ):
+        """Save if at least `every` frames were added since the last save."""
+        if self.enabled and len(frame_times) - self._saved_frames >= self.every:
+            self.save(congestion_results, pothole_results, frame_times, last_source_index, counters)
+
+    def save(
+        self,
+        congestion_results: List[Dict],
+        pothole_results: List[Dict],
+        frame_times: List[float],
+        last_source_index: int,
+        counters: Optional[Dict] = None
+    ):
+        """
+        Append the results processed since the last save.
+
+        Args:
+            congestion_results: Congestion results for every processed frame
+            pothole_results: Pothole results for every processed frame
+            frame_times: Timestamp of every processed frame
+            last_source_index: Source index of the last frame read from the video
+            counters: Cumulative gate counts (duplicates, rejections, ...) up to
+                last_source_index, restored on resume
+        """
+        start = self._saved_frames
+        record = {
+            'last_source_index': last_source_index,
+            'congestion_results': congestion_results[start:],
+            'pothole_results': pothole_results[start:],
+            'frame_times': frame_times[start:],
+            'counters': counters or {},
+        }
+
+        # Records are only trusted up to the last complete line, so a crash
+        # mid-write loses at most this record
+        with open(self.path, 'a' if self._has_header else 'w') as f:
+            if not self._has_header:
+                f.write(json.dumps({'version': CHECKPOINT_VERSION, 'job': self.job}) + '\n')
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._has_header = True
+        self._saved_frames = len(frame_times)
+        print(f"[Checkpoint] Saved {len(frame_times)} frames for upload {self.upload_id}")
+
+    def clear(self):
+        """Remove the checkpoint once the upload is fully processed."""
+        self.state = None
+        self._saved_frames = 0
+        self._has_header = False
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,126 @@
+"""
+Temporal-window fusion of per-frame events.
+A traffic jam, or a damaged stretch of road when potholes are not tracked,
+qualifies in many consecutive frames at nearly the same position. Runs of
+such events are merged into one event that keeps the run's start and end
+time, the peak and mean of its metrics, and every frame it covers.
+"""
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import (
+    EVENT_FUSION_MAX_GAP_S, EVENT_FUSION_MAX_DISTANCE_M, EVENT_FUSION_MAX_SPAN_S
+)
+from app.utils.tiles import haversine_km
+
+
+# model_outputs fields that identify frames rather than measure anything
+_POSITION_KEYS = ('frame_idx', 'first_frame_idx', 'last_frame_idx')
+
+
+def _metric_keys(events: List[Dict]) -> List[str]:
+    """Numeric model_outputs fields present in every event of a run."""
+    keys = None
+    for event in events:
+        numeric = {
+            key for key, value in event['model_outputs'].items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key not in _POSITION_KEYS
+        }
+        keys = numeric if keys is None else keys & numeric
+    return sorted(keys or [])
+
+
+def fuse_run(events: List[Dict]) -> Dict:
+    """
+    Merge a run of same-type events into one.
+
+    The fused event is placed at the run's most severe event and keeps that
+    event's model_outputs, extended with the run's time span, the number
+    of events fused, and 'peak' and 'mean' of every numeric metric.
+
+    Args:
+        events: Events of one type in time order
+
+    Returns:
+        The fused event (the single event itself for a run of one)
+    """
+    if len(events) == 1:
+        return events[0]
+
+    peak_event = max(events, key=lambda event: event['severity'])
+    start = events[0]['detected_at']
+    end = events[-1]['detected_at']
+
+    model_outputs = dict(peak_event['model_outputs'])
+    model_outputs.update({
+        'start_time': start.isoformat(),
+        'end_time': end.isoformat(),
+        'duration_s': round((end - start).total_seconds(), 3),
+        'events_fused': len(events),
+        'peak': {},
+        'mean': {},
+    })
+    for key in _metric_keys(events):
+        values = [event['model_outputs'][key] for event in events]
+        model_outputs['peak'][key] = max(values)
+        model_outputs['mean'][key] = round(float(np.mean(values)), 6)
+
+    frame_refs = []
+    for event in events:
+        frame_refs.extend(ref for ref in event.get('frame_refs') or [] if ref not in frame_refs)
+
+    return {
+        **peak_event,
+        'event_id': str(uuid.uuid4()),
+        'detected_at': start,
+        'model_outputs': model_outputs,
+        'confidence': max(event['confidence'] for event in events),
+        'frame_refs': frame_refs,
+    }
+
+
+def fuse_events(
+    events: List[Dict],
+    max_gap_s: float = EVENT_FUSION_MAX_GAP_S,
+    max_distance_m: float = EVENT_FUSION_MAX_DISTANCE_M,
+    max_span_s: float = EVENT_FUSION_MAX_SPAN_S
+) -> List[Dict]:
+    """
+    Group consecutive events of the same type into fused events.
+
+    An event extends the current run of its type if it comes at most
+    max_gap_s after the run's last event, at most max_span_s after its first
+    event, and at most max_distance_m from its first event's position.
+
+    Args:
+        events: Events of any types (e.g. from one upload)
+        max_gap_s: Longest pause within a run
+        max_distance_m: Furthest an event may be from the run's start
+        max_span_s: Longest run
+
+    Returns:
+        Fused events, ordered by type then time
+    """
+    by_type: Dict[str, List[Dict]] = {}
+    for event in sorted(events, key=lambda event: event['detected_at']):
+        by_type.setdefault(event['event_type'], []).append(event)
+
+    fused = []
+    for type_events in by_type.values():
+        run = [type_events[0]]
+        for event in type_events[1:]:
+            first, last = run[0], run[-1]
+            if (
+                (event['detected_at'] - last['detected_at']).total_seconds() <= max_gap_s
+                and (event['detected_at'] - first['detected_at']).total_seconds() <= max_span_s
+                and haversine_km(first['lat'], first['lon'], event['lat'], event['lon']) * 1000 <= max_distance_m
+            ):
+                run.append(event)
+            else:
+                fused.append(fuse_run(run))
+                run = [event]
+        fused.append(fuse_run(run))
+
+    return fused
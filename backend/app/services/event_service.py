@@ -3,209 +3,331 @@ Event service for database operations.
 Handles inserting events and updating tile aggregates.
 """
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import AsyncIterator, List, Dict, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 import uuid
 
+from app.services.tile_aggregates import apply_events_to_tiles, window_entry
 from app.utils.tiles import lat_lon_to_tile_id, tile_id_to_center
 
 
 # Configuration
-TILE_LAST_N_EVENTS = 20  # Number of recent events to use for tile aggregation
+EVENT_INSERT_CHUNK_SIZE = 1000  # Events per bulk INSERT statement
 
 
-async def store_events_and_update_tiles(events: List[Dict], db: AsyncSession):
+def _event_row(event: Dict) -> Dict:
+    """Column values of one event, JSON-serialisable for the bulk insert."""
+    detected_at = event['detected_at']
+    return {
+        'event_id': str(event.get('event_id') or uuid.uuid4()),
+        'upload_id': str(event['upload_id']) if event.get('upload_id') else None,
+        'event_type': event['event_type'],
+        'detected_at': detected_at.isoformat() if isinstance(detected_at, datetime) else detected_at,
+        'device_id': event.get('device_id'),
+        'lat': event['lat'],
+        'lon': event['lon'],
+        'tile_id': event['tile_id'],
+        'model_outputs': event['model_outputs'],
+        'severity': float(event.get('severity', 0)),
+        'confidence': float(event.get('confidence', 0)),
+        'frame_refs': event.get('frame_refs') or []
+    }
+
+
+async def _insert_events_bulk(rows: List[Dict], db: AsyncSession) -> Set[str]:
     """
-    Insert all events into events table and update affected tile aggregates.
+    Insert events with one statement per chunk.
+    
+    The rows are sent as a single JSONB array and expanded server-side with
+    jsonb_to_recordset, so geom is built in the same statement and
+    ON CONFLICT still applies (which COPY cannot do).
     
     Args:
-        events: List of event dictionaries
+        rows: Rows from _event_row
         db: Database session
+        
+    Returns:
+        IDs of the events inserted (not already present)
     """
-    affected_tiles: Set[str] = set()
-    
-    # Insert events
-    for event in events:
-        await db.execute(
+    inserted: Set[str] = set()
+    for start in range(0, len(rows), EVENT_INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + EVENT_INSERT_CHUNK_SIZE]
+        result = await db.execute(
             text("""
                 INSERT INTO events (
                     event_id, upload_id, event_type, detected_at, device_id,
                     lat, lon, geom, tile_id, model_outputs,
                     severity, confidence, frame_refs, created_at
-                ) VALUES (
-                    :event_id, :upload_id, :event_type, :detected_at, :device_id,
-                    :lat, :lon, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
-                    :tile_id, :model_outputs, :severity, :confidence, :frame_refs, NOW()
+                )
+                SELECT
+                    e.event_id, e.upload_id, e.event_type, e.detected_at, e.device_id,
+                    e.lat, e.lon, ST_SetSRID(ST_MakePoint(e.lon, e.lat), 4326)::geography,
+                    e.tile_id, e.model_outputs, e.severity, e.confidence,
+                    ARRAY(SELECT jsonb_array_elements_text(e.frame_refs)), NOW()
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS e(
+                    event_id uuid, upload_id uuid, event_type text, detected_at timestamp,
+                    device_id text, lat double precision, lon double precision, tile_id text,
+                    model_outputs jsonb, severity numeric, confidence numeric, frame_refs jsonb
                 )
                 ON CONFLICT (event_id) DO NOTHING
+                RETURNING event_id
             """),
-            {
-                'event_id': event.get('event_id') or str(uuid.uuid4()),
-                'upload_id': event.get('upload_id'),
-                'event_type': event['event_type'],
-                'detected_at': event['detected_at'],
-                'device_id': event.get('device_id'),
-                'lat': event['lat'],
-                'lon': event['lon'],
-                'tile_id': event['tile_id'],
-                'model_outputs': json.dumps(event['model_outputs']),
-                'severity': float(event.get('severity', 0)),
-                'confidence': float(event.get('confidence', 0)),
-                'frame_refs': event.get('frame_refs', [])
-            }
+            {'rows': json.dumps(chunk)}
         )
-        affected_tiles.add(event['tile_id'])
-    
-    await db.commit()
+        inserted.update(str(row.event_id) for row in result.fetchall())
+    return inserted
+
+
+async def _insert_events_row_by_row(rows: List[Dict], db: AsyncSession) -> Tuple[Set[str], Dict[str, str]]:
+    """
+    Insert events one at a time, each in its own savepoint, skipping rows
+    the database rejects.
     
-    # Update aggregates for each affected tile
-    for tile_id in affected_tiles:
-        await update_tile_aggregate(tile_id, db)
+    Args:
+        rows: Rows from _event_row
+        db: Database session
+        
+    Returns:
+        Tuple of (IDs of the events inserted, not already present or
+        rejected; database error per rejected event ID)
+    """
+    inserted: Set[str] = set()
+    rejected: Dict[str, str] = {}
+    for row in rows:
+        try:
+            async with db.begin_nested():
+                result = await db.execute(
+                    text("""
+                        INSERT INTO events (
+                            event_id, upload_id, event_type, detected_at, device_id,
+                            lat, lon, geom, tile_id, model_outputs,
+                            severity, confidence, frame_refs, created_at
+                        ) VALUES (
+                            :event_id, :upload_id, :event_type, :detected_at, :device_id,
+                            :lat, :lon, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
+                            :tile_id, :model_outputs, :severity, :confidence, :frame_refs, NOW()
+                        )
+                        ON CONFLICT (event_id) DO NOTHING
+                        RETURNING event_id
+                    """),
+                    {
+                        **row,
+                        'detected_at': datetime.fromisoformat(row['detected_at']),
+                        'model_outputs': json.dumps(row['model_outputs'])
+                    }
+                )
+                if result.fetchone():
+                    inserted.add(row['event_id'])
+        except DBAPIError as e:
+            rejected[row['event_id']] = str(e.orig)
+    return inserted, rejected
 
 
-async def update_tile_aggregate(tile_id: str, db: AsyncSession):
+async def store_events_and_update_tiles(events: List[Dict], db: AsyncSession):
     """
-    Recompute tile aggregate using last-N events strategy.
+    Insert all events into events table and update affected tile aggregates.
+    
+    Events are written in bulk; if the bulk statement fails, they are
+    retried row by row so one bad event does not lose the whole upload.
+    Newly inserted events are then pushed into their tiles' aggregate
+    windows without reading any events back. Events and aggregates are
+    committed together, so the aggregates never miss committed events.
     
     Args:
-        tile_id: Tile identifier
+        events: List of event dictionaries
         db: Database session
     """
-    # Get stats from last N events for this tile
-    result = await db.execute(
-        text("""
-            WITH last_n AS (
-                SELECT 
-                    event_type,
-                    severity,
-                    confidence,
-                    model_outputs,
-                    detected_at
-                FROM events
-                WHERE tile_id = :tile_id
-                ORDER BY detected_at DESC
-                LIMIT :limit
+    if not events:
+        return
+    
+    rows = [_event_row(event) for event in events]
+    
+    try:
+        # A savepoint, so a failed bulk insert leaves the rest of the
+        # caller's transaction intact
+        async with db.begin_nested():
+            inserted = await _insert_events_bulk(rows, db)
+    except DBAPIError as e:
+        print(f"Bulk insert of {len(rows)} events failed ({e.orig}), retrying row by row")
+        inserted, rejected = await _insert_events_row_by_row(rows, db)
+        if rejected:
+            print(
+                f"Inserted {len(inserted)} of {len(rows)} events, rejected {len(rejected)}: "
+                + "; ".join(f"{event_id} ({error})" for event_id, error in rejected.items())
             )
-            SELECT 
-                COUNT(*) as total_events,
-                COUNT(*) FILTER (WHERE event_type IN ('pothole')) as pothole_count,
-                COUNT(*) FILTER (WHERE event_type = 'congestion') as congestion_count,
-                COUNT(*) FILTER (WHERE event_type = 'crack') as crack_count,
-                COALESCE(AVG(severity), 0) as avg_severity,
-                COALESCE(MAX(severity), 0) as max_severity,
-                COALESCE(AVG(confidence), 0) as avg_confidence,
-                COALESCE(
-                    AVG((model_outputs->>'traffic_density_score')::numeric) 
-                    FILTER (WHERE event_type = 'congestion'), 
-                    0
-                ) as avg_congestion_score,
-                COALESCE(
-                    AVG((model_outputs->>'vehicle_count')::numeric)
-                    FILTER (WHERE event_type = 'congestion'),
-                    0
-                ) as avg_vehicle_count,
-                COALESCE(
-                    MAX((model_outputs->>'vehicle_count')::integer)
-                    FILTER (WHERE event_type = 'congestion'),
-                    0
-                ) as max_vehicle_count,
-                COALESCE(
-                    AVG((model_outputs->>'total_pothole_size')::numeric)
-                    FILTER (WHERE event_type = 'pothole'),
-                    0
-                ) as avg_pothole_size,
-                COALESCE(
-                    MAX((model_outputs->>'total_pothole_size')::numeric)
-                    FILTER (WHERE event_type = 'pothole'),
-                    0
-                ) as max_pothole_size,
-                MAX(detected_at) as last_event_at
-            FROM last_n
-        """),
-        {'tile_id': tile_id, 'limit': TILE_LAST_N_EVENTS}
-    )
     
-    stats = result.fetchone()
+    # Push the new events into the affected tiles' aggregate windows
+    entries_by_tile: Dict[str, List[Dict]] = {}
+    for event, row in zip(events, rows):
+        if row['event_id'] not in inserted:
+            continue
+        entries_by_tile.setdefault(row['tile_id'], []).append(window_entry(
+            row['event_id'], row['event_type'], datetime.fromisoformat(row['detected_at']),
+            row['severity'], row['confidence'], event['model_outputs']
+        ))
+    await apply_events_to_tiles(entries_by_tile, db)
+    await db.commit()
+
+
+@asynccontextmanager
+async def upload_processing_lock(upload_id: str) -> AsyncIterator[bool]:
+    """
+    Hold an advisory lock on an upload for as long as it is processed.
+    
+    The lock is session-level on a dedicated connection, so every API
+    process and host sees it, and it is released when the block exits or
+    when the connection drops with a crashed worker.
     
-    if not stats or stats.total_events == 0:
-        return
+    Args:
+        upload_id: Upload UUID
+        
+    Yields:
+        True if the lock was taken, False if another worker holds it
+    """
+    from app.db.database import engine
     
-    # Calculate tile center
-    center_lat, center_lon = tile_id_to_center(tile_id)
+    params = {'key': f"upload:{upload_id}"}
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), params)
+        acquired = bool(result.scalar())
+        await conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), params)
+                await conn.commit()
+
+
+async def mark_upload_processed(
+    upload_id: str,
+    db: AsyncSession,
+    stats: Optional[Dict] = None,
+    status: str = 'completed',
+    content_hash: Optional[str] = None,
+    etag_fingerprint: Optional[str] = None
+):
+    """
+    Mark an upload as processed.
     
-    # Upsert into tile_aggregates
+    Args:
+        upload_id: Upload UUID
+        db: Database session
+        stats: Optional job stats, stored under extra_data.processing_stats
+        status: Final processing_status ('completed', or 'no_usable_frames'
+            when every decoded frame was rejected by the quality filter)
+        content_hash: SHA-256 fingerprint of the video, if computed
+        etag_fingerprint: S3 ETag fingerprint of the video, if available
+    """
     await db.execute(
         text("""
-            INSERT INTO tile_aggregates (
-                tile_id, window_type, total_events, pothole_count, congestion_count, crack_count,
-                avg_severity, max_severity, avg_confidence,
-                avg_congestion_score, avg_vehicle_count, max_vehicle_count,
-                avg_pothole_size, max_pothole_size,
-                center_lat, center_lon, last_updated, last_event_at
-            ) VALUES (
-                :tile_id, 'last_20', :total_events, :pothole_count, :congestion_count, :crack_count,
-                :avg_severity, :max_severity, :avg_confidence,
-                :avg_congestion_score, :avg_vehicle_count, :max_vehicle_count,
-                :avg_pothole_size, :max_pothole_size,
-                :center_lat, :center_lon, NOW(), :last_event_at
-            )
-            ON CONFLICT (tile_id, window_type) 
-            DO UPDATE SET
-                total_events = EXCLUDED.total_events,
-                pothole_count = EXCLUDED.pothole_count,
-                congestion_count = EXCLUDED.congestion_count,
-                crack_count = EXCLUDED.crack_count,
-                avg_severity = EXCLUDED.avg_severity,
-                max_severity = EXCLUDED.max_severity,
-                avg_confidence = EXCLUDED.avg_confidence,
-                avg_congestion_score = EXCLUDED.avg_congestion_score,
-                avg_vehicle_count = EXCLUDED.avg_vehicle_count,
-                max_vehicle_count = EXCLUDED.max_vehicle_count,
-                avg_pothole_size = EXCLUDED.avg_pothole_size,
-                max_pothole_size = EXCLUDED.max_pothole_size,
-                last_updated = NOW(),
-                last_event_at = EXCLUDED.last_event_at
+            UPDATE raw_uploads 
+            SET processing_status = :status, processed_at = NOW(),
+                content_hash = COALESCE(CAST(:content_hash AS VARCHAR), content_hash),
+                etag_fingerprint = COALESCE(CAST(:etag_fingerprint AS VARCHAR), etag_fingerprint),
+                extra_data = COALESCE(extra_data, '{}') || jsonb_build_object(
+                    'processing_stats', CAST(:stats AS jsonb)
+                )
+            WHERE upload_id = :upload_id
         """),
         {
-            'tile_id': tile_id,
-            'total_events': stats.total_events,
-            'pothole_count': stats.pothole_count,
-            'congestion_count': stats.congestion_count,
-            'crack_count': stats.crack_count,
-            'avg_severity': float(stats.avg_severity or 0),
-            'max_severity': float(stats.max_severity or 0),
-            'avg_confidence': float(stats.avg_confidence or 0),
-            'avg_congestion_score': float(stats.avg_congestion_score or 0),
-            'avg_vehicle_count': float(stats.avg_vehicle_count or 0),
-            'max_vehicle_count': int(stats.max_vehicle_count or 0),
-            'avg_pothole_size': float(stats.avg_pothole_size or 0),
-            'max_pothole_size': float(stats.max_pothole_size or 0),
-            'center_lat': center_lat,
-            'center_lon': center_lon,
-            'last_event_at': stats.last_event_at
+            'upload_id': upload_id,
+            'stats': json.dumps(stats or {}),
+            'status': status,
+            'content_hash': content_hash,
+            'etag_fingerprint': etag_fingerprint
         }
     )
-    
     await db.commit()
 
 
-async def mark_upload_processed(upload_id: str, db: AsyncSession):
+async def find_processed_duplicate(
+    upload_id: str,
+    db: AsyncSession,
+    content_hash: Optional[str] = None,
+    etag_fingerprint: Optional[str] = None
+) -> Optional[str]:
     """
-    Mark an upload as processed.
+    Look for an earlier upload of the same video that has already been
+    processed.
+    
+    The SHA-256 content hash is the canonical fingerprint; the S3 ETag
+    fingerprint is a cheaper check available before downloading, but only
+    matches uploads made the same way (single part or the same multipart
+    part size). Either one matching is enough.
     
     Args:
         upload_id: Upload UUID
         db: Database session
+        content_hash: SHA-256 fingerprint of the upload's video
+        etag_fingerprint: S3 ETag fingerprint of the upload's video
+        
+    Returns:
+        upload_id of the original upload, or None if this video is new
+    """
+    conditions = []
+    params = {'upload_id': upload_id}
+    if content_hash:
+        conditions.append("content_hash = :content_hash")
+        params['content_hash'] = content_hash
+    if etag_fingerprint:
+        conditions.append("etag_fingerprint = :etag_fingerprint")
+        params['etag_fingerprint'] = etag_fingerprint
+    if not conditions:
+        return None
+    
+    result = await db.execute(
+        text(f"""
+            SELECT upload_id FROM raw_uploads
+            WHERE ({' OR '.join(conditions)})
+              AND upload_id != :upload_id
+              AND processing_status = 'completed'
+            ORDER BY processed_at
+            LIMIT 1
+        """),
+        params
+    )
+    original = result.fetchone()
+    return str(original.upload_id) if original else None
+
+
+async def mark_upload_duplicate(
+    upload_id: str,
+    original_upload_id: str,
+    db: AsyncSession,
+    content_hash: Optional[str] = None,
+    etag_fingerprint: Optional[str] = None
+):
+    """
+    Mark an upload as a duplicate of an already processed upload.
+    Its events are the original's; nothing is re-inferred or re-inserted.
+    
+    Args:
+        upload_id: Upload UUID
+        original_upload_id: Upload whose results cover this video
+        db: Database session
+        content_hash: SHA-256 fingerprint of the video, if computed
+        etag_fingerprint: S3 ETag fingerprint of the video, if available
     """
     await db.execute(
         text("""
             UPDATE raw_uploads 
-            SET processing_status = 'completed', processed_at = NOW()
+            SET processing_status = 'duplicate', processed_at = NOW(),
+                duplicate_of = :original_upload_id,
+                content_hash = COALESCE(CAST(:content_hash AS VARCHAR), content_hash),
+                etag_fingerprint = COALESCE(CAST(:etag_fingerprint AS VARCHAR), etag_fingerprint)
             WHERE upload_id = :upload_id
         """),
-        {'upload_id': upload_id}
+        {
+            'upload_id': upload_id,
+            'original_upload_id': original_upload_id,
+            'content_hash': content_hash,
+            'etag_fingerprint': etag_fingerprint
+        }
     )
     await db.commit()
 
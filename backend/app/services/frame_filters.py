@@ -0,0 +1,180 @@
+"""
+Cheap per-frame gates that run before the detectors.
+Each gate looks at a decoded frame and decides whether it needs a model pass,
+so frames that cannot change the results never reach YOLO.
+"""
+from collections import deque
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.core.config import (
+    FRAME_DEDUP_THRESHOLD, FRAME_DEDUP_MAX_REUSE, FRAME_SIGNATURE_SIZE,
+    FRAME_QUALITY_WIDTH, FRAME_QUALITY_HISTORY, FRAME_MIN_BRIGHTNESS,
+    FRAME_RELATIVE_BRIGHTNESS, FRAME_RELATIVE_SHARPNESS,
+    FRAME_DARK_PIXEL_LEVEL, FRAME_MAX_OCCLUDED_INCREASE
+)
+
+
+QUALITY_REJECT_REASONS = ("dark", "occluded", "blurred")
+
+
+def frame_signature(image: np.ndarray, size: int = FRAME_SIGNATURE_SIZE) -> np.ndarray:
+    """
+    Downscaled grayscale thumbnail used to compare frames.
+
+    Args:
+        image: BGR frame as decoded by OpenCV
+        size: Side length of the square thumbnail
+
+    Returns:
+        (size, size) float32 array with values in [0, 1]
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    return thumb.astype(np.float32) / 255.0
+
+
+def frame_quality_scores(image: np.ndarray, width: int = FRAME_QUALITY_WIDTH) -> Dict[str, float]:
+    """
+    Sharpness and exposure scores for a frame.
+
+    Args:
+        image: BGR frame as decoded by OpenCV
+        width: Width the grayscale copy is downscaled to before scoring
+
+    Returns:
+        Dict with 'sharpness' (variance of the Laplacian), 'brightness'
+        (mean luminance) and 'dark_fraction' (share of pixels at or below
+        FRAME_DARK_PIXEL_LEVEL)
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if gray.shape[1] > width:
+        height = max(1, round(gray.shape[0] * width / gray.shape[1]))
+        gray = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    brightness = float(histogram @ np.arange(256)) / gray.size
+    dark_fraction = float(histogram[:FRAME_DARK_PIXEL_LEVEL + 1].sum()) / gray.size
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+    return {
+        'sharpness': sharpness,
+        'brightness': brightness,
+        'dark_fraction': dark_fraction,
+    }
+
+
+class FrameQualityGate:
+    """
+    Rejects frames that are too dark, largely occluded or motion-blurred to
+    yield useful detections, and counts rejections per reason.
+
+    Thresholds are relative to the video itself: each score is compared to
+    its median over the last `history` frames checked (including the current
+    one), so a night drive is not rejected wholesale for being darker and
+    softer than daylight footage. Only a frame below min_brightness is
+    rejected outright.
+    """
+
+    def __init__(
+        self,
+        min_brightness: float = FRAME_MIN_BRIGHTNESS,
+        relative_brightness: float = FRAME_RELATIVE_BRIGHTNESS,
+        relative_sharpness: float = FRAME_RELATIVE_SHARPNESS,
+        max_occluded_increase: float = FRAME_MAX_OCCLUDED_INCREASE,
+        history: int = FRAME_QUALITY_HISTORY,
+        width: int = FRAME_QUALITY_WIDTH
+    ):
+        self.min_brightness = min_brightness
+        self.relative_brightness = relative_brightness
+        self.relative_sharpness = relative_sharpness
+        self.max_occluded_increase = max_occluded_increase
+        self.width = width
+        self._history = {key: deque(maxlen=max(1, history)) for key in ('sharpness', 'brightness', 'dark_fraction')}
+        self.rejected = {reason: 0 for reason in QUALITY_REJECT_REASONS}
+
+    @property
+    def total_rejected(self) -> int:
+        return sum(self.rejected.values())
+
+    def check(self, image: np.ndarray) -> Optional[str]:
+        """
+        Score a frame and record a rejection if it fails.
+
+        Args:
+            image: BGR frame as decoded by OpenCV
+
+        Returns:
+            The rejection reason, or None if the frame should be inferred
+        """
+        scores = frame_quality_scores(image, self.width)
+        median = {}
+        for key, values in self._history.items():
+            values.append(scores[key])
+            median[key] = float(np.median(values))
+
+        # Checked in this order: a black frame is also "blurred" and "occluded"
+        if scores['brightness'] < max(self.min_brightness, self.relative_brightness * median['brightness']):
+            reason = 'dark'
+        elif scores['dark_fraction'] > median['dark_fraction'] + self.max_occluded_increase:
+            reason = 'occluded'
+        elif scores['sharpness'] < self.relative_sharpness * median['sharpness']:
+            reason = 'blurred'
+        else:
+            return None
+
+        self.rejected[reason] += 1
+        return reason
+
+
+class DuplicateFrameGate:
+    """
+    Flags frames that are near-identical to the last frame sent to the models.
+
+    A frame is a duplicate when the mean absolute difference between its
+    signature and the reference signature is below threshold. The reference
+    is only replaced by frames that are inferred, so a slow drift (e.g.
+    creeping forward in traffic) still triggers inference once it adds up.
+    After max_reuse consecutive duplicates the next frame is always inferred.
+    """
+
+    def __init__(
+        self,
+        threshold: float = FRAME_DEDUP_THRESHOLD,
+        max_reuse: int = FRAME_DEDUP_MAX_REUSE,
+        signature_size: int = FRAME_SIGNATURE_SIZE
+    ):
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.signature_size = signature_size
+        self._reference: Optional[np.ndarray] = None
+        self._reused = 0
+        self.skipped = 0
+
+    def is_duplicate(self, image: np.ndarray) -> bool:
+        """
+        Check a frame against the reference, updating the reference when the
+        frame needs inference.
+
+        Args:
+            image: BGR frame as decoded by OpenCV
+
+        Returns:
+            True if the previous frame's results can be reused for this frame
+        """
+        signature = frame_signature(image, self.signature_size)
+
+        if (
+            self._reference is not None
+            and self._reused < self.max_reuse
+            and float(np.abs(signature - self._reference).mean()) < self.threshold
+        ):
+            self._reused += 1
+            self.skipped += 1
+            return True
+
+        self._reference = signature
+        self._reused = 0
+        return False
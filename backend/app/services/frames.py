@@ -0,0 +1,222 @@
+"""
+Frame sources for the video pipelines.
+Decodes sampled frames straight from cv2.VideoCapture into memory so the
+detectors receive numpy arrays instead of round-tripping through JPEGs on disk.
+"""
+import itertools
+import math
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.core.config import FRAMES_PER_SECOND, FRAME_SAMPLING_STRATEGY, FRAME_SEEK_MIN_GAP
+
+
+SAMPLING_STRATEGIES = ("read", "grab", "seek")
+
+
+class Frame(NamedTuple):
+    """A decoded video frame with its position in the video."""
+    index: int           # Position in the sampled sequence
+    source_index: int    # Position in the decoded video
+    timestamp: float     # Seconds from the start of the video
+    image: np.ndarray    # BGR pixels as decoded by OpenCV
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @property
+    def area(self) -> int:
+        return self.height * self.width
+
+
+def open_capture(video) -> cv2.VideoCapture:
+    """
+    Open a video for decoding.
+
+    Args:
+        video: Path to a video file, or an object whose open_stream()
+            returns a binary reader (io.BufferedIOBase) that FFmpeg decodes
+            from instead, e.g. a StreamingDownload still in progress
+
+    Returns:
+        OpenCV capture. Close it by dropping the last reference rather than
+        calling release(): release() frees a stream-backed capture's reader
+        without holding the GIL, which aborts the interpreter.
+    """
+    if hasattr(video, 'open_stream'):
+        return cv2.VideoCapture(video.open_stream(), cv2.CAP_FFMPEG, [])
+    return cv2.VideoCapture(str(video))
+
+
+class VideoFrameSource:
+    """
+    Iterable over frames sampled from a video at a target FPS.
+
+    Video metadata is read once on construction; every iteration opens its
+    own capture, so a source can be iterated more than once. Passing
+    source_indices samples exactly those frames instead of a fixed rate;
+    start_index skips every sample before that source frame (used to
+    resume a partially processed video). The video is a path or anything
+    open_capture accepts.
+
+    Sampling strategies:
+        read: decode every frame and keep every Nth (reference behaviour)
+        grab: advance over unsampled frames with grab() and only retrieve()
+              the sampled ones, skipping colour conversion and copies
+        seek: like grab, but jump with CAP_PROP_POS_FRAMES over gaps longer
+              than seek_min_gap so the demuxer can skip whole GOPs
+    """
+
+    def __init__(
+        self,
+        video_path: Union[str, Path, object],
+        fps: float = FRAMES_PER_SECOND,
+        strategy: str = FRAME_SAMPLING_STRATEGY,
+        seek_min_gap: int = FRAME_SEEK_MIN_GAP,
+        source_indices: Optional[Sequence[int]] = None,
+        start_index: int = 0
+    ):
+        if strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(
+                f"Unknown sampling strategy '{strategy}', expected one of {SAMPLING_STRATEGIES}"
+            )
+
+        self.video = video_path
+        self.video_path = str(getattr(video_path, 'local_path', video_path))
+        self.fps = fps
+        self.strategy = strategy
+        self.seek_min_gap = seek_min_gap
+        self.source_indices = sorted(set(source_indices)) if source_indices is not None else None
+        self.start_index = max(0, start_index)
+
+        cap = open_capture(self.video)
+        self.video_fps = cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        del cap  # Not release(): see open_capture
+
+    @property
+    def is_valid(self) -> bool:
+        """Whether the video could be opened and reports a frame rate."""
+        return self.video_fps > 0
+
+    @property
+    def frame_interval(self) -> int:
+        """Number of decoded frames per sampled frame."""
+        if not self.is_valid:
+            return 1
+        return max(1, round(self.video_fps / self.fps))
+
+    @property
+    def duration(self) -> float:
+        """Video duration in seconds."""
+        if not self.is_valid:
+            return 0.0
+        return self.total_frames / self.video_fps
+
+    def sample_indices(self) -> Iterable[int]:
+        """
+        Source frame indices to sample, in increasing order.
+
+        Unbounded at a fixed rate: iteration stops when the decoder reaches
+        the end of the video, since container frame counts can be approximate.
+        """
+        if self.source_indices is not None:
+            return (index for index in self.source_indices if index >= self.start_index)
+        # Stay on the same fixed-rate grid as an iteration from frame 0
+        first = math.ceil(self.start_index / self.frame_interval) * self.frame_interval
+        return itertools.count(first, self.frame_interval)
+
+    def __len__(self) -> int:
+        """Expected number of sampled frames."""
+        if not self.is_valid:
+            return 0
+        if self.source_indices is not None:
+            return sum(1 for index in self.source_indices if index >= self.start_index)
+        first = math.ceil(self.start_index / self.frame_interval) * self.frame_interval
+        return max(0, math.ceil((self.total_frames - first) / self.frame_interval))
+
+    def __iter__(self) -> Iterator[Frame]:
+        if not self.is_valid:
+            print(f"Warning: Could not read FPS for {self.video_path}")
+            return
+
+        cap = open_capture(self.video)
+        sampler = {
+            "read": self._sample_read,
+            "grab": self._sample_grab,
+            "seek": self._sample_seek,
+        }[self.strategy]
+
+        try:
+            for index, (source_index, image) in enumerate(sampler(cap, self.sample_indices())):
+                yield Frame(
+                    index=index,
+                    source_index=source_index,
+                    timestamp=source_index / self.video_fps,
+                    image=image
+                )
+        finally:
+            del cap  # Not release(): see open_capture
+
+    def _sample_read(
+        self, cap: cv2.VideoCapture, indices: Iterable[int]
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        position = 0
+        for target in indices:
+            while position < target:
+                ret, _ = cap.read()
+                if not ret:
+                    return
+                position += 1
+
+            ret, image = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield target, image
+
+    def _sample_grab(
+        self, cap: cv2.VideoCapture, indices: Iterable[int]
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        position = 0
+        for target in indices:
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+
+            ret, image = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield target, image
+
+    def _sample_seek(
+        self, cap: cv2.VideoCapture, indices: Iterable[int]
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        position = 0
+        for target in indices:
+            if target - position > self.seek_min_gap:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+
+            ret, image = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield target, image
@@ -0,0 +1,203 @@
+"""
+Pool of CPU inference worker processes with fixed core sets.
+
+Each worker process is pinned to its own disjoint set of cores and runs torch
+with a matching number of intra-op threads, so concurrent jobs never compete
+for the same cores and throughput stays predictable. Work (whole videos or
+chunks of frames) is handed to whichever worker is idle.
+"""
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import (
+    BATCH_PIPELINE_WORKERS, INFERENCE_THREADS_PER_WORKER,
+    INFERENCE_INTEROP_THREADS, INFERENCE_PIN_CORES, INFERENCE_BATCH_SIZE,
+    CONGESTION_CONFIDENCE, POTHOLE_CONFIDENCE
+)
+
+
+def available_cores() -> List[int]:
+    """Cores this process may run on (all logical CPUs where affinity is unsupported)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(
+    workers: int,
+    threads_per_worker: int = 0,
+    cores: Optional[Sequence[int]] = None
+) -> List[List[int]]:
+    """
+    Split cores into one disjoint, contiguous set per worker.
+
+    Args:
+        workers: Number of worker processes
+        threads_per_worker: Cores per worker (0 divides all cores evenly)
+        cores: Cores to split (defaults to the cores available to this process)
+
+    Returns:
+        List of core ids for each worker
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    workers = max(1, workers)
+    if threads_per_worker <= 0:
+        threads_per_worker = max(1, len(cores) // workers)
+
+    if workers * threads_per_worker > len(cores):
+        raise ValueError(
+            f"{workers} workers x {threads_per_worker} threads needs "
+            f"{workers * threads_per_worker} cores, only {len(cores)} available"
+        )
+
+    return [
+        cores[i * threads_per_worker:(i + 1) * threads_per_worker]
+        for i in range(workers)
+    ]
+
+
+def configure_torch_threads(threads: int, interop_threads: int = INFERENCE_INTEROP_THREADS):
+    """
+    Set torch's intra-op and inter-op thread counts for this process.
+    Inter-op threads can only be set before torch runs any parallel work.
+    """
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+    try:
+        torch.set_num_interop_threads(max(1, interop_threads))
+    except RuntimeError:
+        pass
+
+
+def init_inference_worker(core_sets, interop_threads: int, pin_cores: bool, warmup: bool):
+    """
+    Initializer for inference worker processes.
+    Takes the next free core set, pins the process to it, sizes torch's
+    thread pools to match and warms up this worker's own models.
+    """
+    cores = core_sets.get()
+    if pin_cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    configure_torch_threads(len(cores), interop_threads)
+
+    if warmup:
+        from app.services.model_registry import model_registry
+        model_registry.warmup()
+    print(f"Inference worker {os.getpid()} ready on cores {cores} ({len(cores)} torch threads)", flush=True)
+
+
+def detect_frames(images: List[np.ndarray], batch_size: int = INFERENCE_BATCH_SIZE) -> List[dict]:
+    """
+    Run both models over a chunk of frames in the current worker.
+
+    Args:
+        images: BGR frames as decoded by OpenCV
+        batch_size: Frames per model call
+
+    Returns:
+        Per-frame dicts with 'congestion' and 'pothole' detections, each a
+        list of (class id, confidence, xyxy) tuples
+    """
+    from app.services.model_registry import model_registry
+
+    confidence = {"congestion": CONGESTION_CONFIDENCE, "pothole": POTHOLE_CONFIDENCE}
+    detections = [{name: [] for name in confidence} for _ in images]
+
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        for name, conf in confidence.items():
+            results = model_registry.get(name)(
+                batch, device=model_registry.device, conf=conf, batch=len(batch), verbose=False
+            )
+            for offset, result in enumerate(results):
+                boxes = result.boxes
+                detections[start + offset][name] = list(zip(
+                    boxes.cls.cpu().numpy().astype(int).tolist(),
+                    boxes.conf.cpu().numpy().tolist(),
+                    boxes.xyxy.cpu().numpy().tolist()
+                ))
+
+    return detections
+
+
+class InferencePool:
+    """
+    Inference worker processes, one per core set.
+
+    Tasks are queued and picked up by the first idle worker, so long videos
+    and short ones (or frame chunks of uneven cost) balance across workers.
+    Use as a context manager, or call shutdown() when done.
+    """
+
+    def __init__(
+        self,
+        workers: int = BATCH_PIPELINE_WORKERS,
+        threads_per_worker: int = INFERENCE_THREADS_PER_WORKER,
+        interop_threads: int = INFERENCE_INTEROP_THREADS,
+        pin_cores: bool = INFERENCE_PIN_CORES,
+        warmup: bool = True
+    ):
+        self.core_sets = partition_cores(workers, threads_per_worker)
+        self.workers = len(self.core_sets)
+        self.threads_per_worker = len(self.core_sets[0])
+
+        # Spawn rather than fork: the parent may already hold torch models and threads
+        context = multiprocessing.get_context("spawn")
+        core_queue = context.Queue()
+        for cores in self.core_sets:
+            core_queue.put(cores)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=init_inference_worker,
+            initargs=(core_queue, interop_threads, pin_cores, warmup)
+        )
+        print(
+            f"Inference pool: {self.workers} worker(s) x {self.threads_per_worker} threads"
+            f"{' (pinned)' if pin_cores else ''}", flush=True
+        )
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for the next idle worker."""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def detect_frames(
+        self,
+        images: List[np.ndarray],
+        chunk_size: int = INFERENCE_BATCH_SIZE * 4,
+        batch_size: int = INFERENCE_BATCH_SIZE
+    ) -> List[dict]:
+        """
+        Spread frames over the workers in chunks and collect results in order.
+
+        Args:
+            images: BGR frames as decoded by OpenCV
+            chunk_size: Frames per task
+            batch_size: Frames per model call within a task
+
+        Returns:
+            Per-frame detections as returned by detect_frames()
+        """
+        futures = [
+            self.submit(detect_frames, images[start:start + chunk_size], batch_size)
+            for start in range(0, len(images), chunk_size)
+        ]
+        detections = []
+        for future in futures:
+            detections.extend(future.result())
+        return detections
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
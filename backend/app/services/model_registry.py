@@ -0,0 +1,207 @@
+"""
+Lazy, process-wide registry for the YOLO detection models.
+
+Models are loaded on first use and shared by every pipeline in the process,
+so importing the pipelines (and therefore starting the API) never blocks on
+torch, and a process that never runs inference never loads a model.
+
+The inference backend is pluggable: "torch" runs the .pt weights directly,
+while "onnx" and "openvino" export them once with ultralytics and run the
+exported artifact. Exports are cached next to the .pt files and redone when
+the weights are newer than the export. All backends go through the same
+ultralytics predictor, so pre/post-processing and detection semantics match.
+With the onnx backend, MODEL_PRECISION selects an INT8 quantized variant of
+the export (see app.services.quantization).
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from app.core.config import (
+    CONGESTION_MODEL_PATH, POTHOLE_MODEL_PATH,
+    INFERENCE_BACKEND, INFERENCE_IMGSZ, MODEL_PRECISION
+)
+from app.services.quantization import MODEL_PRECISIONS, quantize_onnx_model
+
+
+# Registered model names and their weights
+MODEL_PATHS = {
+    "congestion": CONGESTION_MODEL_PATH,
+    "pothole": POTHOLE_MODEL_PATH,
+}
+
+INFERENCE_BACKENDS = ("torch", "onnx", "openvino")
+
+
+def exported_model_path(weights_path: Union[str, Path], backend: str) -> Path:
+    """
+    Where ultralytics writes the export of a .pt file for a backend.
+
+    Args:
+        weights_path: Path to the .pt weights
+        backend: Inference backend name
+
+    Returns:
+        Path to the model file (torch/onnx) or model directory (openvino)
+    """
+    weights_path = Path(weights_path)
+    if backend == "torch":
+        return weights_path
+    if backend == "onnx":
+        return weights_path.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights_path.with_name(f"{weights_path.stem}_openvino_model")
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+
+
+def export_model(
+    weights_path: Union[str, Path],
+    backend: str,
+    imgsz: int = INFERENCE_IMGSZ,
+    force: bool = False
+) -> Path:
+    """
+    Export .pt weights for a backend, reusing a cached export when it is
+    newer than the weights.
+
+    Args:
+        weights_path: Path to the .pt weights
+        backend: "onnx" or "openvino"
+        imgsz: Export input size
+        force: Re-export even if a cached export exists
+
+    Returns:
+        Path to the exported model
+    """
+    weights_path = Path(weights_path)
+    target = exported_model_path(weights_path, backend)
+    if backend == "torch":
+        return target
+
+    if (
+        not force
+        and target.exists()
+        and target.stat().st_mtime >= weights_path.stat().st_mtime
+    ):
+        return target
+
+    from ultralytics import YOLO
+
+    start = time.perf_counter()
+    print(f"Exporting {weights_path.name} to {backend}...")
+    # Dynamic axes so batched inference works with the exported model
+    exported = YOLO(str(weights_path)).export(format=backend, imgsz=imgsz, dynamic=True)
+    print(f"Exported {weights_path.name} to {exported} in {time.perf_counter() - start:.1f}s")
+
+    return Path(exported)
+
+
+class ModelRegistry:
+    """Loads each registered model once per process, on first use."""
+
+    def __init__(
+        self,
+        model_paths: Dict[str, Union[str, Path]] = MODEL_PATHS,
+        backend: str = INFERENCE_BACKEND,
+        precision: str = MODEL_PRECISION
+    ):
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+        if precision not in MODEL_PRECISIONS:
+            raise ValueError(f"Unknown model precision '{precision}', expected one of {MODEL_PRECISIONS}")
+        if precision != "fp32" and backend != "onnx":
+            raise ValueError(f"Model precision '{precision}' needs the onnx backend, not '{backend}'")
+
+        self._model_paths = dict(model_paths)
+        self.backend = backend
+        self.precision = precision
+        self._models = {}
+        self._device = None
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> list:
+        return list(self._model_paths)
+
+    @property
+    def device(self):
+        """Inference device: first CUDA GPU for torch if available, else CPU."""
+        if self._device is None:
+            if self.backend == "torch":
+                import torch
+                self._device = 0 if torch.cuda.is_available() else 'cpu'
+            else:
+                self._device = 'cpu'
+        return self._device
+
+    def input_tensor(self, array: np.ndarray):
+        """
+        Wrap a preprocessed NCHW float batch (see app.services.preprocess)
+        as model input. The ultralytics predictor takes a tensor as already
+        letterboxed and normalised and skips its own preprocessing.
+
+        Args:
+            array: Letterboxed, normalised batch
+
+        Returns:
+            torch tensor sharing the array's memory
+        """
+        import torch
+        return torch.from_numpy(np.ascontiguousarray(array))
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str):
+        """
+        Get a model by name, loading (and if needed exporting) it on first use.
+
+        Args:
+            name: Registered model name ("congestion" or "pothole")
+
+        Returns:
+            The shared model instance
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            if name not in self._models:
+                if name not in self._model_paths:
+                    raise KeyError(f"Unknown model '{name}', expected one of {self.names}")
+
+                from ultralytics import YOLO
+
+                model_path = export_model(self._model_paths[name], self.backend)
+                model_path = quantize_onnx_model(model_path, self.precision)
+
+                start = time.perf_counter()
+                print(f"Loading {name} model ({self.backend}, {self.precision})...")
+                self._models[name] = YOLO(str(model_path), task="detect")
+                print(f"{name} model loaded on {self.device} in {time.perf_counter() - start:.2f}s")
+
+        return self._models[name]
+
+    def warmup(self, names: Optional[Iterable[str]] = None, imgsz: int = INFERENCE_IMGSZ):
+        """
+        Load models and run one inference on a blank frame so the first real
+        request does not pay for lazy initialisation.
+
+        Args:
+            names: Models to warm up (defaults to all registered models)
+            imgsz: Size of the square dummy frame
+        """
+        dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        for name in names or self.names:
+            start = time.perf_counter()
+            self.get(name)(dummy, device=self.device, verbose=False)
+            print(f"{name} model warmed up in {time.perf_counter() - start:.2f}s")
+
+
+# Singleton instance
+model_registry = ModelRegistry()
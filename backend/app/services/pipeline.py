@@ -1,26 +1,20 @@
 import cv2
 import json
-import shutil
-import torch
+import numpy as np
 from pathlib import Path
-from ultralytics import YOLO
-from shapely.geometry import Polygon
-from shapely.ops import unary_union
 from datetime import datetime
 from app.core.config import (
-    CONGESTION_MODEL_PATH, POTHOLE_MODEL_PATH, 
     CONGESTION_OUTPUT_DIR, POTHOLE_OUTPUT_DIR, 
-    ANNOTATED_VIDEOS_DIR, FRAMES_FOLDER, 
+    ANNOTATED_VIDEOS_DIR,
     FRAMES_PER_SECOND, CONGESTION_CONFIDENCE, POTHOLE_CONFIDENCE,
-    SAVE_ANNOTATED_VIDEOS, PROCESSED_VIDEOS_FILE
+    SAVE_ANNOTATED_VIDEOS, PROCESSED_VIDEOS_FILE, FRAME_DEDUP_ENABLED,
+    FRAME_QUALITY_FILTER
 )
-
-# Load models globally to avoid reloading
-print("Loading models...")
-device = 0 if torch.cuda.is_available() else 'cpu'
-congestion_model = YOLO(str(CONGESTION_MODEL_PATH))
-pothole_model = YOLO(str(POTHOLE_MODEL_PATH))
-print(f"Models loaded on {device}")
+from app.services.frames import Frame, VideoFrameSource
+from app.services.frame_filters import DuplicateFrameGate, FrameQualityGate
+from app.services.model_registry import model_registry
+from app.services.road_roi import crop_road, road_roi_top
+from app.utils.geometry import coverage_by_label, rectangles_union_area
 
 def extract_date_from_filename(filename):
     """Extract date from video filename in format: YYYY-MM-DD_HH-MM-SS.mp4"""
@@ -30,93 +24,57 @@ def extract_date_from_filename(filename):
     except:
         return datetime.now().strftime("%Y-%m-%d")
 
-def cleanup_temp_frames():
-    """Clean up temporary frames folder."""
-    if FRAMES_FOLDER.exists():
-        for item in FRAMES_FOLDER.iterdir():
-            try:
-                if item.is_file():
-                    item.unlink()
-                elif item.is_dir():
-                    shutil.rmtree(item)
-            except Exception as e:
-                print(f"Warning: Could not delete {item}: {e}")
-
-def extract_frames_at_fps(video_path, output_dir, fps=10):
-    """Extract frames from video at specified FPS."""
-    cap = cv2.VideoCapture(str(video_path))
-    video_fps = cap.get(cv2.CAP_PROP_FPS)
-    
-    if video_fps == 0:
-        print(f"Warning: Could not read FPS for {video_path}")
-        cap.release()
-        return []
-    
-    frame_interval = max(1, round(video_fps / fps))
-    frames = []
-    frame_count = 0
-    saved_count = 0
-    video_name = Path(video_path).stem
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if frame_count % frame_interval == 0:
-            frame_filename = f"{video_name}_frame_{saved_count}.jpg"
-            frame_path = output_dir / frame_filename
-            cv2.imwrite(str(frame_path), frame)
-            frames.append(frame_path)
-            saved_count += 1
-        
-        frame_count += 1
-    
-    cap.release()
-    return frames
+def _result_boxes(results, y_offset=0):
+    """
+    Flatten model results into raw boxes as stored for annotation
+    (class name, confidence and xyxy bbox) plus an (N, 4) xyxy array.
+    y_offset shifts boxes from a road crop back to full-frame coordinates.
+    """
+    boxes = []
+    xyxy_parts = []
+    for result in results:
+        xyxy = result.boxes.xyxy.cpu().numpy().astype(np.float64)
+        xyxy[:, [1, 3]] += y_offset
+        class_ids = result.boxes.cls.cpu().numpy().astype(int)
+        confidences = result.boxes.conf.cpu().numpy().astype(np.float64)
+        xyxy_parts.append(xyxy)
+        for class_id, confidence, bbox in zip(class_ids, confidences, xyxy.tolist()):
+            boxes.append({
+                'class': result.names[class_id],
+                'confidence': float(confidence),
+                'bbox': bbox
+            })
+    xyxy = np.concatenate(xyxy_parts) if xyxy_parts else np.zeros((0, 4))
+    return boxes, xyxy
 
-def run_congestion_detection(frame_path, model, device):
-    results = model(str(frame_path), device=device, conf=CONGESTION_CONFIDENCE, verbose=False)
-    img = cv2.imread(str(frame_path))
-    h, w, _ = img.shape
-    img_area = h * w
+def run_congestion_detection(frame: Frame, model, device):
+    """
+    Run the congestion model on a frame.
+    Returns (detections, boxes) where boxes are the raw detections used for annotation.
+    """
+    results = model(frame.image, device=device, conf=CONGESTION_CONFIDENCE, verbose=False)
+    boxes, xyxy = _result_boxes(results)
+    class_names = [box['class'] for box in boxes]
     
     detections = {}
-    vehicle_polys = {}
-    all_vehicle_polys = []
-    
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls[0].item())
-            class_name = result.names[class_id]
-            x1, y1, x2, y2 = map(float, box.xyxy[0])
-            poly = Polygon([(x1,y1),(x2,y1),(x2,y2),(x1,y2)])
-            
-            detections[class_name] = detections.get(class_name, 0) + 1
-            
-            if class_name not in vehicle_polys:
-                vehicle_polys[class_name] = []
-            vehicle_polys[class_name].append(poly)
-            all_vehicle_polys.append(poly)
+    for class_name in class_names:
+        detections[class_name] = detections.get(class_name, 0) + 1
     
-    for class_name, polys in vehicle_polys.items():
-        if polys:
-            union = unary_union(polys)
-            detections[f"{class_name}_coverage"] = round(union.area / img_area, 6)
+    class_coverage, total_coverage = coverage_by_label(xyxy, class_names, frame.area)
+    for class_name in list(detections):
+        detections[f"{class_name}_coverage"] = round(class_coverage[class_name], 6)
+    detections["total_vehicle_coverage"] = round(total_coverage, 6)
     
-    if all_vehicle_polys:
-        total_union = unary_union(all_vehicle_polys)
-        detections["total_vehicle_coverage"] = round(total_union.area / img_area, 6)
-    else:
-        detections["total_vehicle_coverage"] = 0.0
-    
-    return detections
+    return detections, boxes
 
-def run_pothole_detection(frame_path, model, device):
-    results = model(str(frame_path), device=device, conf=POTHOLE_CONFIDENCE, verbose=False)
-    img = cv2.imread(str(frame_path))
-    h, w, _ = img.shape
-    img_area = h * w
+def run_pothole_detection(frame: Frame, model, device, roi_top=0.0):
+    """
+    Run the pothole model on a frame, or on its road crop when roi_top > 0.
+    Returns (detections, boxes) where boxes are the raw detections used for annotation.
+    """
+    road, y_offset = crop_road(frame.image, roi_top)
+    results = model(road, device=device, conf=POTHOLE_CONFIDENCE, verbose=False)
+    boxes, xyxy = _result_boxes(results, y_offset)
     
     output = {
         "potholes": 0,
@@ -126,30 +84,46 @@ def run_pothole_detection(frame_path, model, device):
         "total_pothole_size": 0.0
     }
     
-    pothole_polys = []
+    is_pothole = np.zeros(len(boxes), dtype=bool)
     
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls[0].item())
-            class_name = result.names[class_id]
-            x1, y1, x2, y2 = map(float, box.xyxy[0])
-            
-            if class_name.lower() in ['pothole', 'potholes']:
-                output["potholes"] += 1
-                poly = Polygon([(x1,y1),(x2,y1),(x2,y2),(x1,y2)])
-                pothole_polys.append(poly)
-            elif class_name.lower() in ['road_crack', 'road_cracks', 'crack', 'cracks']:
-                output["road_cracks"] += 1
-            elif class_name.lower() in ['barricade', 'barricades']:
-                output["barricades"] += 1
-            elif class_name.lower() in ['bad_road', 'bad road']:
-                output["bad_road"] += 1
+    for i, box in enumerate(boxes):
+        class_name = box['class']
+        
+        if class_name.lower() in ['pothole', 'potholes']:
+            output["potholes"] += 1
+            is_pothole[i] = True
+        elif class_name.lower() in ['road_crack', 'road_cracks', 'crack', 'cracks']:
+            output["road_cracks"] += 1
+        elif class_name.lower() in ['barricade', 'barricades']:
+            output["barricades"] += 1
+        elif class_name.lower() in ['bad_road', 'bad road']:
+            output["bad_road"] += 1
     
-    if pothole_polys:
-        union = unary_union(pothole_polys)
-        output["total_pothole_size"] = round(union.area / img_area, 6)
+    if is_pothole.any():
+        output["total_pothole_size"] = round(rectangles_union_area(xyxy[is_pothole]) / frame.area, 6)
     
-    return output
+    return output, boxes
+
+def annotate_frame(frame, congestion_boxes, pothole_boxes):
+    """Draw stored congestion and pothole boxes onto a frame in place."""
+    for box in congestion_boxes:
+        x1, y1, x2, y2 = map(int, box['bbox'])
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{box['class']}: {box['confidence']:.2f}", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    
+    for box in pothole_boxes:
+        x1, y1, x2, y2 = map(int, box['bbox'])
+        class_name = box['class']
+        
+        if 'pothole' in class_name.lower(): color = (0, 0, 255)
+        elif 'bad' in class_name.lower(): color = (255, 0, 0)
+        elif 'barricade' in class_name.lower(): color = (0, 255, 255)
+        else: color = (255, 0, 255)
+        
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{class_name}: {box['confidence']:.2f}", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    
+    return frame
 
 def load_existing_results(json_path):
     if json_path.exists():
@@ -187,44 +161,40 @@ def update_processed_list(video_filename):
     with open(PROCESSED_VIDEOS_FILE, 'w') as f:
         json.dump(processed_list, f, indent=2)
 
-def process_video_pipeline(video_path: Path):
+def detect_video(video_path: Path):
     """
-    Process a single video through both models.
-    Returns paths to the generated JSON files.
+    Run both models over a single video without touching the shared JSON files,
+    so it can run in parallel worker processes.
+    Returns a dict with the per-frame detections, or None if no frames could be read.
     """
     video_name = video_path.name
     video_stem = video_path.stem
     video_date = extract_date_from_filename(video_stem)
+    congestion_model = model_registry.get("congestion")
+    pothole_model = model_registry.get("pothole")
+    device = model_registry.device
     
     print(f"Processing video: {video_name}")
     
-    # Extract frames
-    frames = extract_frames_at_fps(video_path, FRAMES_FOLDER, fps=FRAMES_PER_SECOND)
-    if not frames:
+    # Decode frames in memory
+    frame_source = VideoFrameSource(video_path, fps=FRAMES_PER_SECOND)
+    if not frame_source.is_valid:
         print(f"No frames extracted from {video_name}")
-        return None, None
+        return None
+    roi_top = road_roi_top(video_path)
 
-    # Load existing results to append/update
-    congestion_json_path = CONGESTION_OUTPUT_DIR / "detections.json"
-    pothole_json_path = POTHOLE_OUTPUT_DIR / "detections.json"
-    
-    congestion_results = load_existing_results(congestion_json_path)
-    pothole_results = load_existing_results(pothole_json_path)
-    
-    if video_date not in congestion_results:
-        congestion_results[video_date] = {}
-    if video_date not in pothole_results:
-        pothole_results[video_date] = {}
+    congestion_results = {}
+    pothole_results = {}
+    duplicate_gate = DuplicateFrameGate() if FRAME_DEDUP_ENABLED else None
+    quality_gate = FrameQualityGate() if FRAME_QUALITY_FILTER else None
+    congestion_det, congestion_boxes = {}, []
+    pothole_det, pothole_boxes = {}, []
+    frames_read = 0
     
     video_writer = None
     try:
         if SAVE_ANNOTATED_VIDEOS:
-            first_frame = cv2.imread(str(frames[0]))
-            if first_frame is None:
-                print(f"Error: Could not read first frame {frames[0]}")
-                return None, None
-                
-            height, width = first_frame.shape[:2]
+            height, width = frame_source.height, frame_source.width
             output_video_path = ANNOTATED_VIDEOS_DIR / f"{video_stem}_annotated.mp4"
             
             # Try avc1 codec for macOS compatibility, fallback to mp4v
@@ -238,55 +208,34 @@ def process_video_pipeline(video_path: Path):
             
             print(f"Saving annotated video to: {output_video_path}")
     
-        for idx, frame_path in enumerate(frames):
-            frame_name = frame_path.name
-            frame = cv2.imread(str(frame_path))
-            
-            if frame is None:
-                print(f"Warning: Could not read frame {frame_path}")
+        for source_frame in frame_source:
+            frames_read += 1
+            frame_name = f"{video_stem}_frame_{source_frame.index}.jpg"
+
+            # Dark, occluded or blurred frames never reach the models, and are
+            # left out of the annotated video rather than shown without boxes
+            if quality_gate is not None and quality_gate.check(source_frame.image):
                 continue
 
+            # Near-identical to the last inferred frame: keep the previous detections
+            reuse = duplicate_gate is not None and duplicate_gate.is_duplicate(source_frame.image)
+
             # Congestion
-            congestion_det = run_congestion_detection(frame_path, congestion_model, device)
+            if not reuse:
+                congestion_det, congestion_boxes = run_congestion_detection(source_frame, congestion_model, device)
             if congestion_det:
-                congestion_results[video_date][frame_name] = congestion_det
-                
-                if SAVE_ANNOTATED_VIDEOS:
-                    results = congestion_model(str(frame_path), device=device, conf=CONGESTION_CONFIDENCE, verbose=False)
-                    for result in results:
-                        for box in result.boxes:
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            class_name = result.names[int(box.cls[0].item())]
-                            conf = box.conf[0].item()
-                            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                            cv2.putText(frame, f"{class_name}: {conf:.2f}", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                congestion_results[frame_name] = congestion_det
 
             # Pothole
-            pothole_det = run_pothole_detection(frame_path, pothole_model, device)
+            if not reuse:
+                pothole_det, pothole_boxes = run_pothole_detection(source_frame, pothole_model, device, roi_top)
             filtered_pothole_det = {k: v for k, v in pothole_det.items() if v > 0}
             if filtered_pothole_det:
-                pothole_results[video_date][frame_name] = filtered_pothole_det
-            
-            if SAVE_ANNOTATED_VIDEOS:
-                results = pothole_model(str(frame_path), device=device, conf=POTHOLE_CONFIDENCE, verbose=False)
-                for result in results:
-                    for box in result.boxes:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        class_name = result.names[int(box.cls[0].item())]
-                        conf = box.conf[0].item()
-                        
-                        if 'pothole' in class_name.lower(): color = (0, 0, 255)
-                        elif 'bad' in class_name.lower(): color = (255, 0, 0)
-                        elif 'barricade' in class_name.lower(): color = (0, 255, 255)
-                        else: color = (255, 0, 255)
-                        
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                        cv2.putText(frame, f"{class_name}: {conf:.2f}", (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                pothole_results[frame_name] = filtered_pothole_det
 
+            # Annotate from the stored detections instead of re-running the models
             if SAVE_ANNOTATED_VIDEOS and video_writer:
-                video_writer.write(frame)
-            
-            frame_path.unlink() # Delete temp frame
+                video_writer.write(annotate_frame(source_frame.image, congestion_boxes, pothole_boxes))
 
     except Exception as e:
         print(f"Error in processing loop: {e}")
@@ -297,9 +246,54 @@ def process_video_pipeline(video_path: Path):
             video_writer.release()
             print("Video writer released")
     
+    if frames_read == 0:
+        print(f"No frames extracted from {video_name}")
+        return None
+    
+    if duplicate_gate is not None:
+        print(f"Skipped {duplicate_gate.skipped} near-duplicate frames in {video_name}")
+    if quality_gate is not None:
+        print(f"Rejected {quality_gate.total_rejected} low-quality frames in {video_name}: {quality_gate.rejected}")
+    
+    return {
+        "video_name": video_name,
+        "video_date": video_date,
+        "congestion": congestion_results,
+        "pothole": pothole_results
+    }
+
+def save_video_detections(detections):
+    """
+    Merge one video's detections into the shared JSON files and mark it processed.
+    Must only be called from a single process at a time.
+    Returns paths to the updated JSON files.
+    """
+    video_date = detections["video_date"]
+    
+    # Load existing results to append/update
+    congestion_json_path = CONGESTION_OUTPUT_DIR / "detections.json"
+    pothole_json_path = POTHOLE_OUTPUT_DIR / "detections.json"
+    
+    congestion_results = load_existing_results(congestion_json_path)
+    pothole_results = load_existing_results(pothole_json_path)
+    
+    congestion_results.setdefault(video_date, {}).update(detections["congestion"])
+    pothole_results.setdefault(video_date, {}).update(detections["pothole"])
+    
     save_results(congestion_results, congestion_json_path)
     save_results(pothole_results, pothole_json_path)
     
-    update_processed_list(video_name)
+    update_processed_list(detections["video_name"])
     
     return congestion_json_path, pothole_json_path
+
+def process_video_pipeline(video_path: Path):
+    """
+    Process a single video through both models.
+    Returns paths to the generated JSON files.
+    """
+    detections = detect_video(video_path)
+    if detections is None:
+        return None, None
+    
+    return save_video_detections(detections)
@@ -0,0 +1,108 @@
+"""
+Shared input preprocessing for the detection models.
+
+Left to themselves, the congestion and pothole models each resize,
+letterbox and normalise every frame. Here a batch of frames is letterboxed
+once into a single normalised array that both models consume, and the
+geometry of the letterbox is kept so detections can be mapped back to
+original frame coordinates for the coverage maths.
+
+The letterbox matches the ultralytics predictor's: the long side is scaled
+to imgsz and the short side padded (grey, 114) up to the next multiple of
+the model stride, centred.
+"""
+from typing import List, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import INFERENCE_IMGSZ
+
+
+# Input sizes must be multiples of the detectors' largest stride
+MODEL_STRIDE = 32
+
+_PAD_VALUE = 114
+
+
+class Letterbox(NamedTuple):
+    """How original frames were placed into the model input."""
+    scale: float     # Input pixels per frame pixel
+    pad_left: int    # Input columns before the first frame column
+    pad_top: int     # Input rows before the first frame row
+    width: int       # Original frame width
+    height: int      # Original frame height
+
+    def crop_rows(self, input_row: int) -> "Letterbox":
+        """Geometry of the input with its first input_row rows removed."""
+        return self._replace(pad_top=self.pad_top - input_row)
+
+    def input_row(self, frame_row: int, stride: int = MODEL_STRIDE) -> int:
+        """Input row at or above frame_row, rounded down to a multiple of stride."""
+        row = int(self.pad_top + frame_row * self.scale)
+        return max(0, row - row % stride)
+
+    def to_frame(self, xyxy: np.ndarray) -> np.ndarray:
+        """
+        Map (N, 4) xyxy boxes from input coordinates to frame coordinates,
+        clipped to the frame.
+        """
+        boxes = np.empty_like(xyxy, dtype=np.float64)
+        boxes[:, [0, 2]] = (xyxy[:, [0, 2]] - self.pad_left) / self.scale
+        boxes[:, [1, 3]] = (xyxy[:, [1, 3]] - self.pad_top) / self.scale
+        np.clip(boxes[:, [0, 2]], 0, self.width, out=boxes[:, [0, 2]])
+        np.clip(boxes[:, [1, 3]], 0, self.height, out=boxes[:, [1, 3]])
+        return boxes
+
+
+def letterbox_geometry(height: int, width: int, imgsz: int = INFERENCE_IMGSZ, stride: int = MODEL_STRIDE) -> Tuple[Letterbox, Tuple[int, int], Tuple[int, int]]:
+    """
+    Work out where a frame goes in the model input.
+
+    Returns:
+        Tuple of (letterbox, (resized width, resized height), (input width,
+        input height))
+    """
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    pad_w = (imgsz - new_w) % stride
+    pad_h = (imgsz - new_h) % stride
+    left = round(pad_w / 2 - 0.1)
+    top = round(pad_h / 2 - 0.1)
+    letterbox = Letterbox(scale=scale, pad_left=left, pad_top=top, width=width, height=height)
+    return letterbox, (new_w, new_h), (new_w + pad_w, new_h + pad_h)
+
+
+def letterbox_images(
+    images: List[np.ndarray],
+    imgsz: int = INFERENCE_IMGSZ,
+    stride: int = MODEL_STRIDE
+) -> Tuple[np.ndarray, Letterbox]:
+    """
+    Letterbox and normalise a batch of same-sized frames into one model input.
+
+    Args:
+        images: BGR frames as decoded by OpenCV, all the same size
+        imgsz: Target size of the long side
+        stride: Input sides are padded to a multiple of this
+
+    Returns:
+        Tuple of ((N, 3, H, W) float32 RGB array in [0, 1], letterbox
+        geometry shared by every frame)
+    """
+    height, width = images[0].shape[:2]
+    letterbox, (new_w, new_h), (input_w, input_h) = letterbox_geometry(height, width, imgsz, stride)
+
+    batch = np.full((len(images), input_h, input_w, 3), _PAD_VALUE, dtype=np.uint8)
+    top, left = letterbox.pad_top, letterbox.pad_left
+    for i, image in enumerate(images):
+        if image.shape[:2] != (height, width):
+            raise ValueError(f"Frames in a batch must share a size, got {image.shape[:2]} and {(height, width)}")
+        if (new_w, new_h) != (width, height):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        batch[i, top:top + new_h, left:left + new_w] = image
+
+    # BGR -> RGB, NHWC -> NCHW, uint8 -> [0, 1]
+    tensor = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+    tensor /= 255.0
+    return tensor, letterbox
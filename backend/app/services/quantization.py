@@ -0,0 +1,187 @@
+"""
+Post-training INT8 quantization of the exported ONNX detection models.
+
+"int8-dynamic" stores weights as INT8 and quantizes activations on the fly,
+so it needs no data. "int8-static" also fixes activation ranges ahead of
+time from calibration frames sampled from our own videos, which is faster
+on CPU but only as accurate as the calibration set is representative.
+
+The Detect head (box decoding and the final concat) is left in FP32 for
+static quantization: box coordinates span 0..imgsz while class scores span
+0..1, and a shared INT8 range for both loses most of the coordinate
+precision.
+"""
+import re
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import (
+    INFERENCE_IMGSZ, QUANTIZATION_CALIBRATION_DIR, QUANTIZATION_CALIBRATION_FRAMES
+)
+from app.services.frames import VideoFrameSource
+from app.services.preprocess import letterbox_images
+
+
+MODEL_PRECISIONS = ("fp32", "int8-dynamic", "int8-static")
+
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mov")
+
+
+def quantized_model_path(onnx_path: Union[str, Path], precision: str) -> Path:
+    """
+    Where the quantized variant of an exported ONNX model is cached.
+
+    Args:
+        onnx_path: Path to the FP32 .onnx export
+        precision: One of MODEL_PRECISIONS
+
+    Returns:
+        Path to the model file for that precision
+    """
+    onnx_path = Path(onnx_path)
+    if precision not in MODEL_PRECISIONS:
+        raise ValueError(f"Unknown model precision '{precision}', expected one of {MODEL_PRECISIONS}")
+    if precision == "fp32":
+        return onnx_path
+    return onnx_path.with_name(f"{onnx_path.stem}_{precision.replace('-', '_')}.onnx")
+
+
+def load_calibration_frames(
+    source: Union[str, Path, Sequence[Union[str, Path]]] = QUANTIZATION_CALIBRATION_DIR,
+    max_frames: int = QUANTIZATION_CALIBRATION_FRAMES
+) -> List[np.ndarray]:
+    """
+    Sample calibration frames spread evenly over a set of videos.
+
+    Args:
+        source: Directory of videos, or a list of video paths
+        max_frames: Total number of frames to return
+
+    Returns:
+        BGR frames, up to max_frames
+    """
+    if isinstance(source, (str, Path)):
+        videos = sorted(p for p in Path(source).iterdir() if p.suffix.lower() in VIDEO_SUFFIXES)
+    else:
+        videos = [Path(p) for p in source]
+
+    per_video = -(-max_frames // max(1, len(videos)))
+    images = []
+    for video_path in videos:
+        probe = VideoFrameSource(video_path)
+        if not probe.is_valid or probe.total_frames <= 0:
+            continue
+        count = min(per_video, probe.total_frames, max_frames - len(images))
+        indices = np.linspace(0, probe.total_frames - 1, count).round().astype(int)
+        source_frames = VideoFrameSource(video_path, strategy="seek", source_indices=indices.tolist())
+        images.extend(frame.image for frame in source_frames)
+        if len(images) >= max_frames:
+            break
+
+    return images
+
+
+def _detect_head_nodes(model) -> List[str]:
+    """Names of the nodes in the last /model.N/ block of an ultralytics export (the Detect head)."""
+    pattern = re.compile(r"/model\.(\d+)/")
+    blocks = [
+        (int(match.group(1)), node.name)
+        for node in model.graph.node
+        for match in [pattern.search(node.name)]
+        if match
+    ]
+    if not blocks:
+        return []
+    head = max(block for block, _ in blocks)
+    return [name for block, name in blocks if block == head]
+
+
+def quantize_onnx_model(
+    onnx_path: Union[str, Path],
+    precision: str,
+    calibration_images: Optional[List[np.ndarray]] = None,
+    imgsz: int = INFERENCE_IMGSZ,
+    force: bool = False
+) -> Path:
+    """
+    Quantize an FP32 ONNX export, reusing a cached variant when it is newer
+    than the export.
+
+    Args:
+        onnx_path: Path to the FP32 .onnx export
+        precision: "int8-dynamic" or "int8-static" ("fp32" returns onnx_path)
+        calibration_images: BGR frames for static calibration (defaults to
+            frames sampled from QUANTIZATION_CALIBRATION_DIR)
+        imgsz: Model input size the calibration frames are letterboxed to
+        force: Re-quantize even if a cached variant exists
+
+    Returns:
+        Path to the quantized model
+    """
+    onnx_path = Path(onnx_path)
+    target = quantized_model_path(onnx_path, precision)
+    if precision == "fp32":
+        return target
+
+    if (
+        not force
+        and target.exists()
+        and target.stat().st_mtime >= onnx_path.stat().st_mtime
+    ):
+        return target
+
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+        quantize_dynamic, quantize_static
+    )
+
+    source_model = onnx.load(str(onnx_path))
+    start = time.perf_counter()
+
+    if precision == "int8-dynamic":
+        print(f"Quantizing {onnx_path.name} to dynamic INT8...")
+        quantize_dynamic(str(onnx_path), str(target), weight_type=QuantType.QUInt8)
+    else:
+        if calibration_images is None:
+            calibration_images = load_calibration_frames()
+        if not calibration_images:
+            raise ValueError(
+                f"No calibration frames for static quantization of {onnx_path.name}; "
+                f"add videos to {QUANTIZATION_CALIBRATION_DIR}"
+            )
+
+        input_name = source_model.graph.input[0].name
+
+        class FrameCalibrationReader(CalibrationDataReader):
+            def __init__(self):
+                self._images = iter(calibration_images)
+
+            def get_next(self):
+                image = next(self._images, None)
+                if image is None:
+                    return None
+                return {input_name: letterbox_images([image], imgsz)[0]}
+
+        print(f"Quantizing {onnx_path.name} to static INT8 with {len(calibration_images)} calibration frames...")
+        quantize_static(
+            str(onnx_path), str(target), FrameCalibrationReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=_detect_head_nodes(source_model)
+        )
+
+    # Keep the export's metadata (class names, stride, imgsz) for ultralytics
+    quantized = onnx.load(str(target))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source_model.metadata_props)
+    onnx.save(quantized, str(target))
+
+    print(f"Quantized {onnx_path.name} to {target.name} in {time.perf_counter() - start:.1f}s")
+    return target
@@ -0,0 +1,123 @@
+"""
+Road region of interest for the pothole detector.
+Road damage only appears below the horizon of a dashcam image, so the
+pothole model can run on the lower part of each frame. The crop is a band
+of full-width rows starting at a fraction of the frame height; detections
+are shifted back down by the crop offset to full-frame coordinates.
+"""
+from pathlib import Path
+from typing import Iterable, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.core.config import (
+    POTHOLE_ROI_MODE, POTHOLE_ROI_TOP, POTHOLE_ROI_HORIZON_SAMPLES,
+    POTHOLE_ROI_HORIZON_MARGIN, POTHOLE_ROI_MIN_TOP, POTHOLE_ROI_MAX_TOP
+)
+from app.services.frames import VideoFrameSource
+
+
+ROI_MODES = ("none", "fixed", "horizon")
+
+# Width frames are downscaled to before estimating the horizon
+_HORIZON_WIDTH = 160
+
+
+def road_crop_offset(height: int, top_fraction: float) -> int:
+    """First pixel row of the road crop for a frame of the given height."""
+    return int(round(height * top_fraction))
+
+
+def crop_road(image: np.ndarray, top_fraction: float) -> Tuple[np.ndarray, int]:
+    """
+    Crop a frame to its road region.
+
+    Args:
+        image: BGR frame as decoded by OpenCV
+        top_fraction: Fraction of the frame height cut from the top
+
+    Returns:
+        Tuple of (cropped image, y offset of the crop in the full frame).
+        The crop is a view of the original rows, not a copy.
+    """
+    y_offset = road_crop_offset(image.shape[0], top_fraction)
+    return image[y_offset:], y_offset
+
+
+def estimate_horizon(images: Iterable[np.ndarray]) -> float:
+    """
+    Estimate the horizon line as a fraction of the frame height.
+
+    For each frame, the horizon is taken as the row where the smoothed
+    row-mean luminance changes most sharply (sky/buildings to road),
+    searched between POTHOLE_ROI_MIN_TOP and POTHOLE_ROI_MAX_TOP. The
+    median over all frames is returned so single odd frames do not matter.
+
+    Args:
+        images: BGR frames from the same video
+
+    Returns:
+        Horizon row as a fraction of the frame height
+    """
+    rows = []
+    for image in images:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        height = max(1, round(gray.shape[0] * _HORIZON_WIDTH / gray.shape[1]))
+        gray = cv2.resize(gray, (_HORIZON_WIDTH, height), interpolation=cv2.INTER_AREA)
+
+        profile = gray.mean(axis=1)
+        kernel = np.ones(5) / 5
+        profile = np.convolve(profile, kernel, mode='same')
+        gradient = np.abs(np.diff(profile))
+
+        low = int(height * POTHOLE_ROI_MIN_TOP)
+        high = max(low + 1, int(height * POTHOLE_ROI_MAX_TOP))
+        rows.append((low + int(np.argmax(gradient[low:high]))) / height)
+
+    if not rows:
+        return POTHOLE_ROI_TOP
+    return float(np.median(rows))
+
+
+def road_roi_top(
+    video_path: Union[str, Path],
+    mode: str = POTHOLE_ROI_MODE,
+    samples: int = POTHOLE_ROI_HORIZON_SAMPLES,
+    span: float = 1.0
+) -> float:
+    """
+    Pick the road crop for a video.
+
+    Args:
+        video_path: Path to the video file (or anything VideoFrameSource
+            accepts, e.g. a StreamingDownload)
+        mode: "none" (full frame), "fixed" (POTHOLE_ROI_TOP) or "horizon"
+            (estimated from frames spread across the video)
+        samples: Number of frames used to estimate the horizon
+        span: Fraction of the video, from the start, the samples are
+            spread over (less than 1 when the rest is still downloading)
+
+    Returns:
+        Fraction of the frame height to cut from the top (0 for no crop)
+    """
+    if mode not in ROI_MODES:
+        raise ValueError(f"Unknown ROI mode '{mode}', expected one of {ROI_MODES}")
+    if mode == "none":
+        return 0.0
+    if mode == "fixed":
+        return POTHOLE_ROI_TOP
+
+    probe = VideoFrameSource(video_path)
+    if not probe.is_valid or probe.total_frames <= 0:
+        return POTHOLE_ROI_TOP
+
+    last_index = (probe.total_frames - 1) * min(max(span, 0.0), 1.0)
+    indices = np.linspace(0, last_index, max(1, samples)).round().astype(int)
+    source = VideoFrameSource(video_path, strategy="seek", source_indices=indices.tolist())
+    horizon = estimate_horizon(frame.image for frame in source)
+
+    # Start the crop a little above the horizon so distant damage is kept
+    top = min(max(horizon - POTHOLE_ROI_HORIZON_MARGIN, POTHOLE_ROI_MIN_TOP), POTHOLE_ROI_MAX_TOP)
+    print(f"[Pipeline] Estimated horizon at {horizon:.2f} of frame height, cropping top {top:.2f}")
+    return top
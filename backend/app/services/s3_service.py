@@ -4,6 +4,7 @@ S3 service for handling video uploads, downloads, and deletions.
 import boto3
 from botocore.exceptions import ClientError
 from pathlib import Path
+import hashlib
 import tempfile
 import os
 from typing import Optional, BinaryIO
@@ -65,6 +66,31 @@ class S3Service:
         
         return local_path
     
+    async def start_streaming_download(self, s3_key: str, local_path: Optional[str] = None):
+        """
+        Start downloading a video in the background so it can be decoded
+        while the rest arrives (see app.services.streaming).
+        
+        Args:
+            s3_key: The S3 object key
+            local_path: Optional local path. If not provided, creates temp file.
+            
+        Returns:
+            StreamingDownload whose local_path grows as chunks arrive
+        """
+        from app.services.streaming import StreamingDownload
+        
+        if local_path is None:
+            suffix = Path(s3_key).suffix or '.mp4'
+            fd, local_path = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+        
+        download = StreamingDownload(self.client, self.raw_bucket, s3_key, local_path)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, download.start)
+        
+        return download
+    
     async def download_csv(self, s3_key: str, local_path: Optional[str] = None) -> str:
         """
         Download CSV from S3 to local filesystem.
@@ -238,9 +264,35 @@ class S3Service:
             'content_length': response.get('ContentLength'),
             'content_type': response.get('ContentType'),
             'last_modified': response.get('LastModified'),
+            'etag': (response.get('ETag') or '').strip('"') or None,
             'metadata': response.get('Metadata', {})
         }
     
+    async def get_content_fingerprint(self, s3_key: str, bucket: Optional[str] = None) -> Optional[str]:
+        """
+        Fingerprint an object's content without downloading it.
+        
+        Uses the ETag together with the size. For single-part uploads the ETag
+        is the MD5 of the content; for multipart uploads it depends on the part
+        size too, so the same file re-uploaded by the same client still matches.
+        
+        Args:
+            s3_key: The S3 object key
+            bucket: Target bucket (defaults to raw bucket)
+            
+        Returns:
+            Fingerprint string, or None if S3 did not return an ETag
+        """
+        try:
+            metadata = await self.get_object_metadata(s3_key, bucket)
+        except ClientError as e:
+            print(f"Could not read metadata for {s3_key}: {e}")
+            return None
+        
+        if not metadata['etag']:
+            return None
+        return f"etag:{metadata['etag']}:{metadata['content_length']}"
+    
     def generate_presigned_url(
         self,
         s3_key: str,
@@ -312,6 +364,24 @@ s3_service = S3Service()
 
 
 # Utility functions for direct use
+def file_fingerprint(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Fingerprint a local file by streaming it through SHA-256.
+    
+    Args:
+        path: Local file path
+        chunk_size: Bytes read per chunk
+        
+    Returns:
+        Fingerprint string
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(partial(f.read, chunk_size), b''):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
 async def download_video_from_s3(s3_key: str, local_path: Optional[str] = None) -> str:
     """Download video from S3."""
     return await s3_service.download_video(s3_key, local_path)
@@ -0,0 +1,261 @@
+"""
+Sensor-driven frame sampling.
+Chooses which source frames of a video to decode using the GPS/sensor series
+parsed from the upload's CSV, instead of sampling at a fixed rate, and which
+of them the pothole model should see.
+"""
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import (
+    SAMPLING_METRES_PER_FRAME, SAMPLING_MIN_FPS, SAMPLING_MAX_FPS, CSV_VELOCITY_UNIT,
+    SENSOR_SPIKE_Z, SENSOR_WINDOW_BEFORE_S, SENSOR_WINDOW_AFTER_S, SENSOR_SPARSE_FPS
+)
+from app.utils.tiles import haversine_km
+
+
+# Sensor series scanned for impact spikes
+SPIKE_KEYS = ('gyro_magnitude', 'acc_magnitude')
+
+# CSV velocity units and their factor to m/s
+VELOCITY_UNITS = {'m/s': 1.0, 'km/h': 1 / 3.6}
+
+# GPS-derived speed (m/s) below which a row says nothing about the CSV unit
+# (stopped, or lost in GPS jitter)
+_MIN_GPS_SPEED = 2.0
+
+
+def _interp_rows(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Interpolate per-row values, rows spread evenly over the video, at video positions."""
+    if len(values) == 1:
+        return np.full(len(positions), values[0])
+    return np.interp(positions, np.linspace(0.0, 1.0, len(values)), values)
+
+
+def series_at_positions(gps_data: List[Dict], key: str, positions: np.ndarray) -> np.ndarray:
+    """
+    Linearly interpolate one field of the GPS/sensor series at video positions.
+
+    The CSV rows are assumed to span the video evenly, matching
+    interpolate_gps_for_frame.
+
+    Args:
+        gps_data: Parsed CSV data points
+        key: Field to interpolate (e.g. 'velocity')
+        positions: Fractions of the video duration, in [0, 1]
+
+    Returns:
+        Interpolated values, one per position
+    """
+    values = np.array([point.get(key, 0.0) for point in gps_data], dtype=np.float64)
+    return _interp_rows(values, positions)
+
+
+def gps_speeds(gps_data: List[Dict], duration: float) -> np.ndarray:
+    """
+    Speed at each CSV row from the haversine distance between GPS fixes.
+
+    Args:
+        gps_data: Parsed CSV data points, spread evenly over the video
+        duration: Video duration in seconds
+
+    Returns:
+        Speeds in m/s, one per row
+    """
+    if len(gps_data) < 2 or duration <= 0:
+        return np.zeros(len(gps_data))
+    steps = [
+        haversine_km(a['lat'], a['lon'], b['lat'], b['lon']) * 1000
+        for a, b in zip(gps_data, gps_data[1:])
+    ]
+    distance = np.concatenate([[0.0], np.cumsum(steps)])
+    return np.gradient(distance, np.linspace(0.0, duration, len(gps_data)))
+
+
+def road_speeds(gps_data: List[Dict], duration: float, unit: str = CSV_VELOCITY_UNIT) -> np.ndarray:
+    """
+    Vehicle speed at each CSV row, in m/s.
+
+    The CSV velocity column is read in the given unit. With "auto" its unit
+    is the one under which it best agrees with the GPS-derived speed on rows
+    where the vehicle is clearly moving; if the CSV has no velocity, the
+    GPS-derived speed is used instead.
+
+    Args:
+        gps_data: Parsed CSV data points, spread evenly over the video
+        duration: Video duration in seconds
+        unit: "m/s", "km/h" or "auto"
+
+    Returns:
+        Speeds in m/s, one per row
+    """
+    if unit != 'auto' and unit not in VELOCITY_UNITS:
+        raise ValueError(f"Unknown velocity unit '{unit}', expected 'auto' or one of {tuple(VELOCITY_UNITS)}")
+
+    velocity = np.abs(np.array([point.get('velocity', 0.0) for point in gps_data], dtype=np.float64))
+    if unit != 'auto':
+        return velocity * VELOCITY_UNITS[unit]
+
+    gps = gps_speeds(gps_data, duration)
+    if not velocity.any():
+        print("[Sampling] CSV has no velocity, using speed from GPS positions")
+        return gps
+
+    moving = (velocity > 0) & (gps >= _MIN_GPS_SPEED)
+    if moving.sum() < 2:
+        # Too little movement to tell units apart; the vehicle is slow either way
+        return velocity
+
+    ratio = float(np.median(velocity[moving] / gps[moving]))
+    unit = min(VELOCITY_UNITS, key=lambda u: abs(math.log(ratio * VELOCITY_UNITS[u])))
+    print(f"[Sampling] CSV velocity is {ratio:.2f}x the GPS speed, reading it as {unit}")
+    return velocity * VELOCITY_UNITS[unit]
+
+
+def velocity_adaptive_indices(
+    gps_data: List[Dict],
+    video_fps: float,
+    total_frames: int,
+    metres_per_frame: float = SAMPLING_METRES_PER_FRAME,
+    min_fps: float = SAMPLING_MIN_FPS,
+    max_fps: float = SAMPLING_MAX_FPS
+) -> List[int]:
+    """
+    Pick source frames so that sampled frames are roughly metres_per_frame
+    apart on the road, using the vehicle speed from the CSV (see
+    road_speeds for how its unit is resolved).
+
+    The sampling rate at each point is velocity / metres_per_frame, clamped to
+    [min_fps, max_fps]: a stopped vehicle still gets min_fps, a fast one never
+    exceeds max_fps.
+
+    Args:
+        gps_data: Parsed CSV data points with 'velocity' and GPS positions
+        video_fps: Source video frame rate
+        total_frames: Number of frames in the source video
+        metres_per_frame: Target distance between sampled frames
+        min_fps: Floor sampling rate
+        max_fps: Ceiling sampling rate
+
+    Returns:
+        Sorted, unique source frame indices to decode
+    """
+    if video_fps <= 0 or total_frames <= 0:
+        return []
+
+    duration = total_frames / video_fps
+
+    # Evaluate the sampling rate on a grid at the ceiling rate, then integrate it:
+    # a frame is taken each time the accumulated "frames owed" crosses an integer
+    grid_step = 1.0 / max_fps
+    grid_times = np.arange(0.0, duration, grid_step)
+    velocity = _interp_rows(road_speeds(gps_data, duration), grid_times / duration) if gps_data else np.zeros(len(grid_times))
+    rate = np.clip(velocity / metres_per_frame, min_fps, max_fps)
+
+    frames_owed = np.concatenate([[0.0], np.cumsum(rate * grid_step)[:-1]])
+    take = np.concatenate([[True], np.floor(frames_owed[1:]) > np.floor(frames_owed[:-1])])
+
+    indices = np.round(grid_times[take] * video_fps).astype(int)
+    indices = indices[indices < total_frames]
+    return np.unique(indices).tolist()
+
+
+def sensor_trigger_times(
+    gps_data: List[Dict],
+    duration: float,
+    spike_z: float = SENSOR_SPIKE_Z,
+    keys: Sequence[str] = SPIKE_KEYS
+) -> List[float]:
+    """
+    Video times of sensor events that suggest road damage.
+
+    A row triggers if any of the series in keys spikes above its robust
+    z-score threshold (distance from the median in scaled MADs), or if its
+    pothole_flag goes from 0 to 1. Rows are assumed to span the video evenly.
+
+    Args:
+        gps_data: Parsed CSV data points
+        duration: Video duration in seconds
+        spike_z: Robust z-score a reading must exceed to count as a spike
+        keys: Sensor magnitude fields to scan
+
+    Returns:
+        Sorted trigger times in seconds from the start of the video
+    """
+    if not gps_data or duration <= 0:
+        return []
+
+    times = np.linspace(0.0, duration, len(gps_data))
+    triggered = np.zeros(len(gps_data), dtype=bool)
+
+    for key in keys:
+        values = np.array([point.get(key, 0.0) for point in gps_data], dtype=np.float64)
+        median = np.median(values)
+        spread = 1.4826 * np.median(np.abs(values - median))
+        if spread > 1e-9:
+            triggered |= (values - median) / spread > spike_z
+
+    flags = np.array([point.get('pothole_flag', 0) for point in gps_data]) > 0
+    triggered[1:] |= flags[1:] & ~flags[:-1]
+    triggered[0] |= flags[0]
+
+    return times[triggered].tolist()
+
+
+def trigger_windows(
+    trigger_times: Sequence[float],
+    before: float = SENSOR_WINDOW_BEFORE_S,
+    after: float = SENSOR_WINDOW_AFTER_S
+) -> List[Tuple[float, float]]:
+    """Merge [t - before, t + after] around each trigger into disjoint windows."""
+    windows: List[Tuple[float, float]] = []
+    for t in sorted(trigger_times):
+        start, end = max(0.0, t - before), t + after
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+class SensorTriggeredSchedule:
+    """
+    Decides per sampled frame whether the pothole model should run.
+
+    Inside a trigger window every frame is inferred; outside, one frame per
+    1 / sparse_fps seconds is. Frames must be passed in video order.
+    """
+
+    def __init__(self, windows: List[Tuple[float, float]], sparse_fps: float = SENSOR_SPARSE_FPS):
+        self.windows = windows
+        self.sparse_interval = 1.0 / sparse_fps if sparse_fps > 0 else math.inf
+        self._window_starts = np.array([start for start, _ in windows])
+        self._last_sparse_bucket = None
+        self.dense_frames = 0
+        self.sparse_frames = 0
+        self.skipped_frames = 0
+
+    def in_window(self, timestamp: float) -> bool:
+        i = int(np.searchsorted(self._window_starts, timestamp, side='right')) - 1
+        return i >= 0 and timestamp <= self.windows[i][1]
+
+    def __call__(self, timestamp: float) -> bool:
+        """True if the pothole model should run on the frame at timestamp."""
+        if self.in_window(timestamp):
+            self.dense_frames += 1
+            return True
+
+        bucket = math.floor(timestamp / self.sparse_interval) if self.sparse_interval < math.inf else 0
+        if bucket != self._last_sparse_bucket:
+            self._last_sparse_bucket = bucket
+            self.sparse_frames += 1
+            return True
+
+        self.skipped_frames += 1
+        return False
+
+    @property
+    def window_seconds(self) -> float:
+        return sum(end - start for start, end in self.windows)
@@ -0,0 +1,304 @@
+"""
+Streaming ingest of videos from S3.
+Downloads an object with parallel ranged GETs into a preallocated local file
+while the decoder reads the part that has already arrived, so network time
+for a large video overlaps with decoding and inference instead of preceding
+them.
+
+The decoder never reads the file directly: OpenCV gets a DownloadReader,
+whose reads block until every chunk they cover has been written, so FFmpeg
+cannot see the unfilled (zeroed) parts of the preallocated file whatever
+it reads ahead.
+
+MP4 containers need their index (the moov box) before any frame can be
+decoded. Phone recorders usually write it after the media data, so the
+first chunk is fetched up front to locate the boxes and, if moov is at the
+end, the tail of the object is downloaded before the rest.
+"""
+import io
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import S3_STREAM_CHUNK_SIZE, S3_STREAM_WORKERS
+from app.services.frames import Frame, VideoFrameSource
+
+
+def _iter_boxes(data: bytes, start: int, end: int, size_limit: Optional[int] = None) -> Iterator[Tuple[bytes, int, int, int]]:
+    """
+    Yield (type, box start, payload start, box end) for the MP4 boxes in
+    data[start:end]. Box ends are clipped to size_limit (default: end).
+    """
+    size_limit = end if size_limit is None else size_limit
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = size_limit - offset
+        if size < header:
+            return
+        yield box_type, offset, offset + header, min(offset + size, size_limit)
+        offset += size
+
+
+def parse_mp4_layout(head: bytes, object_size: int) -> Tuple[Optional[int], Optional[Tuple[int, int]]]:
+    """
+    Locate the media data and the index of an MP4 file from its first bytes.
+
+    Args:
+        head: Bytes from the start of the file
+        object_size: Total file size
+
+    Returns:
+        Tuple of (mdat start or None, (moov start, moov end) or None). When
+        moov follows mdat it lies beyond head, so it is assumed to run from
+        the end of mdat to the end of the file.
+    """
+    mdat_start = None
+    for box_type, box_start, _, box_end in _iter_boxes(head, 0, len(head), object_size):
+        if box_type == b"moov":
+            return mdat_start, (box_start, box_end)
+        if box_type == b"mdat":
+            mdat_start = box_start
+            if box_end < object_size:
+                return mdat_start, (box_end, object_size)
+            break
+
+    return mdat_start, None
+
+
+class StreamingDownload:
+    """
+    Background download of one S3 object into a local file.
+
+    The file is preallocated to the object size and filled by a thread pool
+    of ranged GETs. Decoders read it through open_stream(), which blocks
+    until the chunks covering each read are complete.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        s3_key: str,
+        local_path: str,
+        chunk_size: int = S3_STREAM_CHUNK_SIZE,
+        workers: int = S3_STREAM_WORKERS
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.s3_key = s3_key
+        self.local_path = local_path
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+        self.size = 0
+        self.moov: Optional[Tuple[int, int]] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._chunks: List[Tuple[int, int]] = []
+        self._done: List[bool] = []
+        self._error: Optional[BaseException] = None
+        self._cancelled = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._condition = threading.Condition()
+
+    @property
+    def complete(self) -> bool:
+        return self.finished_at is not None
+
+    def start(self):
+        """
+        Fetch the first chunk synchronously, work out the container layout,
+        then download the remaining chunks in the background.
+        """
+        self.started_at = time.perf_counter()
+        head = self.client.head_object(Bucket=self.bucket, Key=self.s3_key)
+        self.size = head['ContentLength']
+
+        with open(self.local_path, 'wb') as f:
+            f.truncate(self.size)
+
+        self._chunks = [
+            (start, min(start + self.chunk_size, self.size) - 1)
+            for start in range(0, self.size, self.chunk_size)
+        ]
+        self._done = [False] * len(self._chunks)
+        if not self._chunks:
+            self.finished_at = time.perf_counter()
+            return
+
+        first = self._fetch(0)
+        mdat_start, self.moov = parse_mp4_layout(first, self.size)
+
+        # Download the index first when it sits after the media data
+        order = list(range(1, len(self._chunks)))
+        if self.moov and mdat_start is not None and self.moov[0] > mdat_start:
+            tail_start_chunk = self.moov[0] // self.chunk_size
+            order = (
+                [i for i in order if i >= tail_start_chunk]
+                + [i for i in order if i < tail_start_chunk]
+            )
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="s3-stream")
+        for index in order:
+            self._executor.submit(self._fetch_in_background, index)
+        self._executor.shutdown(wait=False)
+
+    def _fetch(self, index: int) -> bytes:
+        start, end = self._chunks[index]
+        response = self.client.get_object(Bucket=self.bucket, Key=self.s3_key, Range=f"bytes={start}-{end}")
+        data = response['Body'].read()
+
+        with open(self.local_path, 'r+b') as f:
+            f.seek(start)
+            f.write(data)
+
+        with self._condition:
+            self._done[index] = True
+            if all(self._done):
+                self.finished_at = time.perf_counter()
+            self._condition.notify_all()
+        return data
+
+    def _fetch_in_background(self, index: int):
+        if self._error is not None or self._cancelled:
+            return
+        try:
+            self._fetch(index)
+        except BaseException as e:
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
+
+    def wait_for_range(self, start: int, end: int):
+        """Block until bytes [start, end) of the file are downloaded."""
+        first = start // self.chunk_size
+        last = (min(end, self.size) - 1) // self.chunk_size
+        with self._condition:
+            while not all(self._done[first:last + 1]):
+                if self._error is not None:
+                    raise self._error
+                self._condition.wait(timeout=0.5)
+            if self._error is not None:
+                raise self._error
+
+    def wait(self):
+        """Block until the whole object is downloaded."""
+        if self.size:
+            self.wait_for_range(0, self.size)
+
+    def open_stream(self) -> "DownloadReader":
+        """Reader for decoders (see app.services.frames.open_capture)."""
+        return DownloadReader(self)
+
+    def cancel(self):
+        """
+        Skip chunks that have not started yet, e.g. after a processing error,
+        and block until the in-flight ones have finished writing, so the
+        local file can be removed afterwards.
+        """
+        self._cancelled = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self, decode_started_at: Optional[float]) -> Dict[str, float]:
+        """
+        Download time and how much of it overlapped with decoding.
+
+        Args:
+            decode_started_at: perf_counter time the first frame was decoded
+
+        Returns:
+            Dict with 'download_s' and 'download_overlap_s'
+        """
+        download_s = (self.finished_at or time.perf_counter()) - self.started_at
+        overlap_s = 0.0
+        if decode_started_at is not None and self.finished_at is not None:
+            overlap_s = max(0.0, self.finished_at - decode_started_at)
+        return {
+            'download_s': round(download_s, 3),
+            'download_overlap_s': round(overlap_s, 3),
+        }
+
+
+class DownloadReader(io.BufferedIOBase):
+    """
+    Binary reader over a StreamingDownload's file whose reads block until
+    the bytes they return have been downloaded.
+
+    A failed download reads as the end of the file rather than raising:
+    OpenCV calls read() from native code, which cannot propagate Python
+    exceptions. StreamingFrames raises the download error instead.
+    """
+
+    def __init__(self, download: StreamingDownload):
+        self.download = download
+        self._file = open(download.local_path, 'rb')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        end = self.download.size if size is None or size < 0 else min(self._position + size, self.download.size)
+        if end <= self._position:
+            return b''
+        try:
+            self.download.wait_for_range(self._position, end)
+        except BaseException:
+            return b''
+        self._file.seek(self._position)
+        data = self._file.read(end - self._position)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.download.size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class StreamingFrames:
+    """
+    Iterates a VideoFrameSource opened on a StreamingDownload (the download
+    passed as its video), recording when decoding started.
+
+    A read that fails because the download failed ends decoding early like
+    the end of the file would, so iteration finishes by waiting for the
+    download, which raises its error instead of returning a truncated video.
+    """
+
+    def __init__(self, source: VideoFrameSource, download: StreamingDownload):
+        self.source = source
+        self.download = download
+        self.decode_started_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def __iter__(self) -> Iterator[Frame]:
+        for frame in self.source:
+            if self.decode_started_at is None:
+                self.decode_started_at = time.perf_counter()
+            yield frame
+        self.download.wait()
@@ -0,0 +1,414 @@
+"""
+Incremental maintenance of tile aggregates.
+
+Each tile keeps the numeric fields of its last TILE_LAST_N_EVENTS events as
+a small window, stored in tile_aggregates.window_state, plus running sums
+and maxima rebuilt from it when loaded. New events are pushed into the
+window (evicting the oldest) and the aggregate columns are derived from the
+running state, so ingestion never reads events back or re-parses their
+model_outputs.
+
+Windows are ordered by detection time, ties broken by event id, both here
+and in the rebuild, so a rebuilt window holds the same events as the
+incrementally maintained one.
+
+If the stored state is lost or drifts from the events table, rebuild it:
+    python -m app.services.tile_aggregates [--tiles T_1_2 T_1_3 ...]
+"""
+import argparse
+import asyncio
+import json
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import TILE_LAST_N_EVENTS
+from app.utils.tiles import tile_id_to_center
+
+
+# Configuration
+TILE_WINDOW_TYPE = 'last_20'
+TILE_SAVE_CHUNK_SIZE = 1000  # Tiles per upsert statement
+
+# Numeric fields kept per event, and the event type each applies to
+# (None: every event)
+WINDOW_FIELDS = {
+    'severity': None,
+    'confidence': None,
+    'congestion_score': 'congestion',
+    'vehicle_count': 'congestion',
+    'pothole_size': 'pothole',
+}
+_MAX_FIELDS = ('severity', 'vehicle_count', 'pothole_size')
+
+
+def window_entry(
+    event_id: str,
+    event_type: str,
+    detected_at: datetime,
+    severity: float,
+    confidence: float,
+    model_outputs: Dict
+) -> Dict:
+    """
+    The fields of one event that tile aggregates are computed from.
+
+    Args:
+        event_id: Event UUID (tie-breaker between events detected at the same time)
+        event_type: Event type
+        detected_at: Detection time
+        severity: Event severity (0-100)
+        confidence: Event confidence (0-1)
+        model_outputs: Event model outputs
+
+    Returns:
+        Window entry dictionary
+    """
+    def number(key):
+        value = model_outputs.get(key)
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    values = {
+        'severity': float(severity or 0),
+        'confidence': float(confidence or 0),
+        'congestion_score': number('traffic_density_score'),
+        'vehicle_count': number('vehicle_count'),
+        'pothole_size': number('total_pothole_size'),
+    }
+    entry = {'event_id': str(event_id), 'event_type': event_type, 'detected_at': detected_at}
+    for field, applies_to in WINDOW_FIELDS.items():
+        entry[field] = values[field] if applies_to in (None, event_type) else None
+    return entry
+
+
+def _order_key(entry: Dict) -> Tuple[datetime, str]:
+    """Window order: detection time, then event id (as ordered by Postgres)."""
+    return entry['detected_at'], entry.get('event_id', '')
+
+
+class TileWindow:
+    """Last-N events of one tile with running sums, counts and maxima."""
+
+    def __init__(self, tile_id: str, entries: Optional[List[Dict]] = None, size: int = TILE_LAST_N_EVENTS):
+        self.tile_id = tile_id
+        self.size = size
+        self.entries: List[Dict] = []  # Oldest first
+        self.type_counts: Dict[str, int] = {}
+        self.sums = {field: 0.0 for field in WINDOW_FIELDS}
+        self.counts = {field: 0 for field in WINDOW_FIELDS}
+        self.maxima: Dict[str, Optional[float]] = {field: None for field in _MAX_FIELDS}
+
+        for entry in sorted(entries or [], key=_order_key)[-size:]:
+            self._insert(entry)
+
+    def _insert(self, entry: Dict):
+        position = bisect_right([_order_key(e) for e in self.entries], _order_key(entry))
+        self.entries.insert(position, entry)
+        self.type_counts[entry['event_type']] = self.type_counts.get(entry['event_type'], 0) + 1
+        for field in WINDOW_FIELDS:
+            value = entry[field]
+            if value is None:
+                continue
+            self.sums[field] += value
+            self.counts[field] += 1
+            if field in self.maxima and (self.maxima[field] is None or value > self.maxima[field]):
+                self.maxima[field] = value
+
+    def _evict_oldest(self):
+        entry = self.entries.pop(0)
+        self.type_counts[entry['event_type']] -= 1
+        for field in WINDOW_FIELDS:
+            value = entry[field]
+            if value is None:
+                continue
+            self.sums[field] -= value
+            self.counts[field] -= 1
+            # Only an evicted maximum needs a rescan of the (bounded) window
+            if field in self.maxima and value >= self.maxima[field]:
+                remaining = [e[field] for e in self.entries if e[field] is not None]
+                self.maxima[field] = max(remaining) if remaining else None
+
+    def push(self, entry: Dict) -> bool:
+        """
+        Add an event to the window, evicting the oldest if it is full.
+
+        Args:
+            entry: Entry from window_entry
+
+        Returns:
+            False if the event orders before the whole (full) window and was
+            ignored
+        """
+        if len(self.entries) >= self.size:
+            if _order_key(entry) < _order_key(self.entries[0]):
+                return False
+            self._evict_oldest()
+        self._insert(entry)
+        return True
+
+    def _mean(self, field: str) -> float:
+        return self.sums[field] / self.counts[field] if self.counts[field] else 0.0
+
+    def aggregate(self) -> Dict:
+        """Row for tile_aggregates, including the serialised window state."""
+        center_lat, center_lon = tile_id_to_center(self.tile_id)
+        return {
+            'tile_id': self.tile_id,
+            'total_events': len(self.entries),
+            'pothole_count': self.type_counts.get('pothole', 0),
+            'congestion_count': self.type_counts.get('congestion', 0),
+            'crack_count': self.type_counts.get('crack', 0),
+            'avg_severity': self._mean('severity'),
+            'max_severity': self.maxima['severity'] or 0,
+            'avg_confidence': self._mean('confidence'),
+            'avg_congestion_score': self._mean('congestion_score'),
+            'avg_vehicle_count': self._mean('vehicle_count'),
+            'max_vehicle_count': int(self.maxima['vehicle_count'] or 0),
+            'avg_pothole_size': self._mean('pothole_size'),
+            'max_pothole_size': self.maxima['pothole_size'] or 0,
+            'center_lat': center_lat,
+            'center_lon': center_lon,
+            'last_event_at': self.entries[-1]['detected_at'].isoformat() if self.entries else None,
+            'window_state': self.to_state(),
+        }
+
+    def to_state(self) -> List[Dict]:
+        """JSON-serialisable window entries."""
+        return [{**entry, 'detected_at': entry['detected_at'].isoformat()} for entry in self.entries]
+
+    @classmethod
+    def from_state(cls, tile_id: str, state: List[Dict]) -> "TileWindow":
+        """Restore a window saved with to_state."""
+        entries = [{**entry, 'detected_at': datetime.fromisoformat(entry['detected_at'])} for entry in state]
+        return cls(tile_id, entries)
+
+
+def _json(value):
+    """JSONB value as returned by the driver (decoded or raw text)."""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+async def load_tile_windows(tile_ids: Iterable[str], db: AsyncSession) -> Dict[str, Optional[TileWindow]]:
+    """
+    Load the stored windows of some tiles, holding a per-tile lock until
+    the transaction ends.
+
+    The locks are transaction-level advisory locks keyed by tile, taken in
+    tile order, so concurrent ingestions into the same tile serialise even
+    when the tile has no aggregate row yet; no row is written until the
+    windows are saved in the same transaction.
+
+    Args:
+        tile_ids: Tile identifiers
+        db: Database session
+
+    Returns:
+        Window per tile: empty for tiles without an aggregate row, None where
+        the row predates window_state and needs a rebuild
+    """
+    tile_ids = sorted(set(tile_ids))
+    await db.execute(
+        text("""
+            SELECT pg_advisory_xact_lock(hashtext(:window_type || ':' || t.tile_id))
+            FROM (SELECT unnest(CAST(:tile_ids AS text[])) AS tile_id ORDER BY 1) t
+        """),
+        {'window_type': TILE_WINDOW_TYPE, 'tile_ids': tile_ids}
+    )
+    result = await db.execute(
+        text("""
+            SELECT tile_id, window_state
+            FROM tile_aggregates
+            WHERE window_type = :window_type
+              AND tile_id = ANY(CAST(:tile_ids AS text[]))
+        """),
+        {'window_type': TILE_WINDOW_TYPE, 'tile_ids': tile_ids}
+    )
+    windows: Dict[str, Optional[TileWindow]] = {tile_id: TileWindow(tile_id) for tile_id in tile_ids}
+    for row in result.fetchall():
+        windows[row.tile_id] = (
+            TileWindow.from_state(row.tile_id, _json(row.window_state)) if row.window_state is not None else None
+        )
+    return windows
+
+
+async def save_tile_windows(windows: Iterable[TileWindow], db: AsyncSession):
+    """
+    Upsert the aggregates and state of some tiles, one statement per chunk.
+
+    Args:
+        windows: Tile windows
+        db: Database session
+    """
+    rows = [window.aggregate() for window in windows if window.entries]
+    for start in range(0, len(rows), TILE_SAVE_CHUNK_SIZE):
+        await db.execute(
+            text("""
+                INSERT INTO tile_aggregates (
+                    tile_id, window_type, total_events, pothole_count, congestion_count, crack_count,
+                    avg_severity, max_severity, avg_confidence,
+                    avg_congestion_score, avg_vehicle_count, max_vehicle_count,
+                    avg_pothole_size, max_pothole_size,
+                    center_lat, center_lon, last_updated, last_event_at, window_state
+                )
+                SELECT
+                    t.tile_id, :window_type, t.total_events, t.pothole_count, t.congestion_count, t.crack_count,
+                    t.avg_severity, t.max_severity, t.avg_confidence,
+                    t.avg_congestion_score, t.avg_vehicle_count, t.max_vehicle_count,
+                    t.avg_pothole_size, t.max_pothole_size,
+                    t.center_lat, t.center_lon, NOW(), t.last_event_at, t.window_state
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS t(
+                    tile_id text, total_events integer, pothole_count integer,
+                    congestion_count integer, crack_count integer,
+                    avg_severity numeric, max_severity numeric, avg_confidence numeric,
+                    avg_congestion_score numeric, avg_vehicle_count numeric, max_vehicle_count integer,
+                    avg_pothole_size numeric, max_pothole_size numeric,
+                    center_lat double precision, center_lon double precision,
+                    last_event_at timestamp, window_state jsonb
+                )
+                ON CONFLICT (tile_id, window_type)
+                DO UPDATE SET
+                    total_events = EXCLUDED.total_events,
+                    pothole_count = EXCLUDED.pothole_count,
+                    congestion_count = EXCLUDED.congestion_count,
+                    crack_count = EXCLUDED.crack_count,
+                    avg_severity = EXCLUDED.avg_severity,
+                    max_severity = EXCLUDED.max_severity,
+                    avg_confidence = EXCLUDED.avg_confidence,
+                    avg_congestion_score = EXCLUDED.avg_congestion_score,
+                    avg_vehicle_count = EXCLUDED.avg_vehicle_count,
+                    max_vehicle_count = EXCLUDED.max_vehicle_count,
+                    avg_pothole_size = EXCLUDED.avg_pothole_size,
+                    max_pothole_size = EXCLUDED.max_pothole_size,
+                    last_updated = NOW(),
+                    last_event_at = EXCLUDED.last_event_at,
+                    window_state = EXCLUDED.window_state
+            """),
+            {'window_type': TILE_WINDOW_TYPE, 'rows': json.dumps(rows[start:start + TILE_SAVE_CHUNK_SIZE])}
+        )
+
+
+async def apply_events_to_tiles(entries_by_tile: Dict[str, List[Dict]], db: AsyncSession):
+    """
+    Push new events into their tiles' windows and save the result, in the
+    caller's transaction (the caller commits, together with the events).
+
+    Tiles whose aggregate row has no window_state yet are rebuilt from the
+    events table instead, which already includes the new events.
+
+    Args:
+        entries_by_tile: New window entries per tile
+        db: Database session
+    """
+    if not entries_by_tile:
+        return
+
+    windows = await load_tile_windows(entries_by_tile, db)
+
+    legacy = [tile_id for tile_id, window in windows.items() if window is None]
+    if legacy:
+        await rebuild_tile_aggregates(db, legacy, commit=False)
+
+    updated = []
+    for tile_id, entries in entries_by_tile.items():
+        window = windows.get(tile_id)
+        if window is None:
+            continue
+        changed = [window.push(entry) for entry in entries]
+        if any(changed):
+            updated.append(window)
+
+    await save_tile_windows(updated, db)
+
+
+async def rebuild_tile_aggregates(
+    db: AsyncSession,
+    tile_ids: Optional[Iterable[str]] = None,
+    commit: bool = True
+) -> int:
+    """
+    Rebuild tile windows and aggregates from the events table.
+
+    Args:
+        db: Database session
+        tile_ids: Tiles to rebuild (all tiles with events if None; aggregates
+            of tiles that no longer have events are then removed)
+        commit: Commit when done
+
+    Returns:
+        Number of tiles rebuilt
+    """
+    params = {'limit': TILE_LAST_N_EVENTS}
+    if tile_ids is None:
+        tiles_sql = "SELECT DISTINCT tile_id FROM events"
+    else:
+        tiles_sql = "SELECT unnest(CAST(:tile_ids AS text[])) AS tile_id"
+        params['tile_ids'] = sorted(set(tile_ids))
+
+    result = await db.execute(
+        text(f"""
+            SELECT
+                t.tile_id,
+                last_n.event_id,
+                last_n.event_type,
+                last_n.severity,
+                last_n.confidence,
+                last_n.model_outputs,
+                last_n.detected_at
+            FROM ({tiles_sql}) t
+            CROSS JOIN LATERAL (
+                SELECT
+                    event_id,
+                    event_type,
+                    severity,
+                    confidence,
+                    model_outputs,
+                    detected_at
+                FROM events
+                WHERE events.tile_id = t.tile_id
+                ORDER BY detected_at DESC, event_id DESC
+                LIMIT :limit
+            ) last_n
+        """),
+        params
+    )
+
+    entries_by_tile: Dict[str, List[Dict]] = {}
+    for row in result.fetchall():
+        entries_by_tile.setdefault(row.tile_id, []).append(window_entry(
+            row.event_id, row.event_type, row.detected_at, row.severity, row.confidence, _json(row.model_outputs) or {}
+        ))
+
+    windows = [TileWindow(tile_id, entries) for tile_id, entries in entries_by_tile.items()]
+    await save_tile_windows(windows, db)
+
+    if tile_ids is None:
+        await db.execute(
+            text("""
+                DELETE FROM tile_aggregates
+                WHERE window_type = :window_type
+                  AND tile_id NOT IN (SELECT DISTINCT tile_id FROM events)
+            """),
+            {'window_type': TILE_WINDOW_TYPE}
+        )
+
+    if commit:
+        await db.commit()
+    return len(windows)
+
+
+async def _rebuild(tile_ids: Optional[List[str]]):
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        rebuilt = await rebuild_tile_aggregates(session, tile_ids)
+    print(f"Rebuilt aggregates for {rebuilt} tiles")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild tile aggregates from the events table")
+    parser.add_argument('--tiles', nargs='+', help='Tile IDs to rebuild (default: all tiles)')
+    args = parser.parse_args()
+    asyncio.run(_rebuild(args.tiles))
@@ -0,0 +1,174 @@
+"""
+Cross-frame tracking of road damage detections.
+
+A pothole stays in view for several sampled frames while the vehicle
+approaches it, growing and moving down the image. The tracker links its
+detections frame to frame so it can be reported once, with how long it was
+seen, its largest apparent size and the best confidence the model gave it.
+
+Matching is greedy per frame: detection/track pairs of the same kind are
+candidates if their boxes overlap enough or, since boxes shift quickly at
+low sampling rates, if their centres are close relative to the box size.
+Candidates are taken best IoU first, then nearest centre.
+
+Frames the pothole model did not run on (results with 'inferred' False,
+e.g. outside sensor trigger windows) are neither matched nor counted
+towards a track's gap.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import (
+    TRACK_IOU_THRESHOLD, TRACK_CENTROID_RATIO, TRACK_MAX_GAP_FRAMES, TRACK_MIN_FRAMES
+)
+
+
+POTHOLE_CLASSES = ('pothole', 'potholes')
+CRACK_CLASSES = ('road_crack', 'road_cracks', 'crack', 'cracks')
+
+
+def damage_kind(class_name: str) -> Optional[str]:
+    """Event type of a pothole model class ('pothole', 'crack'), or None for other classes."""
+    name = class_name.lower()
+    if name in POTHOLE_CLASSES:
+        return 'pothole'
+    if name in CRACK_CLASSES:
+        return 'crack'
+    return None
+
+
+class Track:
+    """One physical object followed across frames."""
+
+    def __init__(self, track_id: int, kind: str, frame_idx: int, detection: Dict):
+        self.track_id = track_id
+        self.kind = kind
+        self.frame_indices = [frame_idx]
+        self.bbox = detection['bbox']
+        self.best_confidence = detection.get('confidence', 0.0)
+        self.best_detection = detection
+        self.peak_size = detection.get('size', 0.0)
+        self.peak_frame_idx = frame_idx
+
+    @property
+    def first_frame_idx(self) -> int:
+        return self.frame_indices[0]
+
+    @property
+    def last_frame_idx(self) -> int:
+        return self.frame_indices[-1]
+
+    @property
+    def frames_seen(self) -> int:
+        return len(self.frame_indices)
+
+    def add(self, frame_idx: int, detection: Dict):
+        self.frame_indices.append(frame_idx)
+        self.bbox = detection['bbox']
+        confidence = detection.get('confidence', 0.0)
+        if confidence > self.best_confidence:
+            self.best_confidence = confidence
+            self.best_detection = detection
+        size = detection.get('size', 0.0)
+        if size > self.peak_size:
+            self.peak_size = size
+            self.peak_frame_idx = frame_idx
+
+
+def _match_scores(track_boxes: np.ndarray, det_boxes: np.ndarray):
+    """Pairwise IoU and centre distance in units of the larger box diagonal."""
+    tl = np.maximum(track_boxes[:, None, :2], det_boxes[None, :, :2])
+    br = np.minimum(track_boxes[:, None, 2:], det_boxes[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_t = np.prod(track_boxes[:, 2:] - track_boxes[:, :2], axis=1)
+    area_d = np.prod(det_boxes[:, 2:] - det_boxes[:, :2], axis=1)
+    iou = inter / np.maximum(area_t[:, None] + area_d[None, :] - inter, 1e-9)
+
+    centre_t = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+    centre_d = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+    distance = np.linalg.norm(centre_t[:, None] - centre_d[None, :], axis=2)
+    diag_t = np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1)
+    diag_d = np.linalg.norm(det_boxes[:, 2:] - det_boxes[:, :2], axis=1)
+    ratio = distance / np.maximum(np.maximum(diag_t[:, None], diag_d[None, :]), 1e-9)
+
+    return iou, ratio
+
+
+def track_detections(
+    pothole_results: List[Dict],
+    iou_threshold: float = TRACK_IOU_THRESHOLD,
+    centroid_ratio: float = TRACK_CENTROID_RATIO,
+    max_gap: int = TRACK_MAX_GAP_FRAMES,
+    min_frames: int = TRACK_MIN_FRAMES
+) -> List[Track]:
+    """
+    Link pothole and crack detections across frames into tracks.
+
+    Args:
+        pothole_results: Pothole model results per frame, in frame order
+        iou_threshold: Minimum IoU for a detection to continue a track
+        centroid_ratio: Maximum centre distance, in box diagonals, for a
+            detection to continue a track when the boxes barely overlap
+        max_gap: Inferred frames a track may go unmatched before it is closed
+        min_frames: Tracks seen in fewer frames are dropped
+
+    Returns:
+        Finished tracks ordered by first frame
+    """
+    active: List[Track] = []
+    finished: List[Track] = []
+    next_id = 0
+    # Gaps are counted in inferred frames: position among inferred frames,
+    # and the position where each active track was last seen
+    step = -1
+    last_seen: Dict[int, int] = {}
+
+    for frame_idx, result in enumerate(pothole_results):
+        if not result.get('inferred', True):
+            continue
+        step += 1
+
+        # Close tracks that have not been seen for too long
+        still_active = []
+        for track in active:
+            (still_active if step - last_seen[track.track_id] <= max_gap + 1 else finished).append(track)
+        active = still_active
+
+        detections = [
+            (damage_kind(det.get('class', '')), det)
+            for det in result.get('detections', [])
+        ]
+        detections = [(kind, det) for kind, det in detections if kind]
+        if not detections:
+            continue
+
+        unmatched = set(range(len(detections)))
+        if active:
+            iou, ratio = _match_scores(
+                np.array([track.bbox for track in active], dtype=np.float64),
+                np.array([det['bbox'] for _, det in detections], dtype=np.float64)
+            )
+            same_kind = np.array([[track.kind == kind for kind, _ in detections] for track in active])
+            candidates = same_kind & ((iou >= iou_threshold) | (ratio <= centroid_ratio))
+
+            track_ids, det_ids = np.nonzero(candidates)
+            order = np.lexsort((ratio[track_ids, det_ids], -iou[track_ids, det_ids]))
+            matched_tracks = set()
+            for t, d in zip(track_ids[order], det_ids[order]):
+                if t in matched_tracks or d not in unmatched:
+                    continue
+                active[t].add(frame_idx, detections[d][1])
+                last_seen[active[t].track_id] = step
+                matched_tracks.add(t)
+                unmatched.discard(d)
+
+        for d in sorted(unmatched):
+            kind, det = detections[d]
+            active.append(Track(next_id, kind, frame_idx, det))
+            last_seen[next_id] = step
+            next_id += 1
+
+    finished.extend(active)
+    tracks = [track for track in finished if track.frames_seen >= min_frames]
+    return sorted(tracks, key=lambda track: (track.first_frame_idx, track.track_id))
@@ -9,32 +9,44 @@ import tempfile
 import traceback
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 import uuid
 import csv
 import asyncio
+import queue
+import threading
+import time
 from functools import partial
 
-import torch
-from ultralytics import YOLO
-from shapely.geometry import Polygon
-from shapely.ops import unary_union
+import numpy as np
 
 from app.core.config import (
-    CONGESTION_MODEL_PATH, POTHOLE_MODEL_PATH,
     FRAMES_PER_SECOND, CONGESTION_CONFIDENCE, POTHOLE_CONFIDENCE,
-    ANNOTATED_VIDEOS_DIR, FRAMES_FOLDER
+    ANNOTATED_VIDEOS_DIR, INFERENCE_BATCH_SIZE, PIPELINE_QUEUE_SIZE,
+    ADAPTIVE_SAMPLING, FRAME_DEDUP_ENABLED, FRAME_QUALITY_FILTER,
+    POTHOLE_ROI_MODE, S3_STREAMING_INGEST, S3_STREAM_HORIZON_SPAN,
+    INFERENCE_IMGSZ, INFERENCE_SHARED_PREPROCESS, POTHOLE_TRACKING,
+    SENSOR_TRIGGERED_POTHOLES, EVENT_FUSION,
+    FRAME_DEDUP_THRESHOLD, FRAME_DEDUP_MAX_REUSE, FRAME_SIGNATURE_SIZE,
+    FRAME_QUALITY_WIDTH, FRAME_QUALITY_HISTORY, FRAME_MIN_BRIGHTNESS,
+    FRAME_RELATIVE_BRIGHTNESS, FRAME_RELATIVE_SHARPNESS, FRAME_DARK_PIXEL_LEVEL,
+    FRAME_MAX_OCCLUDED_INCREASE
 )
 from app.utils.tiles import lat_lon_to_tile_id, tile_id_to_center
-from app.services.s3_service import s3_service, S3_BUCKET_RAW
-
-
-# Load models globally
-print("Loading ML models...")
-device = 0 if torch.cuda.is_available() else 'cpu'
-congestion_model = YOLO(str(CONGESTION_MODEL_PATH))
-pothole_model = YOLO(str(POTHOLE_MODEL_PATH))
-print(f"Models loaded on device: {device}")
+from app.utils.geometry import coverage_by_label, rectangles_union_area
+from app.services.frames import Frame, VideoFrameSource
+from app.services.frame_filters import DuplicateFrameGate, FrameQualityGate, QUALITY_REJECT_REASONS
+from app.services.model_registry import model_registry
+from app.services.road_roi import crop_road, road_crop_offset, road_roi_top
+from app.services.preprocess import Letterbox, letterbox_images
+from app.services.checkpoints import DetectionCheckpoint
+from app.services.streaming import StreamingDownload, StreamingFrames
+from app.services.sampling import (
+    SensorTriggeredSchedule, sensor_trigger_times, trigger_windows, velocity_adaptive_indices
+)
+from app.services.tracking import Track, track_detections
+from app.services.event_fusion import fuse_events
+from app.services.s3_service import s3_service, file_fingerprint, S3_BUCKET_RAW
 
 
 def calculate_severity(detection: Dict) -> float:
@@ -105,6 +117,7 @@ def parse_csv_for_gps(csv_path: str) -> List[Dict]:
     
     Expected CSV format:
     timestamp,lat,lon,velocity,gyro_x,gyro_y,gyro_z,...
+    (optionally also acc_x,acc_y,acc_z and a pothole_flag/Pothole column)
     
     Args:
         csv_path: Path to CSV file
@@ -127,6 +140,10 @@ def parse_csv_for_gps(csv_path: str) -> List[Dict]:
                         'gyro_x': float(row.get('gyro_x', 0)),
                         'gyro_y': float(row.get('gyro_y', 0)),
                         'gyro_z': float(row.get('gyro_z', 0)),
+                        'acc_x': float(row.get('acc_x', 0)),
+                        'acc_y': float(row.get('acc_y', 0)),
+                        'acc_z': float(row.get('acc_z', 0)),
+                        'pothole_flag': int(float(row.get('pothole_flag') or row.get('pothole') or row.get('Pothole') or 0)),
                     }
                     
                     # Calculate gyro magnitude
@@ -135,6 +152,11 @@ def parse_csv_for_gps(csv_path: str) -> List[Dict]:
                         data_point['gyro_y']**2 + 
                         data_point['gyro_z']**2
                     ) ** 0.5
+                    data_point['acc_magnitude'] = (
+                        data_point['acc_x']**2 + 
+                        data_point['acc_y']**2 + 
+                        data_point['acc_z']**2
+                    ) ** 0.5
                     
                     if data_point['lat'] != 0 and data_point['lon'] != 0:
                         data_points.append(data_point)
@@ -164,6 +186,20 @@ def interpolate_gps_for_frame(
     Returns:
         Interpolated GPS data for the frame
     """
+    return interpolate_gps_at(frame_idx / max(total_frames - 1, 1), gps_data)
+
+
+def interpolate_gps_at(position_fraction: float, gps_data: List[Dict]) -> Dict:
+    """
+    Interpolate GPS coordinates at a position in the video.
+    
+    Args:
+        position_fraction: Position as a fraction of the video duration (0-1)
+        gps_data: List of GPS data points, assumed to span the video evenly
+        
+    Returns:
+        Interpolated GPS data at that position
+    """
     if not gps_data:
         # Default to Chandigarh coordinates if no GPS data
         return {
@@ -173,8 +209,8 @@ def interpolate_gps_for_frame(
             'gyro_magnitude': 0
         }
     
-    # Calculate position in GPS data based on frame position
-    position = (frame_idx / max(total_frames - 1, 1)) * (len(gps_data) - 1)
+    # Calculate position in GPS data based on position in the video
+    position = min(max(position_fraction, 0.0), 1.0) * (len(gps_data) - 1)
     idx_low = int(position)
     idx_high = min(idx_low + 1, len(gps_data) - 1)
     
@@ -195,52 +231,131 @@ def interpolate_gps_for_frame(
     return interpolated
 
 
-def run_congestion_detection_on_frame(frame_path: str) -> Dict:
+def build_frame_source(video_path, gps_data: List[Dict], start_index: int = 0) -> VideoFrameSource:
     """
-    Run congestion model on a single frame.
+    Create the frame source for a video, sampling by distance travelled when
+    ADAPTIVE_SAMPLING is enabled and the upload has a GPS/sensor series.
+    
+    Args:
+        video_path: Path to the video file, or a StreamingDownload of it
+        gps_data: Parsed CSV data points (may be empty)
+        start_index: First source frame to sample (when resuming)
+        
+    Returns:
+        Frame source to feed run_staged_detection
+    """
+    frame_source = VideoFrameSource(video_path, fps=FRAMES_PER_SECOND, start_index=start_index)
+    if not (ADAPTIVE_SAMPLING and gps_data and frame_source.is_valid):
+        print(f"[Pipeline] Sampling ~{len(frame_source)} frames at {FRAMES_PER_SECOND} FPS")
+        return frame_source
+    
+    fixed_count = len(frame_source)
+    indices = velocity_adaptive_indices(gps_data, frame_source.video_fps, frame_source.total_frames)
+    frame_source = VideoFrameSource(
+        video_path, fps=FRAMES_PER_SECOND, source_indices=indices, start_index=start_index
+    )
+    print(
+        f"[Pipeline] Velocity-adaptive sampling: {len(frame_source)} frames "
+        f"(fixed {FRAMES_PER_SECOND} FPS would sample {fixed_count})"
+    )
+    return frame_source
+
+
+def build_pothole_schedule(
+    frame_source: VideoFrameSource,
+    gps_data: List[Dict]
+) -> Optional[SensorTriggeredSchedule]:
+    """
+    Restrict the pothole model to frames near sensor anomalies when
+    SENSOR_TRIGGERED_POTHOLES is enabled and the upload has a sensor series.
+    
+    Args:
+        frame_source: Frame source of the video
+        gps_data: Parsed CSV data points (may be empty)
+        
+    Returns:
+        Schedule to pass to run_staged_detection, or None to run the pothole
+        model on every frame
+    """
+    if not (SENSOR_TRIGGERED_POTHOLES and gps_data and frame_source.is_valid):
+        return None
+    
+    windows = trigger_windows(sensor_trigger_times(gps_data, frame_source.duration))
+    schedule = SensorTriggeredSchedule(windows)
+    print(
+        f"[Pipeline] Sensor-triggered pothole inference: {len(windows)} windows covering "
+        f"{schedule.window_seconds:.1f}s of {frame_source.duration:.1f}s"
+    )
+    return schedule
+
+
+def estimate_road_roi(video_path, download: Optional[StreamingDownload] = None) -> float:
+    """
+    Pick the pothole model's road crop for a video (see road_roi_top).
+    
+    While the video is still streaming in, the horizon is estimated from the
+    first S3_STREAM_HORIZON_SPAN of it rather than waiting for the whole file.
+    
+    Args:
+        video_path: Path to the video file
+        download: Streaming download filling video_path, if any; frames
+            are then decoded from it as they arrive
+        
+    Returns:
+        Fraction of the frame height to crop from the top
+    """
+    if download is None:
+        return road_roi_top(video_path)
+    return road_roi_top(download, span=S3_STREAM_HORIZON_SPAN)
+
+
+def _boxes_to_numpy(result, letterbox: Optional[Letterbox] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pull a result's boxes off the tensor in one go.
+    
+    Args:
+        result: Ultralytics result for one frame
+        letterbox: Geometry of a shared model input the boxes are relative
+            to, to map them back to frame coordinates
+    
+    Returns:
+        Tuple of (xyxy boxes, integer class ids, confidences) as NumPy arrays
+    """
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.float64)
+    if letterbox is not None:
+        xyxy = letterbox.to_frame(xyxy)
+    return (
+        xyxy,
+        boxes.cls.cpu().numpy().astype(int),
+        boxes.conf.cpu().numpy().astype(np.float64)
+    )
+
+
+def _parse_congestion_result(result, img_area: int, letterbox: Optional[Letterbox] = None) -> Dict:
+    """
+    Convert a single congestion model result into a detection dictionary.
     
     Args:
-        frame_path: Path to frame image
+        result: Ultralytics result for one frame
+        img_area: Frame area in pixels
+        letterbox: Geometry of the shared input the model ran on, if any
         
     Returns:
         Detection results dictionary
     """
-    results = congestion_model(str(frame_path), device=device, conf=CONGESTION_CONFIDENCE, verbose=False)
-    img = cv2.imread(str(frame_path))
-    h, w, _ = img.shape
-    img_area = h * w
+    xyxy, class_ids, _ = _boxes_to_numpy(result, letterbox)
+    class_names = [result.names[class_id] for class_id in class_ids]
     
     detections = {}
-    vehicle_polys = {}
-    all_vehicle_polys = []
-    
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls[0].item())
-            class_name = result.names[class_id]
-            confidence = box.conf[0].item()
-            x1, y1, x2, y2 = map(float, box.xyxy[0])
-            poly = Polygon([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
-            
-            detections[class_name] = detections.get(class_name, 0) + 1
-            
-            if class_name not in vehicle_polys:
-                vehicle_polys[class_name] = []
-            vehicle_polys[class_name].append(poly)
-            all_vehicle_polys.append(poly)
-    
-    # Calculate coverage per class
-    for class_name, polys in vehicle_polys.items():
-        if polys:
-            union = unary_union(polys)
-            detections[f"{class_name}_coverage"] = round(union.area / img_area, 6)
-    
-    # Calculate total vehicle coverage
-    if all_vehicle_polys:
-        total_union = unary_union(all_vehicle_polys)
-        detections["total_vehicle_coverage"] = round(total_union.area / img_area, 6)
-    else:
-        detections["total_vehicle_coverage"] = 0.0
+    for class_name in class_names:
+        detections[class_name] = detections.get(class_name, 0) + 1
+    
+    # Calculate per-class and total vehicle coverage in one pass
+    class_coverage, total_coverage = coverage_by_label(xyxy, class_names, img_area)
+    for class_name in list(detections):
+        detections[f"{class_name}_coverage"] = round(class_coverage[class_name], 6)
+    detections["total_vehicle_coverage"] = round(total_coverage, 6)
     
     # Count total vehicles
     vehicle_classes = ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'auto', 'rickshaw']
@@ -250,106 +365,475 @@ def run_congestion_detection_on_frame(frame_path: str) -> Dict:
     return detections
 
 
-def run_pothole_detection_on_frame(frame_path: str) -> Dict:
+def _empty_pothole_result(inferred: bool = True) -> Dict:
     """
-    Run pothole/road damage model on a single frame.
+    Pothole result for a frame with no road damage.
     
     Args:
-        frame_path: Path to frame image
-        
+        inferred: False for frames the pothole model did not run on, so the
+            tracker does not count them as frames without detections
+    
     Returns:
         Detection results dictionary
     """
-    results = pothole_model(str(frame_path), device=device, conf=POTHOLE_CONFIDENCE, verbose=False)
-    img = cv2.imread(str(frame_path))
-    h, w, _ = img.shape
-    img_area = h * w
-    
-    output = {
+    return {
         "potholes": 0,
         "road_cracks": 0,
         "barricades": 0,
         "bad_road": 0,
         "total_pothole_size": 0.0,
-        "detections": []
+        "detections": [],
+        "inferred": inferred
     }
+
+
+def _parse_pothole_result(
+    result,
+    img_area: int,
+    y_offset: int = 0,
+    letterbox: Optional[Letterbox] = None
+) -> Dict:
+    """
+    Convert a single pothole model result into a detection dictionary.
     
-    pothole_polys = []
+    Args:
+        result: Ultralytics result for one frame
+        img_area: Full frame area in pixels, so sizes stay comparable
+            whether or not the model saw a road crop
+        y_offset: Row where the model input started in the full frame
+        letterbox: Geometry of the shared input the model ran on, if any
+            (it already accounts for the road crop, so y_offset is then 0)
+        
+    Returns:
+        Detection results dictionary, with boxes in full-frame coordinates
+    """
+    xyxy, class_ids, confidences = _boxes_to_numpy(result, letterbox)
+    xyxy[:, [1, 3]] += y_offset
     
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls[0].item())
-            class_name = result.names[class_id]
-            confidence = box.conf[0].item()
-            x1, y1, x2, y2 = map(float, box.xyxy[0])
-            
-            detection_info = {
-                'class': class_name,
-                'confidence': confidence,
-                'bbox': [x1, y1, x2, y2]
-            }
-            output["detections"].append(detection_info)
-            
-            if class_name.lower() in ['pothole', 'potholes']:
-                output["potholes"] += 1
-                poly = Polygon([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
-                pothole_polys.append(poly)
-            elif class_name.lower() in ['road_crack', 'road_cracks', 'crack', 'cracks']:
-                output["road_cracks"] += 1
-            elif class_name.lower() in ['barricade', 'barricades']:
-                output["barricades"] += 1
-            elif class_name.lower() in ['bad_road', 'bad road']:
-                output["bad_road"] += 1
-    
-    if pothole_polys:
-        union = unary_union(pothole_polys)
-        output["total_pothole_size"] = round(union.area / img_area, 6)
+    output = _empty_pothole_result()
+    
+    is_pothole = np.zeros(len(class_ids), dtype=bool)
+    sizes = np.prod(xyxy[:, 2:] - xyxy[:, :2], axis=1) / img_area
+    
+    for i, (class_id, confidence, bbox) in enumerate(zip(class_ids, confidences, xyxy.tolist())):
+        class_name = result.names[class_id]
+        
+        detection_info = {
+            'class': class_name,
+            'confidence': float(confidence),
+            'bbox': bbox,
+            'size': round(float(sizes[i]), 6)
+        }
+        output["detections"].append(detection_info)
+        
+        if class_name.lower() in ['pothole', 'potholes']:
+            output["potholes"] += 1
+            is_pothole[i] = True
+        elif class_name.lower() in ['road_crack', 'road_cracks', 'crack', 'cracks']:
+            output["road_cracks"] += 1
+        elif class_name.lower() in ['barricade', 'barricades']:
+            output["barricades"] += 1
+        elif class_name.lower() in ['bad_road', 'bad road']:
+            output["bad_road"] += 1
+    
+    if is_pothole.any():
+        output["total_pothole_size"] = round(rectangles_union_area(xyxy[is_pothole]) / img_area, 6)
     
     return output
 
 
-def extract_frames(video_path: str, output_dir: Path, fps: int = 4) -> Tuple[List[Path], int]:
+def _predict_batch(model_name: str, frames: List[Frame], conf: float, roi_top: float = 0.0) -> list:
+    """
+    Run one registered model over a batch of frames in a single call,
+    optionally on the road crop of each frame (see app.services.road_roi).
+    """
+    return model_registry.get(model_name)(
+        [crop_road(frame.image, roi_top)[0] for frame in frames], device=model_registry.device,
+        conf=conf, batch=len(frames), imgsz=INFERENCE_IMGSZ, verbose=False
+    )
+
+
+def _predict_shared(
+    frames: List[Frame],
+    roi_top: float = 0.0,
+    pothole_mask: Optional[List[bool]] = None
+) -> Tuple[list, list, Letterbox, Letterbox]:
+    """
+    Run both models over a batch of frames on one shared letterboxed input
+    (see app.services.preprocess), so frames are resized and normalised once.
+    The pothole model gets the input rows from the road crop down, and only
+    the frames selected by pothole_mask (all frames by default).
+    
+    Returns:
+        Tuple of (congestion results, pothole results, congestion input
+        letterbox, pothole input letterbox)
+    """
+    array, letterbox = letterbox_images([frame.image for frame in frames], INFERENCE_IMGSZ)
+    pothole_row = letterbox.input_row(road_crop_offset(frames[0].height, roi_top)) if roi_top > 0 else 0
+    
+    congestion_raw = model_registry.get("congestion")(
+        model_registry.input_tensor(array), device=model_registry.device,
+        conf=CONGESTION_CONFIDENCE, verbose=False
+    )
+    
+    pothole_input = array if pothole_mask is None else array[np.asarray(pothole_mask, dtype=bool)]
+    pothole_raw = []
+    if len(pothole_input):
+        pothole_raw = model_registry.get("pothole")(
+            model_registry.input_tensor(pothole_input[:, :, pothole_row:]), device=model_registry.device,
+            conf=POTHOLE_CONFIDENCE, verbose=False
+        )
+    return congestion_raw, pothole_raw, letterbox, letterbox.crop_rows(pothole_row)
+
+
+def run_congestion_detection_on_batch(frames: List[Frame]) -> List[Dict]:
     """
-    Extract frames from video at specified FPS.
+    Run congestion model on a batch of frames in a single model call.
     
     Args:
-        video_path: Path to video file
-        output_dir: Directory to save frames
-        fps: Target frames per second
+        frames: Decoded frames
         
     Returns:
-        Tuple of (list of frame paths, total frame count)
+        Detection results dictionaries, one per frame, in input order
+    """
+    results = _predict_batch("congestion", frames, CONGESTION_CONFIDENCE)
+    return [
+        _parse_congestion_result(result, frame.area)
+        for result, frame in zip(results, frames)
+    ]
+
+
+def run_pothole_detection_on_batch(frames: List[Frame], roi_top: float = 0.0) -> List[Dict]:
     """
-    cap = cv2.VideoCapture(str(video_path))
-    video_fps = cap.get(cv2.CAP_PROP_FPS)
-    total_video_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    Run pothole/road damage model on a batch of frames in a single model call.
     
-    if video_fps == 0:
-        cap.release()
-        return [], 0
+    Args:
+        frames: Decoded frames
+        roi_top: Fraction of each frame's height cropped from the top
+            before inference (0 runs on the full frame)
+        
+    Returns:
+        Detection results dictionaries, one per frame, in input order
+    """
+    results = _predict_batch("pothole", frames, POTHOLE_CONFIDENCE, roi_top)
+    return [
+        _parse_pothole_result(result, frame.area, road_crop_offset(frame.height, roi_top))
+        for result, frame in zip(results, frames)
+    ]
+
+
+def run_congestion_detection_on_frame(frame: Frame) -> Dict:
+    """
+    Run congestion model on a single frame.
     
-    frame_interval = max(1, round(video_fps / fps))
-    frames = []
-    frame_count = 0
-    saved_count = 0
-    video_name = Path(video_path).stem
+    Args:
+        frame: Decoded frame
+        
+    Returns:
+        Detection results dictionary
+    """
+    return run_congestion_detection_on_batch([frame])[0]
+
+
+def run_pothole_detection_on_frame(frame: Frame, roi_top: float = 0.0) -> Dict:
+    """
+    Run pothole/road damage model on a single frame.
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    Args:
+        frame: Decoded frame
+        roi_top: Fraction of the frame height cropped from the top
+            before inference (0 runs on the full frame)
         
-        if frame_count % frame_interval == 0:
-            frame_filename = f"{video_name}_frame_{saved_count:05d}.jpg"
-            frame_path = output_dir / frame_filename
-            cv2.imwrite(str(frame_path), frame)
-            frames.append(frame_path)
-            saved_count += 1
+    Returns:
+        Detection results dictionary
+    """
+    return run_pothole_detection_on_batch([frame], roi_top)[0]
+
+
+# Marks the end of a stage's output stream
+_STAGE_DONE = object()
+
+
+def detection_settings() -> Dict:
+    """
+    Settings that change per-frame detection results, for checkpoint job keys.
+    
+    Returns:
+        Dictionary of model, preprocessing and frame filter settings
+    """
+    return {
+        'inference_backend': model_registry.backend,
+        'model_precision': model_registry.precision,
+        'inference_imgsz': INFERENCE_IMGSZ,
+        'shared_preprocess': INFERENCE_SHARED_PREPROCESS,
+        'congestion_confidence': CONGESTION_CONFIDENCE,
+        'pothole_confidence': POTHOLE_CONFIDENCE,
+        'pothole_roi_mode': POTHOLE_ROI_MODE,
+        'frame_dedup': [
+            FRAME_DEDUP_THRESHOLD, FRAME_DEDUP_MAX_REUSE, FRAME_SIGNATURE_SIZE
+        ] if FRAME_DEDUP_ENABLED else None,
+        'frame_quality_filter': [
+            FRAME_QUALITY_WIDTH, FRAME_QUALITY_HISTORY, FRAME_MIN_BRIGHTNESS,
+            FRAME_RELATIVE_BRIGHTNESS, FRAME_RELATIVE_SHARPNESS, FRAME_DARK_PIXEL_LEVEL,
+            FRAME_MAX_OCCLUDED_INCREASE
+        ] if FRAME_QUALITY_FILTER else None,
+    }
+
+
+def run_staged_detection(
+    frames: Iterable[Frame],
+    batch_size: int = INFERENCE_BATCH_SIZE,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    skip_duplicates: bool = FRAME_DEDUP_ENABLED,
+    filter_quality: bool = FRAME_QUALITY_FILTER,
+    pothole_roi_top: float = 0.0,
+    checkpoint: Optional[DetectionCheckpoint] = None,
+    shared_preprocess: bool = INFERENCE_SHARED_PREPROCESS,
+    pothole_schedule: Optional[Callable[[float], bool]] = None
+) -> Tuple[List[Dict], List[Dict], List[float], Dict]:
+    """
+    Run both detectors over decoded frames as three overlapping stages:
+    a decode thread, an inference thread (batch_size frames per model call),
+    and post-processing (result parsing) on the calling thread.
+    
+    Stages are connected by bounded queues, so at most about
+    batch_size * queue_size decoded frames and queue_size batches of raw
+    results are held in memory at once.
+    
+    With filter_quality, the decode thread drops dark, occluded and blurred
+    frames; they produce no results at all. With skip_duplicates, it flags
+    frames that are nearly identical to the last inferred frame; those skip
+    both models and reuse the previous frame's results. With
+    pothole_schedule, frames it turns down skip the pothole model and get
+    an empty pothole result.
+    
+    Args:
+        frames: Decoded frames in video order (e.g. a VideoFrameSource)
+        batch_size: Number of frames sent to each model per call
+        queue_size: Number of batches buffered between stages
+        skip_duplicates: Reuse results for near-duplicate frames
+        filter_quality: Drop low-quality frames before inference
+        pothole_roi_top: Fraction of each frame's height cropped from the
+            top before the pothole model runs (see road_roi_top)
+        checkpoint: Loaded checkpoint to resume from and save progress to;
+            frames must then start after checkpoint.next_source_index - 1
+        shared_preprocess: Letterbox each batch once for both models
+            (see _predict_shared) instead of per model
+        pothole_schedule: Called with each inferred frame's timestamp, in
+            order; returns whether the pothole model runs on it (e.g. a
+            SensorTriggeredSchedule)
+        
+    Returns:
+        Tuple of (congestion results, pothole results, frame timestamps in
+        seconds, stats), with one entry per frame
+    """
+    batch_size = max(1, batch_size)
+    queue_size = max(1, queue_size)
+    frame_queue = queue.Queue(maxsize=batch_size * queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    stage_seconds = {'decode': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+    duplicate_gate = DuplicateFrameGate() if skip_duplicates else None
+    quality_gate = FrameQualityGate() if filter_quality else None
+    
+    def put(q: queue.Queue, item) -> bool:
+        # Block until there is room, giving up once the pipeline is stopping
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def get(q: queue.Queue):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STAGE_DONE
+    
+    def decode_stage():
+        try:
+            frame_iter = iter(frames)
+            # Reasons for frames rejected since the last queued frame, passed
+            # along with it so checkpoints count rejections up to that frame
+            rejected_before = []
+            while True:
+                start = time.perf_counter()
+                frame = next(frame_iter, None)
+                if frame is None:
+                    stage_seconds['decode'] += time.perf_counter() - start
+                    break
+                reason = quality_gate.check(frame.image) if quality_gate is not None else None
+                if reason:
+                    rejected_before.append(reason)
+                    stage_seconds['decode'] += time.perf_counter() - start
+                    continue
+                reuse = duplicate_gate is not None and duplicate_gate.is_duplicate(frame.image)
+                run_pothole = not reuse and (pothole_schedule is None or pothole_schedule(frame.timestamp))
+                stage_seconds['decode'] += time.perf_counter() - start
+                
+                if not put(frame_queue, (frame, reuse, run_pothole, rejected_before)):
+                    return
+                rejected_before = []
+            put(frame_queue, _STAGE_DONE)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+    
+    def inference_stage():
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < batch_size:
+                    item = get(frame_queue)
+                    if item is _STAGE_DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                
+                if not batch:
+                    continue
+                
+                # Only frames that are not reusing earlier results go to the models
+                to_infer = [frame for frame, reuse, _, _ in batch if not reuse]
+                pothole_mask = [run_pothole for _, reuse, run_pothole, _ in batch if not reuse]
+                congestion_raw, pothole_raw = [], []
+                letterboxes = (None, None)
+                if to_infer:
+                    start = time.perf_counter()
+                    if shared_preprocess:
+                        congestion_raw, pothole_raw, *letterboxes = _predict_shared(
+                            to_infer, pothole_roi_top, pothole_mask
+                        )
+                    else:
+                        pothole_frames = [frame for frame, run in zip(to_infer, pothole_mask) if run]
+                        congestion_raw = _predict_batch("congestion", to_infer, CONGESTION_CONFIDENCE)
+                        if pothole_frames:
+                            pothole_raw = _predict_batch("pothole", pothole_frames, POTHOLE_CONFIDENCE, pothole_roi_top)
+                    stage_seconds['inference'] += time.perf_counter() - start
+                
+                if not put(result_queue, (batch, congestion_raw, pothole_raw, letterboxes)):
+                    return
+            put(result_queue, _STAGE_DONE)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+    
+    threads = [
+        threading.Thread(target=decode_stage, name="pipeline-decode", daemon=True),
+        threading.Thread(target=inference_stage, name="pipeline-inference", daemon=True),
+    ]
+    
+    congestion_results = []
+    pothole_results = []
+    frame_times = []
+    # Gate counts up to the last post-processed frame, including resumed frames
+    counters = {
+        'frames_skipped_duplicate': 0,
+        'frames_pothole_skipped': 0,
+        'frames_rejected_by_reason': {reason: 0 for reason in QUALITY_REJECT_REASONS},
+    }
+    if checkpoint is not None and checkpoint.state:
+        congestion_results.extend(checkpoint.state['congestion_results'])
+        pothole_results.extend(checkpoint.state['pothole_results'])
+        frame_times.extend(checkpoint.state['frame_times'])
+        resumed_counters = checkpoint.state.get('counters', {})
+        counters['frames_skipped_duplicate'] = resumed_counters.get('frames_skipped_duplicate', 0)
+        counters['frames_pothole_skipped'] = resumed_counters.get('frames_pothole_skipped', 0)
+        counters['frames_rejected_by_reason'].update(resumed_counters.get('frames_rejected_by_reason', {}))
+    resumed = len(frame_times)
+    resumed_duplicates = counters['frames_skipped_duplicate']
+    resumed_rejected = dict(counters['frames_rejected_by_reason'])
+    batches = 0
+    started_at = time.perf_counter()
+    
+    try:
+        for thread in threads:
+            thread.start()
         
-        frame_count += 1
+        while True:
+            item = get(result_queue)
+            if item is _STAGE_DONE:
+                break
+            
+            batch, congestion_raw, pothole_raw, (congestion_letterbox, pothole_letterbox) = item
+            congestion_raw, pothole_raw = iter(congestion_raw), iter(pothole_raw)
+            start = time.perf_counter()
+            for frame, reuse, run_pothole, rejected_before in batch:
+                for reason in rejected_before:
+                    counters['frames_rejected_by_reason'][reason] += 1
+                if reuse:
+                    # Results arrive in frame order, so the last entry is the previous frame's
+                    congestion_results.append(dict(congestion_results[-1]))
+                    pothole_results.append(dict(pothole_results[-1]))
+                    counters['frames_skipped_duplicate'] += 1
+                else:
+                    congestion_results.append(_parse_congestion_result(
+                        next(congestion_raw), frame.area, congestion_letterbox
+                    ))
+                    if run_pothole:
+                        # A shared-input letterbox already includes the road crop offset
+                        y_offset = 0 if pothole_letterbox else road_crop_offset(frame.height, pothole_roi_top)
+                        pothole_results.append(_parse_pothole_result(
+                            next(pothole_raw), frame.area, y_offset, pothole_letterbox
+                        ))
+                    else:
+                        pothole_results.append(_empty_pothole_result(inferred=False))
+                        counters['frames_pothole_skipped'] += 1
+                frame_times.append(frame.timestamp)
+            stage_seconds['postprocess'] += time.perf_counter() - start
+            
+            batches += 1
+            print(f"[Pipeline] Processed frames {batch[0][0].index + 1}-{batch[-1][0].index + 1}")
+            
+            if checkpoint is not None:
+                checkpoint.maybe_save(
+                    congestion_results, pothole_results, frame_times, batch[-1][0].source_index, counters
+                )
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    
+    if errors:
+        raise errors[0]
     
-    cap.release()
-    return frames, total_video_frames
+    elapsed = time.perf_counter() - started_at
+    skipped = counters['frames_skipped_duplicate']
+    # This run's gate also counted frames rejected after the last queued frame
+    rejected = dict(resumed_rejected)
+    if quality_gate is not None:
+        for reason, count in quality_gate.rejected.items():
+            rejected[reason] += count
+    stats = {
+        'frames': len(congestion_results),
+        'frames_resumed': resumed,
+        'frames_inferred': len(congestion_results) - resumed - (skipped - resumed_duplicates),
+        'frames_skipped_duplicate': skipped,
+        'frames_pothole_skipped': counters['frames_pothole_skipped'],
+        'frames_rejected': sum(rejected.values()),
+        'frames_rejected_by_reason': dict(rejected),
+        'batches': batches,
+        'elapsed_s': round(elapsed, 3),
+        'decode_s': round(stage_seconds['decode'], 3),
+        'inference_s': round(stage_seconds['inference'], 3),
+        'postprocess_s': round(stage_seconds['postprocess'], 3),
+    }
+    print(
+        f"[Pipeline] Detection finished: {stats['frames']} frames in {stats['elapsed_s']}s, "
+        f"{stats['frames_skipped_duplicate']} near-duplicates skipped, "
+        f"{stats['frames_pothole_skipped']} frames without pothole inference, "
+        f"{stats['frames_rejected']} low-quality frames rejected {stats['frames_rejected_by_reason']} "
+        f"(decode {stats['decode_s']}s, inference {stats['inference_s']}s, "
+        f"post-processing {stats['postprocess_s']}s)"
+    )
+    
+    return congestion_results, pothole_results, frame_times, stats
 
 
 def parse_model_outputs_to_events(
@@ -358,11 +842,21 @@ def parse_model_outputs_to_events(
     congestion_results: List[Dict],
     pothole_results: List[Dict],
     gps_data: List[Dict],
-    video_timestamp: datetime
+    video_timestamp: datetime,
+    frame_times: Optional[List[float]] = None,
+    video_duration: Optional[float] = None,
+    track_potholes: bool = POTHOLE_TRACKING,
+    fuse: bool = EVENT_FUSION
 ) -> List[Dict]:
     """
     Convert model outputs into standardized event dictionaries.
     
+    With track_potholes, potholes and cracks are tracked across frames
+    (see app.services.tracking) and each track becomes one event; otherwise
+    every frame with road damage is its own event. With fuse, runs of
+    per-frame events close in time and space become one event (see
+    app.services.event_fusion).
+    
     Args:
         upload_id: UUID of the upload
         device_id: Device identifier
@@ -370,6 +864,11 @@ def parse_model_outputs_to_events(
         pothole_results: List of pothole detections per frame
         gps_data: List of GPS data points
         video_timestamp: Base timestamp for the video
+        frame_times: Video timestamp (seconds) of each frame; needed when
+            frames were not sampled at a fixed FRAMES_PER_SECOND
+        video_duration: Video duration in seconds, used with frame_times
+        track_potholes: Emit one event per tracked pothole/crack
+        fuse: Fuse runs of per-frame events
         
     Returns:
         List of event dictionaries ready for database insertion
@@ -377,62 +876,127 @@ def parse_model_outputs_to_events(
     events = []
     total_frames = max(len(congestion_results), len(pothole_results))
     
+    def frame_gps_and_offset(frame_idx: int) -> Tuple[Dict, float]:
+        # GPS position and seconds from video start for a sampled frame
+        if frame_times is not None and video_duration:
+            offset = frame_times[frame_idx]
+            return interpolate_gps_at(offset / video_duration, gps_data), offset
+        offset = frame_idx / max(FRAMES_PER_SECOND, 1)
+        return interpolate_gps_for_frame(frame_idx, total_frames, gps_data), offset
+    
+    def track_event(track: Track) -> Optional[Dict]:
+        # Locate the track where it looked largest (closest to the camera),
+        # falling back to any of its frames with a GPS fix
+        for frame_idx in [track.peak_frame_idx] + track.frame_indices:
+            gps, _ = frame_gps_and_offset(frame_idx)
+            if gps['lat'] != 0 or gps['lon'] != 0:
+                break
+        else:
+            return None
+        
+        _, first_offset = frame_gps_and_offset(track.first_frame_idx)
+        _, last_offset = frame_gps_and_offset(track.last_frame_idx)
+        # Same definition as per-frame events: union of the frame's pothole
+        # boxes over the image area, at the frame where the track peaked
+        pothole_size = (
+            pothole_results[track.peak_frame_idx].get('total_pothole_size', 0)
+            if track.kind == 'pothole' else 0
+        )
+        
+        return {
+            'event_id': str(uuid.uuid4()),
+            'upload_id': upload_id,
+            'event_type': track.kind,
+            'detected_at': datetime.fromtimestamp(video_timestamp.timestamp() + first_offset),
+            'device_id': device_id,
+            'lat': gps['lat'],
+            'lon': gps['lon'],
+            'tile_id': lat_lon_to_tile_id(gps['lat'], gps['lon']),
+            'model_outputs': {
+                'potholes': int(track.kind == 'pothole'),
+                'road_cracks': int(track.kind == 'crack'),
+                'total_pothole_size': pothole_size,
+                'peak_box_size': track.peak_size,
+                'detections': [track.best_detection],
+                'frame_idx': track.peak_frame_idx,
+                'frames_seen': track.frames_seen,
+                'first_frame_idx': track.first_frame_idx,
+                'last_frame_idx': track.last_frame_idx,
+                'duration_s': round(last_offset - first_offset, 3),
+                'velocity': gps['velocity'],
+                'gyro_magnitude': gps['gyro_magnitude']
+            },
+            'severity': calculate_severity({
+                'confidence': track.best_confidence,
+                'total_pothole_size': pothole_size,
+                'type': track.kind
+            }),
+            'confidence': track.best_confidence,
+            'frame_refs': [f"frame_{frame_idx:05d}" for frame_idx in track.frame_indices]
+        }
+    
     # Process pothole/road damage events
-    for frame_idx, result in enumerate(pothole_results):
-        if result.get('potholes', 0) > 0 or result.get('road_cracks', 0) > 0:
-            gps = interpolate_gps_for_frame(frame_idx, total_frames, gps_data)
-            
-            # Skip if no valid GPS
-            if gps['lat'] == 0 and gps['lon'] == 0:
-                continue
-            
-            tile_id = lat_lon_to_tile_id(gps['lat'], gps['lon'])
-            
-            # Determine event type
-            if result.get('potholes', 0) > 0:
-                event_type = 'pothole'
-            else:
-                event_type = 'crack'
-            
-            # Calculate timestamp for this frame
-            frame_time_offset = frame_idx / max(FRAMES_PER_SECOND, 1)
-            detected_at = datetime.fromtimestamp(
-                video_timestamp.timestamp() + frame_time_offset
-            )
-            
-            # Get confidence from detections
-            confidence = 0.0
-            for det in result.get('detections', []):
-                if event_type.lower() in det.get('class', '').lower():
-                    confidence = max(confidence, det.get('confidence', 0))
-            
-            event = {
-                'event_id': str(uuid.uuid4()),
-                'upload_id': upload_id,
-                'event_type': event_type,
-                'detected_at': detected_at,
-                'device_id': device_id,
-                'lat': gps['lat'],
-                'lon': gps['lon'],
-                'tile_id': tile_id,
-                'model_outputs': {
-                    'potholes': result.get('potholes', 0),
-                    'road_cracks': result.get('road_cracks', 0),
-                    'total_pothole_size': result.get('total_pothole_size', 0),
-                    'detections': result.get('detections', []),
-                    'frame_idx': frame_idx,
-                    'velocity': gps['velocity'],
-                    'gyro_magnitude': gps['gyro_magnitude']
-                },
-                'severity': calculate_severity({
+    if track_potholes:
+        tracks = track_detections(pothole_results)
+        for track in tracks:
+            event = track_event(track)
+            if event is not None:
+                events.append(event)
+    else:
+        for frame_idx, result in enumerate(pothole_results):
+            if result.get('potholes', 0) > 0 or result.get('road_cracks', 0) > 0:
+                gps, frame_time_offset = frame_gps_and_offset(frame_idx)
+                
+                # Skip if no valid GPS
+                if gps['lat'] == 0 and gps['lon'] == 0:
+                    continue
+                
+                tile_id = lat_lon_to_tile_id(gps['lat'], gps['lon'])
+                
+                # Determine event type
+                if result.get('potholes', 0) > 0:
+                    event_type = 'pothole'
+                else:
+                    event_type = 'crack'
+                
+                # Calculate timestamp for this frame
+                detected_at = datetime.fromtimestamp(
+                    video_timestamp.timestamp() + frame_time_offset
+                )
+                
+                # Get confidence from detections
+                confidence = 0.0
+                for det in result.get('detections', []):
+                    if event_type.lower() in det.get('class', '').lower():
+                        confidence = max(confidence, det.get('confidence', 0))
+                
+                event = {
+                    'event_id': str(uuid.uuid4()),
+                    'upload_id': upload_id,
+                    'event_type': event_type,
+                    'detected_at': detected_at,
+                    'device_id': device_id,
+                    'lat': gps['lat'],
+                    'lon': gps['lon'],
+                    'tile_id': tile_id,
+                    'model_outputs': {
+                        'potholes': result.get('potholes', 0),
+                        'road_cracks': result.get('road_cracks', 0),
+                        'total_pothole_size': result.get('total_pothole_size', 0),
+                        'detections': result.get('detections', []),
+                        'frame_idx': frame_idx,
+                        'velocity': gps['velocity'],
+                        'gyro_magnitude': gps['gyro_magnitude']
+                    },
+                    'severity': calculate_severity({
+                        'confidence': confidence,
+                        'total_pothole_size': result.get('total_pothole_size', 0),
+                        'type': event_type
+                    }),
                     'confidence': confidence,
-                    'total_pothole_size': result.get('total_pothole_size', 0),
-                    'type': event_type
-                }),
-                'confidence': confidence,
-                'frame_refs': [f"frame_{frame_idx:05d}"]
-            }
-            events.append(event)
+                    'frame_refs': [f"frame_{frame_idx:05d}"]
+                }
+                events.append(event)
     
     # Process congestion events
     for frame_idx, result in enumerate(congestion_results):
@@ -441,14 +1005,13 @@ def parse_model_outputs_to_events(
         
         # Only create event if significant congestion
         if vehicle_count >= 3 or coverage >= 0.15:
-            gps = interpolate_gps_for_frame(frame_idx, total_frames, gps_data)
+            gps, frame_time_offset = frame_gps_and_offset(frame_idx)
             
             if gps['lat'] == 0 and gps['lon'] == 0:
                 continue
             
             tile_id = lat_lon_to_tile_id(gps['lat'], gps['lon'])
             
-            frame_time_offset = frame_idx / max(FRAMES_PER_SECOND, 1)
             detected_at = datetime.fromtimestamp(
                 video_timestamp.timestamp() + frame_time_offset
             )
@@ -480,6 +1043,11 @@ def parse_model_outputs_to_events(
             }
             events.append(event)
     
+    if fuse:
+        # Tracked potholes and cracks are already one event per object
+        per_frame = [e for e in events if e['event_type'] == 'congestion' or not track_potholes]
+        events = [e for e in events if e['event_type'] != 'congestion' and track_potholes] + fuse_events(per_frame)
+    
     return events
 
 
@@ -503,17 +1071,59 @@ async def process_video_from_s3(
     Returns:
         List of created events
     """
-    from app.services.event_service import store_events_and_update_tiles, mark_upload_processed
+    from app.services.event_service import (
+        store_events_and_update_tiles, mark_upload_processed,
+        find_processed_duplicate, mark_upload_duplicate
+    )
     
     local_video_path = None
     local_csv_path = None
+    download = None
+    # Recorded with the upload's final status so later re-uploads can match it
+    fingerprints = {'content_hash': None, 'etag_fingerprint': None}
+    
+    async def skip_duplicate(original_upload_id: str) -> List[Dict]:
+        # Link to the original's results and drop the re-uploaded objects
+        print(f"[Pipeline] Upload {upload_id} is a duplicate of {original_upload_id}, not storing its events")
+        await mark_upload_duplicate(upload_id, original_upload_id, db_session, **fingerprints)
+        await s3_service.delete_object(s3_key_video)
+        if s3_key_csv:
+            await s3_service.delete_object(s3_key_csv)
+        return []
     
     try:
         print(f"[Pipeline] Starting processing for upload {upload_id}")
         
-        # Download video from S3
-        print(f"[Pipeline] Downloading video: {s3_key_video}")
-        local_video_path = await s3_service.download_video(s3_key_video)
+        # Recognise re-uploads made the same way from the S3 ETag before downloading anything
+        fingerprints['etag_fingerprint'] = await s3_service.get_content_fingerprint(s3_key_video)
+        if fingerprints['etag_fingerprint']:
+            original_upload_id = await find_processed_duplicate(
+                upload_id, db_session, etag_fingerprint=fingerprints['etag_fingerprint']
+            )
+            if original_upload_id:
+                return await skip_duplicate(original_upload_id)
+        
+        loop = asyncio.get_event_loop()
+        
+        # Download video from S3, or with streaming ingest start decoding while
+        # it downloads
+        if S3_STREAMING_INGEST:
+            print(f"[Pipeline] Streaming video: {s3_key_video}")
+            download = await s3_service.start_streaming_download(s3_key_video)
+            local_video_path = download.local_path
+        else:
+            print(f"[Pipeline] Downloading video: {s3_key_video}")
+            local_video_path = await s3_service.download_video(s3_key_video)
+        
+        # Canonical SHA-256 fingerprint, matching any upload of the same bytes;
+        # a streamed file is only complete later, so it is checked after detection
+        if download is None:
+            fingerprints['content_hash'] = await loop.run_in_executor(None, file_fingerprint, local_video_path)
+            original_upload_id = await find_processed_duplicate(
+                upload_id, db_session, content_hash=fingerprints['content_hash']
+            )
+            if original_upload_id:
+                return await skip_duplicate(original_upload_id)
         
         # Download CSV if available
         gps_data = []
@@ -536,44 +1146,75 @@ async def process_video_from_s3(
         except:
             video_timestamp = datetime.now()
         
-        # Create temporary directory for frames
-        FRAMES_FOLDER.mkdir(parents=True, exist_ok=True)
+        roi_top = await loop.run_in_executor(None, estimate_road_roi, local_video_path, download)
         
-        # Extract frames
-        print(f"[Pipeline] Extracting frames at {FRAMES_PER_SECOND} FPS")
-        frames, total_video_frames = extract_frames(
-            local_video_path, 
-            FRAMES_FOLDER, 
-            fps=FRAMES_PER_SECOND
+        # Resume from the last checkpoint of an earlier attempt, if it was the same job
+        checkpoint = DetectionCheckpoint(upload_id, job={
+            's3_key_video': s3_key_video,
+            'frames_per_second': FRAMES_PER_SECOND,
+            'adaptive_sampling': bool(ADAPTIVE_SAMPLING and gps_data),
+            'pothole_roi_top': roi_top,
+            'sensor_triggered': bool(SENSOR_TRIGGERED_POTHOLES and gps_data),
+            **detection_settings(),
+        })
+        checkpoint.load()
+        
+        # Decode frames in memory; a streamed video is decoded from the
+        # download, whose reads wait for the chunks they need
+        frame_source = await loop.run_in_executor(
+            None,
+            partial(
+                build_frame_source,
+                download if download is not None else local_video_path,
+                gps_data,
+                start_index=checkpoint.next_source_index
+            )
         )
+        frames = StreamingFrames(frame_source, download) if download is not None else frame_source
+        pothole_schedule = build_pothole_schedule(frame_source, gps_data)
         
-        if not frames:
-            print(f"[Pipeline] No frames extracted from video")
-            return []
+        # Run decode, inference and post-processing as overlapping stages
+        congestion_results, pothole_results, frame_times, detection_stats = await loop.run_in_executor(
+            None,
+            partial(
+                run_staged_detection,
+                frames,
+                batch_size=INFERENCE_BATCH_SIZE,
+                pothole_roi_top=roi_top,
+                checkpoint=checkpoint,
+                pothole_schedule=pothole_schedule
+            )
+        )
         
-        print(f"[Pipeline] Extracted {len(frames)} frames")
+        if download is not None:
+            detection_stats.update(download.stats(frames.decode_started_at))
+            print(
+                f"[Pipeline] Download took {detection_stats['download_s']}s, "
+                f"{detection_stats['download_overlap_s']}s of it overlapped with decoding"
+            )
+            
+            await loop.run_in_executor(None, download.wait)
+            fingerprints['content_hash'] = await loop.run_in_executor(None, file_fingerprint, local_video_path)
+            original_upload_id = await find_processed_duplicate(
+                upload_id, db_session, content_hash=fingerprints['content_hash']
+            )
+            if original_upload_id:
+                checkpoint.clear()
+                return await skip_duplicate(original_upload_id)
         
-        # Run detection models on each frame
-        congestion_results = []
-        pothole_results = []
+        if not congestion_results:
+            if not detection_stats['frames_rejected']:
+                raise ValueError("No frames extracted from video")
+            # Decoded fine, but every frame failed the quality filter: keep the
+            # S3 objects so the upload can be reprocessed with the filter off
+            print(f"[Pipeline] All {detection_stats['frames_rejected']} frames rejected by the quality filter")
+            await mark_upload_processed(
+                upload_id, db_session, stats=detection_stats, status='no_usable_frames', **fingerprints
+            )
+            checkpoint.clear()
+            return []
         
-        for idx, frame_path in enumerate(frames):
-            if idx % 10 == 0:
-                print(f"[Pipeline] Processing frame {idx + 1}/{len(frames)}")
-            
-            # Run congestion detection
-            cong_result = run_congestion_detection_on_frame(str(frame_path))
-            congestion_results.append(cong_result)
-            
-            # Run pothole detection
-            pot_result = run_pothole_detection_on_frame(str(frame_path))
-            pothole_results.append(pot_result)
-            
-            # Delete frame after processing
-            try:
-                frame_path.unlink()
-            except:
-                pass
+        print(f"[Pipeline] Processed {len(congestion_results)} frames")
         
         # Parse model outputs into events
         print(f"[Pipeline] Parsing model outputs to events")
@@ -583,7 +1224,9 @@ async def process_video_from_s3(
             congestion_results=congestion_results,
             pothole_results=pothole_results,
             gps_data=gps_data,
-            video_timestamp=video_timestamp
+            video_timestamp=video_timestamp,
+            frame_times=frame_times,
+            video_duration=frame_source.duration
         )
         
         print(f"[Pipeline] Generated {len(events)} events")
@@ -593,8 +1236,9 @@ async def process_video_from_s3(
             print(f"[Pipeline] Storing events and updating tiles")
             await store_events_and_update_tiles(events, db_session)
         
-        # Mark upload as processed
-        await mark_upload_processed(upload_id, db_session)
+        # Mark upload as processed, keeping the detection stats with the upload
+        await mark_upload_processed(upload_id, db_session, stats=detection_stats, **fingerprints)
+        checkpoint.clear()
         
         # Delete from S3
         print(f"[Pipeline] Deleting video from S3")
@@ -612,6 +1256,10 @@ async def process_video_from_s3(
         raise
         
     finally:
+        if download is not None:
+            # Wait for in-flight chunk writes before removing the file
+            await loop.run_in_executor(None, download.cancel)
+        
         # Cleanup local files
         if local_video_path and Path(local_video_path).exists():
             try:
@@ -659,35 +1307,26 @@ async def process_local_video_to_events(
     except:
         video_timestamp = datetime.now()
     
-    # Create temporary directory for frames
-    FRAMES_FOLDER.mkdir(parents=True, exist_ok=True)
-    
-    # Extract frames
-    frames, total_video_frames = extract_frames(
-        str(video_path),
-        FRAMES_FOLDER,
-        fps=FRAMES_PER_SECOND
+    # Run detection models on frames decoded in memory
+    frame_source = build_frame_source(video_path, gps_data)
+    loop = asyncio.get_event_loop()
+    roi_top = await loop.run_in_executor(None, road_roi_top, video_path)
+    congestion_results, pothole_results, frame_times, detection_stats = await loop.run_in_executor(
+        None,
+        partial(
+            run_staged_detection,
+            frame_source,
+            batch_size=INFERENCE_BATCH_SIZE,
+            pothole_roi_top=roi_top,
+            pothole_schedule=build_pothole_schedule(frame_source, gps_data)
+        )
     )
     
-    if not frames:
+    if not congestion_results:
+        if detection_stats['frames_rejected']:
+            print(f"[Pipeline] All {detection_stats['frames_rejected']} frames of {video_path.name} rejected by the quality filter")
         return []
     
-    # Run detection models
-    congestion_results = []
-    pothole_results = []
-    
-    for frame_path in frames:
-        cong_result = run_congestion_detection_on_frame(str(frame_path))
-        congestion_results.append(cong_result)
-        
-        pot_result = run_pothole_detection_on_frame(str(frame_path))
-        pothole_results.append(pot_result)
-        
-        try:
-            frame_path.unlink()
-        except:
-            pass
-    
     # Parse to events
     events = parse_model_outputs_to_events(
         upload_id=upload_id,
@@ -695,7 +1334,9 @@ async def process_local_video_to_events(
         congestion_results=congestion_results,
         pothole_results=pothole_results,
         gps_data=gps_data,
-        video_timestamp=video_timestamp
+        video_timestamp=video_timestamp,
+        frame_times=frame_times,
+        video_duration=frame_source.duration
     )
     
     # Store events
@@ -10,6 +10,10 @@ from .tiles import (
     TILE_SIZE_KM,
     TileBounds
 )
+from .geometry import (
+    rectangles_union_area,
+    coverage_by_label
+)
 
 __all__ = [
     "lat_lon_to_tile_id",
@@ -20,5 +24,7 @@ __all__ = [
     "calculate_tile_distance",
     "KM_TO_DEG_LAT",
     "TILE_SIZE_KM",
-    "TileBounds"
+    "TileBounds",
+    "rectangles_union_area",
+    "coverage_by_label"
 ]
@@ -0,0 +1,90 @@
+"""
+Vectorized geometry helpers for detection post-processing.
+
+Coverage of axis-aligned boxes is computed with coordinate compression:
+the box edges split the plane into a grid of cells, and a cell is covered
+when at least one box contains it. Everything is plain NumPy, so a frame
+with dozens of boxes costs a couple of small matrix products instead of
+building and unioning one polygon per box.
+"""
+from typing import Dict, Hashable, Sequence, Tuple
+
+import numpy as np
+
+
+def _compressed_grid(xyxy: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the compressed grid for a set of boxes.
+
+    Args:
+        xyxy: (N, 4) array of boxes as x1, y1, x2, y2
+
+    Returns:
+        Tuple of (cx, cy, cell_area): boolean (N, GX) and (N, GY) matrices
+        marking which grid columns/rows each box spans, and the (GX, GY)
+        area of every grid cell
+    """
+    xs = np.unique(np.concatenate([xyxy[:, 0], xyxy[:, 2]]))
+    ys = np.unique(np.concatenate([xyxy[:, 1], xyxy[:, 3]]))
+
+    cx = (xyxy[:, 0:1] <= xs[None, :-1]) & (xs[None, 1:] <= xyxy[:, 2:3])
+    cy = (xyxy[:, 1:2] <= ys[None, :-1]) & (ys[None, 1:] <= xyxy[:, 3:4])
+    cell_area = np.diff(xs)[:, None] * np.diff(ys)[None, :]
+
+    return cx, cy, cell_area
+
+
+def _covered_area(cx: np.ndarray, cy: np.ndarray, cell_area: np.ndarray) -> float:
+    # Number of boxes covering each cell; any cell with a count > 0 is in the union
+    counts = cx.T.astype(np.float32) @ cy.astype(np.float32)
+    return float(cell_area[counts > 0].sum())
+
+
+def rectangles_union_area(xyxy: np.ndarray) -> float:
+    """
+    Area of the union of axis-aligned rectangles.
+
+    Args:
+        xyxy: (N, 4) array of boxes as x1, y1, x2, y2
+
+    Returns:
+        Union area in the same units as the box coordinates
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    if len(xyxy) == 0:
+        return 0.0
+
+    return _covered_area(*_compressed_grid(xyxy))
+
+
+def coverage_by_label(
+    xyxy: np.ndarray,
+    labels: Sequence[Hashable],
+    img_area: float
+) -> Tuple[Dict[Hashable, float], float]:
+    """
+    Fraction of an image covered by boxes, per label and in total, in one pass.
+
+    Args:
+        xyxy: (N, 4) array of boxes as x1, y1, x2, y2
+        labels: N labels (class ids or names), one per box
+        img_area: Image area in the same units as the box coordinates
+
+    Returns:
+        Tuple of (coverage per label, total coverage across all boxes),
+        as unrounded fractions of img_area
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+    if len(xyxy) == 0 or img_area <= 0:
+        return {}, 0.0
+
+    cx, cy, cell_area = _compressed_grid(xyxy)
+    labels = np.asarray(labels)
+
+    per_label = {}
+    for label in np.unique(labels):
+        mask = labels == label
+        per_label[label.item()] = _covered_area(cx[mask], cy[mask], cell_area) / img_area
+
+    total = _covered_area(cx, cy, cell_area) / img_area
+    return per_label, total
@@ -195,8 +195,20 @@ def calculate_tile_distance(tile_id1: str, tile_id2: str) -> float:
     """
     lat1, lon1 = tile_id_to_center(tile_id1)
     lat2, lon2 = tile_id_to_center(tile_id2)
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points in kilometers.
     
-    # Haversine formula for distance
+    Args:
+        lat1, lon1: First point in degrees
+        lat2, lon2: Second point in degrees
+        
+    Returns:
+        Distance in kilometers
+    """
     R = 6371  # Earth radius in km
     
     lat1_rad = math.radians(lat1)
@@ -0,0 +1,81 @@
+"""
+Benchmark frame sampling strategies on dashcam videos.
+
+Usage (from the backend directory):
+    python -m benchmarks.frame_sampling uploads/video/2025-11-28_14-42-00.mp4 --fps 4
+"""
+import argparse
+import time
+from pathlib import Path
+
+from app.core.config import FRAMES_PER_SECOND
+from app.services.frames import SAMPLING_STRATEGIES, VideoFrameSource
+
+
+def benchmark_strategy(video_path: Path, fps: float, strategy: str) -> dict:
+    """Sample every frame of a video with one strategy and time it."""
+    source = VideoFrameSource(video_path, fps=fps, strategy=strategy)
+
+    start = time.perf_counter()
+    sampled = 0
+    checksum = 0
+    for frame in source:
+        sampled += 1
+        checksum += int(frame.image[::64, ::64].sum())
+    elapsed = time.perf_counter() - start
+
+    return {
+        'strategy': strategy,
+        'sampled_frames': sampled,
+        'elapsed_s': elapsed,
+        'sampled_fps': sampled / elapsed if elapsed > 0 else 0.0,
+        'video_realtime_x': source.duration / elapsed if elapsed > 0 else 0.0,
+        'checksum': checksum,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='+', type=Path, help='Video files to sample')
+    parser.add_argument('--fps', type=float, default=FRAMES_PER_SECOND, help='Target sampling FPS')
+    parser.add_argument('--strategies', nargs='+', default=list(SAMPLING_STRATEGIES), choices=SAMPLING_STRATEGIES)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per strategy (best is reported)')
+    args = parser.parse_args()
+
+    for video_path in args.videos:
+        source = VideoFrameSource(video_path, fps=args.fps)
+        if not source.is_valid:
+            print(f"{video_path}: could not open video")
+            continue
+
+        print(
+            f"\n{video_path.name}: {source.width}x{source.height} @ {source.video_fps:.1f} FPS, "
+            f"{source.total_frames} frames, sampling every {source.frame_interval} at {args.fps} FPS"
+        )
+        print(f"{'strategy':<8} {'frames':>7} {'time (s)':>9} {'frames/s':>9} {'x realtime':>11}")
+
+        results = []
+        for strategy in args.strategies:
+            runs = [benchmark_strategy(video_path, args.fps, strategy) for _ in range(max(1, args.repeat))]
+            best = min(runs, key=lambda r: r['elapsed_s'])
+            results.append(best)
+            print(
+                f"{strategy:<8} {best['sampled_frames']:>7} {best['elapsed_s']:>9.2f} "
+                f"{best['sampled_fps']:>9.1f} {best['video_realtime_x']:>11.1f}"
+            )
+
+        # Strategies must agree on which frames they return
+        counts = {r['sampled_frames'] for r in results}
+        checksums = {r['checksum'] for r in results}
+        if len(counts) > 1 or len(checksums) > 1:
+            print("WARNING: strategies returned different frames (container seeking may be inexact)")
+
+        baseline = next((r for r in results if r['strategy'] == 'read'), None)
+        if baseline:
+            for r in results:
+                if r is not baseline and r['elapsed_s'] > 0:
+                    print(f"{r['strategy']}: {baseline['elapsed_s'] / r['elapsed_s']:.2f}x vs read")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Compare inference backends for the detection models: FPS and parity with torch.
+
+Every backend runs both models over the same sampled frames. Detections are
+matched against the torch backend per frame (same class, IoU >= --iou), and
+the run fails if any backend's match rate drops below --min-match.
+
+Usage (from the backend directory):
+    python -m benchmarks.inference_backends uploads/video/2025-11-28_14-42-00.mp4 --backends torch onnx openvino
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import (
+    FRAMES_PER_SECOND, CONGESTION_CONFIDENCE, POTHOLE_CONFIDENCE, INFERENCE_BATCH_SIZE
+)
+from app.services.frames import VideoFrameSource
+from app.services.model_registry import INFERENCE_BACKENDS, ModelRegistry
+from app.utils.geometry import coverage_by_label
+
+
+MODEL_CONFIDENCE = {
+    "congestion": CONGESTION_CONFIDENCE,
+    "pothole": POTHOLE_CONFIDENCE,
+}
+
+
+def load_frames(videos, fps: float, max_frames: int) -> list:
+    """Decode up to max_frames sampled frames across the given videos."""
+    images = []
+    for video_path in videos:
+        for frame in VideoFrameSource(video_path, fps=fps):
+            images.append(frame.image)
+            if len(images) >= max_frames:
+                return images
+    return images
+
+
+def run_backend(backend: str, images: list, batch_size: int) -> dict:
+    """
+    Run both models over all images with one backend.
+
+    Returns:
+        Dict with per-model detections ((xyxy, class ids) per frame) and timings
+    """
+    registry = ModelRegistry(backend=backend)
+    registry.warmup()
+
+    detections = {name: [] for name in registry.names}
+    elapsed = {name: 0.0 for name in registry.names}
+
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        for name in registry.names:
+            t0 = time.perf_counter()
+            results = registry.get(name)(
+                batch, device=registry.device, conf=MODEL_CONFIDENCE[name],
+                batch=len(batch), verbose=False
+            )
+            elapsed[name] += time.perf_counter() - t0
+            for result in results:
+                detections[name].append((
+                    result.boxes.xyxy.cpu().numpy().astype(np.float64),
+                    result.boxes.cls.cpu().numpy().astype(int)
+                ))
+
+    return {'detections': detections, 'elapsed': elapsed}
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def compare_frames(reference: list, candidate: list, img_area: float, iou_threshold: float) -> dict:
+    """Greedy same-class IoU matching of candidate detections against the reference."""
+    matched = 0
+    total = 0
+    coverage_deltas = []
+
+    for (ref_xyxy, ref_cls), (cand_xyxy, cand_cls) in zip(reference, candidate):
+        total += max(len(ref_cls), len(cand_cls))
+        if len(ref_cls) and len(cand_cls):
+            iou = box_iou(ref_xyxy, cand_xyxy)
+            iou[ref_cls[:, None] != cand_cls[None, :]] = 0
+            while iou.size and iou.max() >= iou_threshold:
+                i, j = np.unravel_index(iou.argmax(), iou.shape)
+                matched += 1
+                iou[i, :] = 0
+                iou[:, j] = 0
+
+        _, ref_cov = coverage_by_label(ref_xyxy, ref_cls, img_area)
+        _, cand_cov = coverage_by_label(cand_xyxy, cand_cls, img_area)
+        coverage_deltas.append(abs(ref_cov - cand_cov))
+
+    return {
+        'match_rate': matched / total if total else 1.0,
+        'max_coverage_delta': max(coverage_deltas) if coverage_deltas else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='+', type=Path, help='Videos to sample frames from')
+    parser.add_argument('--backends', nargs='+', default=list(INFERENCE_BACKENDS), choices=INFERENCE_BACKENDS)
+    parser.add_argument('--fps', type=float, default=FRAMES_PER_SECOND, help='Sampling FPS')
+    parser.add_argument('--max-frames', type=int, default=200, help='Frames to benchmark')
+    parser.add_argument('--batch-size', type=int, default=INFERENCE_BATCH_SIZE)
+    parser.add_argument('--iou', type=float, default=0.9, help='IoU for a box to count as matching')
+    parser.add_argument('--min-match', type=float, default=0.95, help='Minimum match rate vs torch')
+    args = parser.parse_args()
+
+    images = load_frames(args.videos, args.fps, args.max_frames)
+    if not images:
+        print("No frames could be decoded")
+        sys.exit(1)
+    img_area = images[0].shape[0] * images[0].shape[1]
+    print(f"Benchmarking {len(images)} frames, batch size {args.batch_size}")
+
+    backends = list(dict.fromkeys(['torch'] + args.backends))
+    runs = {backend: run_backend(backend, images, args.batch_size) for backend in backends}
+    reference = runs['torch']
+
+    print(f"\n{'backend':<9} {'model':<11} {'FPS':>8} {'speedup':>8} {'match':>7} {'max cov delta':>14}")
+    failed = False
+    for backend, run in runs.items():
+        for name, elapsed in run['elapsed'].items():
+            fps = len(images) / elapsed if elapsed > 0 else 0.0
+            speedup = reference['elapsed'][name] / elapsed if elapsed > 0 else 0.0
+            parity = compare_frames(
+                reference['detections'][name], run['detections'][name], img_area, args.iou
+            )
+            failed |= parity['match_rate'] < args.min_match
+            print(
+                f"{backend:<9} {name:<11} {fps:>8.1f} {speedup:>7.2f}x "
+                f"{parity['match_rate']:>7.1%} {parity['max_coverage_delta']:>14.6f}"
+            )
+
+    if failed:
+        print(f"\nFAIL: a backend matched fewer than {args.min_match:.0%} of torch detections")
+        sys.exit(1)
+    print("\nAll backends within parity threshold")
+
+
+if __name__ == '__main__':
+    main()
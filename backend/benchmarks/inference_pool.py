@@ -0,0 +1,97 @@
+"""
+Find the best workers x threads split of the inference pool for this machine.
+
+Every split that uses all available cores runs both models over the same
+sampled frames, spread across the pool in chunks, and the aggregate FPS is
+reported. Set BATCH_PIPELINE_WORKERS and INFERENCE_THREADS_PER_WORKER to the
+best split.
+
+Usage (from the backend directory):
+    python -m benchmarks.inference_pool uploads/video/2025-11-28_14-42-00.mp4 --max-frames 400
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from app.core.config import FRAMES_PER_SECOND, INFERENCE_BATCH_SIZE
+from app.services.inference_pool import InferencePool, available_cores
+from benchmarks.inference_backends import load_frames
+
+
+def candidate_splits(cores: int, max_workers: int) -> list:
+    """(workers, threads) pairs that use every core, e.g. 1x32, 2x16, 4x8 ... on 32 cores."""
+    return [
+        (workers, cores // workers)
+        for workers in range(1, min(cores, max_workers) + 1)
+        if cores % workers == 0
+    ]
+
+
+def benchmark_split(images: list, workers: int, threads: int, chunk_size: int, batch_size: int) -> dict:
+    """Run all images through a pool with one split and time it (warm-up excluded)."""
+    with InferencePool(workers=workers, threads_per_worker=threads) as pool:
+        # One chunk per worker first, so every worker has loaded its models
+        pool.detect_frames(images[:chunk_size * workers], chunk_size, batch_size)
+
+        start = time.perf_counter()
+        pool.detect_frames(images, chunk_size, batch_size)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'workers': workers,
+        'threads': threads,
+        'cores_used': workers * threads,
+        'elapsed_s': elapsed,
+        'fps': len(images) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='+', type=Path, help='Videos to sample frames from')
+    parser.add_argument('--fps', type=float, default=FRAMES_PER_SECOND, help='Sampling FPS')
+    parser.add_argument('--max-frames', type=int, default=400, help='Frames to benchmark')
+    parser.add_argument('--batch-size', type=int, default=INFERENCE_BATCH_SIZE)
+    parser.add_argument('--chunk-size', type=int, default=INFERENCE_BATCH_SIZE * 4, help='Frames per pool task')
+    parser.add_argument('--max-workers', type=int, default=16)
+    parser.add_argument(
+        '--splits', nargs='+', metavar='WORKERSxTHREADS',
+        help='Splits to try, e.g. 1x32 4x8 8x4 (default: a sweep over the available cores)'
+    )
+    args = parser.parse_args()
+
+    images = load_frames(args.videos, args.fps, args.max_frames)
+    if not images:
+        print("No frames could be decoded")
+        sys.exit(1)
+
+    cores = len(available_cores())
+    if args.splits:
+        splits = [tuple(int(n) for n in split.lower().split('x')) for split in args.splits]
+    else:
+        splits = candidate_splits(cores, args.max_workers)
+    print(f"Benchmarking {len(images)} frames on {cores} cores, {len(splits)} splits")
+
+    runs = []
+    for workers, threads in splits:
+        run = benchmark_split(images, workers, threads, args.chunk_size, args.batch_size)
+        runs.append(run)
+        print(f"  {workers:>3} x {threads:<3} {run['fps']:>8.1f} FPS", flush=True)
+
+    print(f"\n{'workers':>7} {'threads':>7} {'cores':>6} {'FPS':>8} {'FPS/core':>9}")
+    for run in sorted(runs, key=lambda r: r['fps'], reverse=True):
+        print(
+            f"{run['workers']:>7} {run['threads']:>7} {run['cores_used']:>6} "
+            f"{run['fps']:>8.1f} {run['fps'] / run['cores_used']:>9.2f}"
+        )
+
+    best = max(runs, key=lambda r: r['fps'])
+    print(
+        f"\nBest split: BATCH_PIPELINE_WORKERS={best['workers']} "
+        f"INFERENCE_THREADS_PER_WORKER={best['threads']}"
+    )
+
+
+if __name__ == '__main__':
+    main()
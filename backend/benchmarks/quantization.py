@@ -0,0 +1,160 @@
+"""
+Accuracy and speed of INT8 quantized models against FP32 on a labelled holdout.
+
+Each model is evaluated on its own holdout set in YOLO layout (images/*.jpg
+and labels/*.txt with "class cx cy w h" normalised rows). Predictions are
+matched to labels per image (same class, IoU >= --iou) and precision, recall
+and F1 are reported for every precision along with latency per frame and
+model size. The run fails if any INT8 variant loses more than --max-f1-drop
+F1 against FP32.
+
+Static quantization is (re)calibrated first when --calibration is given.
+
+Usage (from the backend directory):
+    python -m benchmarks.quantization --holdout pothole=datasets/pothole_holdout congestion=datasets/congestion_holdout \\
+        --calibration uploads/video/2025-11-28_14-42-00.mp4
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.core.config import QUANTIZATION_CALIBRATION_FRAMES
+from app.services.model_registry import MODEL_PATHS, ModelRegistry, export_model
+from app.services.quantization import (
+    MODEL_PRECISIONS, load_calibration_frames, quantize_onnx_model, quantized_model_path
+)
+from benchmarks.inference_backends import MODEL_CONFIDENCE, box_iou
+
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def load_holdout(directory: Path) -> list:
+    """
+    Load a YOLO-layout holdout set.
+
+    Returns:
+        List of (image, label xyxy in pixels, label class ids)
+    """
+    samples = []
+    for image_path in sorted((directory / "images").iterdir()):
+        if image_path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+
+        label_path = directory / "labels" / f"{image_path.stem}.txt"
+        rows = np.loadtxt(label_path, ndmin=2) if label_path.exists() else np.zeros((0, 5))
+        rows = rows.reshape(-1, 5)
+        cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        samples.append((image, xyxy, rows[:, 0].astype(int)))
+
+    return samples
+
+
+def count_matches(label_xyxy, label_cls, pred_xyxy, pred_cls, iou_threshold: float) -> int:
+    """Greedy same-class IoU matching; returns the number of true positives."""
+    if not len(label_cls) or not len(pred_cls):
+        return 0
+    iou = box_iou(label_xyxy, pred_xyxy)
+    iou[label_cls[:, None] != pred_cls[None, :]] = 0
+    matched = 0
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        matched += 1
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return matched
+
+
+def evaluate(name: str, precision: str, samples: list, iou_threshold: float) -> dict:
+    """Run one model variant over a holdout set and score it against the labels."""
+    registry = ModelRegistry(backend="onnx", precision=precision)
+    registry.warmup([name])
+    model = registry.get(name)
+
+    true_positives = predictions = labels = 0
+    elapsed = 0.0
+    for image, label_xyxy, label_cls in samples:
+        start = time.perf_counter()
+        result = model(image, device=registry.device, conf=MODEL_CONFIDENCE[name], verbose=False)[0]
+        elapsed += time.perf_counter() - start
+
+        pred_xyxy = result.boxes.xyxy.cpu().numpy().astype(np.float64)
+        pred_cls = result.boxes.cls.cpu().numpy().astype(int)
+        true_positives += count_matches(label_xyxy, label_cls, pred_xyxy, pred_cls, iou_threshold)
+        predictions += len(pred_cls)
+        labels += len(label_cls)
+
+    p = true_positives / predictions if predictions else 1.0
+    r = true_positives / labels if labels else 1.0
+    model_path = quantized_model_path(export_model(MODEL_PATHS[name], "onnx"), precision)
+    return {
+        'precision': p,
+        'recall': r,
+        'f1': 2 * p * r / (p + r) if p + r else 0.0,
+        'latency_ms': 1000 * elapsed / len(samples),
+        'size_mb': model_path.stat().st_size / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--holdout', nargs='+', required=True, metavar='MODEL=DIR',
+        help='Labelled holdout set per model, e.g. pothole=datasets/pothole_holdout'
+    )
+    parser.add_argument('--precisions', nargs='+', default=list(MODEL_PRECISIONS), choices=MODEL_PRECISIONS)
+    parser.add_argument('--calibration', nargs='+', type=Path, help='Videos to calibrate static INT8 on')
+    parser.add_argument('--calibration-frames', type=int, default=QUANTIZATION_CALIBRATION_FRAMES)
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU for a prediction to match a label')
+    parser.add_argument('--max-f1-drop', type=float, default=0.02, help='Largest allowed F1 loss vs FP32')
+    args = parser.parse_args()
+
+    holdouts = dict(item.split('=', 1) for item in args.holdout)
+    unknown = set(holdouts) - set(MODEL_PATHS)
+    if unknown:
+        print(f"Unknown models: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    if args.calibration and "int8-static" in args.precisions:
+        images = load_calibration_frames(args.calibration, args.calibration_frames)
+        for name in holdouts:
+            quantize_onnx_model(export_model(MODEL_PATHS[name], "onnx"), "int8-static", images, force=True)
+
+    precisions = list(dict.fromkeys(['fp32'] + args.precisions))
+    print(f"\n{'model':<11} {'precision':<13} {'P':>6} {'R':>6} {'F1':>6} {'dF1':>7} {'ms/frame':>9} {'speedup':>8} {'MB':>7}")
+    failed = False
+    for name, directory in holdouts.items():
+        samples = load_holdout(Path(directory))
+        if not samples:
+            print(f"{name}: no images in {directory}")
+            failed = True
+            continue
+
+        runs = {precision: evaluate(name, precision, samples, args.iou) for precision in precisions}
+        reference = runs['fp32']
+        for precision, run in runs.items():
+            f1_delta = run['f1'] - reference['f1']
+            failed |= -f1_delta > args.max_f1_drop
+            speedup = reference['latency_ms'] / run['latency_ms'] if run['latency_ms'] > 0 else 0.0
+            print(
+                f"{name:<11} {precision:<13} {run['precision']:>6.3f} {run['recall']:>6.3f} {run['f1']:>6.3f} "
+                f"{f1_delta:>+7.3f} {run['latency_ms']:>9.1f} {speedup:>7.2f}x {run['size_mb']:>7.1f}"
+            )
+
+    if failed:
+        print(f"\nFAIL: an INT8 variant lost more than {args.max_f1_drop:.3f} F1 against FP32")
+        sys.exit(1)
+    print("\nAll INT8 variants within the F1 threshold")
+
+
+if __name__ == '__main__':
+    main()
@@ -24,12 +24,20 @@ CREATE TABLE IF NOT EXISTS raw_uploads (
     gyro_max DOUBLE PRECISION,
     gyro_avg DOUBLE PRECISION,
     video_duration_seconds INTEGER,
-    extra_data JSONB
+    extra_data JSONB,
+    -- Video fingerprints used to recognise re-uploads: SHA-256 of the file,
+    -- and the S3 ETag (checked before downloading)
+    content_hash VARCHAR(128),
+    etag_fingerprint VARCHAR(128),
+    -- Set on duplicates: the upload whose events cover this video
+    duplicate_of UUID REFERENCES raw_uploads(upload_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_raw_uploads_status ON raw_uploads(processing_status);
 CREATE INDEX IF NOT EXISTS idx_raw_uploads_device ON raw_uploads(device_id);
 CREATE INDEX IF NOT EXISTS idx_raw_uploads_uploaded ON raw_uploads(uploaded_at);
+CREATE INDEX IF NOT EXISTS idx_raw_uploads_content_hash ON raw_uploads(content_hash);
+CREATE INDEX IF NOT EXISTS idx_raw_uploads_etag_fingerprint ON raw_uploads(etag_fingerprint);
 
 -- =====================================================
 -- Table 2: events
@@ -107,6 +115,9 @@ CREATE TABLE IF NOT EXISTS tile_aggregates (
     last_updated TIMESTAMP DEFAULT NOW(),
     last_event_at TIMESTAMP,
     
+    -- Last-N event window the aggregates are maintained from incrementally
+    window_state JSONB,
+    
     PRIMARY KEY (tile_id, window_type)
 );
 
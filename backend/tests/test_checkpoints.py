@@ -0,0 +1,117 @@
+"""
+Detection checkpoints: the JSON Lines format and resuming from it.
+"""
+import json
+
+from app.services.checkpoints import CHECKPOINT_VERSION, DetectionCheckpoint
+
+
+JOB = {'s3_key_video': 'videos/a.mp4', 'frames_per_second': 4, 'frame_dedup': [0.02, 8, 32]}
+
+
+def _process(checkpoint, frames, start=0, results=None):
+    """Feed frames to a checkpoint the way run_staged_detection does."""
+    congestion, pothole, times = results or ([], [], [])
+    for i in range(start, start + frames):
+        congestion.append({'vehicle_count': i})
+        pothole.append({'potholes': i % 2})
+        times.append(i / 4)
+        checkpoint.maybe_save(
+            congestion, pothole, times, last_source_index=i * 7,
+            counters={'frames_skipped_duplicate': i, 'frames_rejected_by_reason': {'dark': i // 2}}
+        )
+    return congestion, pothole, times
+
+
+def test_appends_one_record_per_save(tmp_path):
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 10)
+
+    lines = checkpoint.path.read_text().splitlines()
+    assert json.loads(lines[0]) == {'version': CHECKPOINT_VERSION, 'job': JOB}
+    # Saves after frames 3, 6 and 9, each holding only its new frames
+    assert [len(json.loads(line)['frame_times']) for line in lines[1:]] == [3, 3, 3]
+
+
+def test_resume_restores_results_and_gate_counts(tmp_path):
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 10)
+
+    resumed = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    state = resumed.load()
+
+    assert resumed.next_source_index == 8 * 7 + 1
+    assert state['frame_times'] == [i / 4 for i in range(9)]
+    assert [r['vehicle_count'] for r in state['congestion_results']] == list(range(9))
+    assert state['counters'] == {'frames_skipped_duplicate': 8, 'frames_rejected_by_reason': {'dark': 4}}
+
+    # Saving after a resume keeps appending to the same file
+    _process(resumed, 3, start=9, results=(
+        state['congestion_results'], state['pothole_results'], state['frame_times']
+    ))
+    state = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path).load()
+    assert state['frame_times'] == [i / 4 for i in range(12)]
+
+
+def test_partly_written_record_is_cut_off(tmp_path):
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 6)
+    complete_size = checkpoint.path.stat().st_size
+    with open(checkpoint.path, 'a') as f:
+        f.write('{"last_source_index": 99, "congestion_results": [{"vehic')
+
+    resumed = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    state = resumed.load()
+
+    assert len(state['frame_times']) == 6
+    assert checkpoint.path.stat().st_size == complete_size
+
+
+def test_complete_json_without_newline_is_cut_off(tmp_path):
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 6)
+    with open(checkpoint.path, 'rb+') as f:
+        f.seek(-1, 2)
+        f.truncate()
+
+    state = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path).load()
+
+    assert len(state['frame_times']) == 3
+
+
+def test_job_mismatch_is_ignored_and_overwritten(tmp_path):
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 6)
+
+    other_job = {**JOB, 'frame_dedup': None}
+    restarted = DetectionCheckpoint('u1', job=other_job, every=3, directory=tmp_path)
+    assert restarted.load() is None
+    assert restarted.next_source_index == 0
+
+    # The next save starts the file over with the new job
+    _process(restarted, 3)
+    lines = checkpoint.path.read_text().splitlines()
+    assert json.loads(lines[0])['job'] == other_job
+    assert len(lines) == 2
+
+
+def test_version_mismatch_is_ignored(tmp_path):
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 3)
+    lines = checkpoint.path.read_text().splitlines()
+    lines[0] = json.dumps({'version': CHECKPOINT_VERSION + 1, 'job': JOB})
+    checkpoint.path.write_text('\n'.join(lines) + '\n')
+
+    assert DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path).load() is None
+
+
+def test_disabled_and_cleared(tmp_path):
+    disabled = DetectionCheckpoint('u1', job=JOB, every=0, directory=tmp_path)
+    _process(disabled, 5)
+    assert not disabled.path.exists()
+
+    checkpoint = DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path)
+    _process(checkpoint, 3)
+    checkpoint.clear()
+    assert not checkpoint.path.exists()
+    assert DetectionCheckpoint('u1', job=JOB, every=3, directory=tmp_path).load() is None
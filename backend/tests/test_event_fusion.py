@@ -0,0 +1,103 @@
+"""
+Temporal-window fusion of per-frame events: which events join a run, and
+what the fused event keeps.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.event_fusion import fuse_events
+
+
+BASE = datetime(2026, 1, 1, 8, 0, 0)
+LAT, LON = 12.97, 77.59
+METRE_LAT = 1 / 111_195  # Degrees of latitude per metre
+
+
+def _event(seconds, event_type='congestion', metres=0.0, severity=50.0, confidence=0.5, **outputs):
+    return {
+        'event_id': f'{event_type}-{seconds}',
+        'event_type': event_type,
+        'detected_at': BASE + timedelta(seconds=seconds),
+        'lat': LAT + metres * METRE_LAT,
+        'lon': LON,
+        'severity': severity,
+        'confidence': confidence,
+        'model_outputs': {'frame_idx': int(seconds * 4), **outputs},
+        'frame_refs': [f'frame_{int(seconds * 4)}.jpg'],
+    }
+
+
+def _fuse(events):
+    return fuse_events(events, max_gap_s=3.0, max_distance_m=100.0, max_span_s=10.0)
+
+
+def test_gap_splits_runs():
+    fused = _fuse([_event(0), _event(2), _event(5), _event(8.5)])
+
+    # 0-5s with gaps of 2s and 3s, then a 3.5s gap
+    assert [event['model_outputs'].get('events_fused', 1) for event in fused] == [3, 1]
+
+
+def test_span_splits_runs():
+    fused = _fuse([_event(seconds) for seconds in range(0, 15, 2)])
+
+    # Every gap is 2s, but a run may last at most 10s from its first event
+    assert [event['model_outputs']['events_fused'] for event in fused] == [6, 2]
+    assert fused[1]['detected_at'] == BASE + timedelta(seconds=12)
+
+
+def test_distance_from_run_start_splits_runs():
+    fused = _fuse([_event(0, metres=0), _event(1, metres=60), _event(2, metres=95), _event(3, metres=120)])
+
+    # Measured from the first event, not the previous one
+    assert [event['model_outputs'].get('events_fused', 1) for event in fused] == [3, 1]
+
+
+def test_types_fuse_separately():
+    events = [_event(0), _event(1, 'pothole'), _event(2), _event(3, 'pothole')]
+    fused = _fuse(events)
+
+    assert sorted(event['event_type'] for event in fused) == ['congestion', 'pothole']
+    assert all(event['model_outputs']['events_fused'] == 2 for event in fused)
+
+
+def test_single_event_is_unchanged():
+    event = _event(0)
+    assert _fuse([event]) == [event]
+
+
+def test_fused_event_takes_peak_severity_and_confidence():
+    events = [
+        _event(0, severity=40, confidence=0.9, metres=0, vehicle_count=4, traffic_density_score=0.2),
+        _event(1, severity=80, confidence=0.6, metres=10, vehicle_count=10, traffic_density_score=0.7),
+        _event(2, severity=60, confidence=0.7, metres=20, vehicle_count=7, traffic_density_score=0.6),
+    ]
+    [fused] = _fuse(list(reversed(events)))  # Input order does not matter
+
+    # Placed at the most severe event, starting when the run started
+    assert fused['severity'] == 80
+    assert fused['lat'] == events[1]['lat']
+    assert fused['detected_at'] == BASE
+    # Highest confidence of the run, even from a less severe event
+    assert fused['confidence'] == 0.9
+    assert fused['event_id'] not in {event['event_id'] for event in events}
+
+    outputs = fused['model_outputs']
+    assert outputs['vehicle_count'] == 10
+    assert outputs['events_fused'] == 3
+    assert outputs['duration_s'] == 2.0
+    assert outputs['start_time'] == BASE.isoformat()
+    assert outputs['end_time'] == (BASE + timedelta(seconds=2)).isoformat()
+    assert outputs['peak'] == {'traffic_density_score': 0.7, 'vehicle_count': 10}
+    assert outputs['mean'] == {'traffic_density_score': pytest.approx(0.5), 'vehicle_count': pytest.approx(7)}
+    # Frame indices are not metrics
+    assert 'frame_idx' not in outputs['peak']
+    assert fused['frame_refs'] == ['frame_0.jpg', 'frame_4.jpg', 'frame_8.jpg']
+
+
+def test_metrics_missing_from_some_events_are_not_aggregated():
+    events = [_event(0, vehicle_count=3, total_pothole_size=0.1), _event(1, vehicle_count=5)]
+    [fused] = _fuse(events)
+
+    assert fused['model_outputs']['peak'] == {'vehicle_count': 5}
@@ -0,0 +1,78 @@
+"""
+Pre-inference frame gates on synthetic frames.
+"""
+import cv2
+import numpy as np
+
+from app.services.frame_filters import DuplicateFrameGate, FrameQualityGate
+
+
+def _flat(level, shape=(120, 160)):
+    return np.full(shape + (3,), level, dtype=np.uint8)
+
+
+def _textured(seed, shape=(120, 160), high=256):
+    return np.random.default_rng(seed).integers(0, high, shape + (3,), dtype=np.uint8)
+
+
+def test_identical_frames_reused_up_to_max_reuse():
+    gate = DuplicateFrameGate(threshold=0.02, max_reuse=3)
+    frame = _textured(0)
+
+    flags = [gate.is_duplicate(frame) for _ in range(9)]
+
+    # Inferred, reused 3 times, inferred again to refresh the results
+    assert flags == [False, True, True, True, False, True, True, True, False]
+    assert gate.skipped == 6
+
+
+def test_different_frame_is_inferred():
+    gate = DuplicateFrameGate(threshold=0.02, max_reuse=8)
+    assert not gate.is_duplicate(_textured(0))
+    assert not gate.is_duplicate(_textured(1))
+    assert gate.skipped == 0
+
+
+def test_slow_drift_adds_up():
+    # Each frame 2 levels (~0.008) brighter: below the threshold frame to
+    # frame, but compared to the last inferred frame the third one is not
+    gate = DuplicateFrameGate(threshold=0.02, max_reuse=8)
+    flags = [gate.is_duplicate(_flat(100 + 2 * i)) for i in range(7)]
+
+    assert flags == [False, True, True, False, True, True, False]
+
+
+def test_uniformly_dark_video_is_not_rejected():
+    # A night drive: every frame far darker than daylight, with many
+    # near-black pixels, but consistently so
+    gate = FrameQualityGate()
+    reasons = [gate.check(_textured(seed, high=50)) for seed in range(30)]
+
+    assert reasons == [None] * 30
+    assert gate.total_rejected == 0
+
+
+def test_bad_frames_rejected_relative_to_the_video():
+    gate = FrameQualityGate()
+    for seed in range(20):
+        assert gate.check(_textured(seed)) is None
+
+    black = _flat(2)
+    blurred = cv2.GaussianBlur(_textured(100), (0, 0), 8)
+    occluded = _textured(101)
+    occluded[:, :72] = 0  # Left 45% covered
+
+    assert gate.check(black) == 'dark'
+    assert gate.check(blurred) == 'blurred'
+    assert gate.check(occluded) == 'occluded'
+    assert gate.check(_textured(102)) is None
+    assert gate.rejected == {'dark': 1, 'occluded': 1, 'blurred': 1}
+
+
+def test_black_frame_rejected_in_dark_video():
+    gate = FrameQualityGate()
+    for seed in range(10):
+        gate.check(_textured(seed, high=50))
+
+    # Below min_brightness whatever the video looks like
+    assert gate.check(_flat(1)) == 'dark'
@@ -0,0 +1,93 @@
+"""
+Frame sampling strategies on a generated video whose frames differ in grey
+level, against decoding every frame in order. Skipped if this OpenCV build
+cannot write mp4v.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.frames import SAMPLING_STRATEGIES, VideoFrameSource
+
+
+FRAMES = 60
+VIDEO_FPS = 20
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    path = tmp_path_factory.mktemp("frames") / "levels.mp4"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), VIDEO_FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write mp4v")
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), 10 + 3 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.fixture(scope="module")
+def decoded(video):
+    """Every frame of the video, read in order."""
+    cap = cv2.VideoCapture(str(video))
+    frames = []
+    while True:
+        ret, image = cap.read()
+        if not ret:
+            return frames
+        frames.append(image)
+
+
+def _matches(frames, decoded):
+    return all(np.array_equal(frame.image, decoded[frame.source_index]) for frame in frames)
+
+
+def test_metadata(video):
+    source = VideoFrameSource(video, fps=4)
+    assert source.is_valid
+    assert source.video_fps == VIDEO_FPS
+    assert (source.width, source.height) == (64, 48)
+    assert source.frame_interval == 5
+    assert len(source) == FRAMES // 5
+
+
+@pytest.mark.parametrize("strategy", SAMPLING_STRATEGIES)
+def test_fixed_rate_decodes_the_sampled_frames(video, decoded, strategy):
+    frames = list(VideoFrameSource(video, fps=4, strategy=strategy, seek_min_gap=0))
+
+    assert [frame.source_index for frame in frames] == list(range(0, FRAMES, 5))
+    assert [frame.index for frame in frames] == list(range(len(frames)))
+    assert frames[1].timestamp == 5 / VIDEO_FPS
+    assert _matches(frames, decoded)
+
+
+@pytest.mark.parametrize("strategy", SAMPLING_STRATEGIES)
+def test_source_indices_and_start_index(video, decoded, strategy):
+    indices = [3, 4, 17, 40, 41, 59, 80]
+    frames = list(VideoFrameSource(video, strategy=strategy, source_indices=indices, seek_min_gap=0))
+    # Past the end of the video: iteration stops
+    assert [frame.source_index for frame in frames] == [3, 4, 17, 40, 41, 59]
+    assert _matches(frames, decoded)
+
+    # Resuming skips the indices before start_index
+    frames = list(VideoFrameSource(video, strategy=strategy, source_indices=indices, start_index=17, seek_min_gap=0))
+    assert [frame.source_index for frame in frames] == [17, 40, 41, 59]
+    assert _matches(frames, decoded)
+
+
+def test_resume_stays_on_the_fixed_rate_grid(video):
+    source = VideoFrameSource(video, fps=4, start_index=12)
+    assert [frame.source_index for frame in source] == list(range(15, FRAMES, 5))
+    assert len(source) == len(range(15, FRAMES, 5))
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        VideoFrameSource("missing.mp4", strategy="skip")
+
+
+def test_missing_video_yields_nothing(tmp_path):
+    source = VideoFrameSource(tmp_path / "missing.mp4")
+    assert not source.is_valid
+    assert list(source) == []
+    assert len(source) == 0
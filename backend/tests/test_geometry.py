@@ -0,0 +1,66 @@
+"""
+Union area of axis-aligned boxes by coordinate compression, against hand
+computed areas and a pixel count.
+"""
+import numpy as np
+import pytest
+
+from app.utils.geometry import coverage_by_label, rectangles_union_area
+
+
+def _pixel_union(xyxy, size):
+    """Union area of integer boxes by painting them on a grid."""
+    covered = np.zeros((size, size), dtype=bool)
+    for x1, y1, x2, y2 in xyxy:
+        covered[y1:y2, x1:x2] = True
+    return float(covered.sum())
+
+
+@pytest.mark.parametrize("boxes, area", [
+    ([], 0.0),
+    ([[0, 0, 10, 10]], 100.0),
+    # Overlapping: 100 + 100 - 25
+    ([[0, 0, 10, 10], [5, 5, 15, 15]], 175.0),
+    # Nested: the outer box only
+    ([[0, 0, 10, 10], [2, 2, 8, 8]], 100.0),
+    # Touching along an edge and at a corner: no overlap to subtract
+    ([[0, 0, 10, 10], [10, 0, 20, 10]], 200.0),
+    ([[0, 0, 10, 10], [10, 10, 20, 20]], 200.0),
+    # Duplicates count once
+    ([[0, 0, 10, 10], [0, 0, 10, 10]], 100.0),
+    # Zero width adds nothing
+    ([[0, 0, 10, 10], [20, 0, 20, 10]], 100.0),
+])
+def test_union_area(boxes, area):
+    assert rectangles_union_area(np.array(boxes, dtype=float)) == pytest.approx(area)
+
+
+def test_union_area_fractional_coordinates():
+    boxes = [[0.5, 0.5, 2.5, 1.5], [1.5, 0.0, 3.0, 1.0]]
+    # 2.0 + 1.5 - overlap 1.0 x 0.5
+    assert rectangles_union_area(boxes) == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_union_area_matches_pixel_count(seed):
+    rng = np.random.default_rng(seed)
+    corners = rng.integers(0, 40, size=(12, 2, 2))
+    xyxy = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+    assert rectangles_union_area(xyxy) == _pixel_union(xyxy, 40)
+
+
+def test_coverage_by_label():
+    boxes = [
+        [0, 0, 10, 10],   # car
+        [5, 0, 15, 10],   # car, overlaps the first
+        [10, 0, 20, 10],  # truck, touches the first and overlaps the second
+    ]
+    per_label, total = coverage_by_label(boxes, ["car", "car", "truck"], img_area=400.0)
+
+    assert per_label == {"car": pytest.approx(150 / 400), "truck": pytest.approx(100 / 400)}
+    assert total == pytest.approx(200 / 400)
+
+
+def test_coverage_by_label_empty():
+    assert coverage_by_label(np.zeros((0, 4)), [], img_area=100.0) == ({}, 0.0)
+    assert coverage_by_label([[0, 0, 1, 1]], [0], img_area=0) == ({}, 0.0)
@@ -0,0 +1,156 @@
+"""
+Model registry: export paths and caching, backend/precision selection, and
+torch against ONNX Runtime detections.
+
+ultralytics is replaced by a recording stand-in except in the parity test,
+which is skipped without ultralytics, onnxruntime, the weights or a sample
+video.
+"""
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from app.services.model_registry import ModelRegistry, export_model, exported_model_path
+
+
+class _FakeYOLO:
+    """Records loads and exports; an export writes an empty .onnx file."""
+
+    loaded = []
+    exported = []
+
+    def __init__(self, path, task=None):
+        self.path = path
+        _FakeYOLO.loaded.append(path)
+
+    def export(self, format, imgsz, dynamic):
+        _FakeYOLO.exported.append((self.path, format, imgsz, dynamic))
+        target = exported_model_path(self.path, format)
+        target.write_bytes(b"")
+        return str(target)
+
+
+@pytest.fixture
+def fake_ultralytics(monkeypatch):
+    _FakeYOLO.loaded, _FakeYOLO.exported = [], []
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=_FakeYOLO))
+    return _FakeYOLO
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / "best_Pothole.pt"
+    path.write_bytes(b"weights")
+    return path
+
+
+def test_exported_model_path(tmp_path):
+    weights_path = tmp_path / "best_Pothole.pt"
+    assert exported_model_path(weights_path, "torch") == weights_path
+    assert exported_model_path(weights_path, "onnx") == tmp_path / "best_Pothole.onnx"
+    assert exported_model_path(weights_path, "openvino") == tmp_path / "best_Pothole_openvino_model"
+    with pytest.raises(ValueError):
+        exported_model_path(weights_path, "tensorrt")
+
+
+def test_export_torch_is_the_weights(weights, fake_ultralytics):
+    assert export_model(weights, "torch") == weights
+    assert fake_ultralytics.exported == []
+
+
+def test_export_is_cached_until_weights_change(weights, fake_ultralytics):
+    target = export_model(weights, "onnx", imgsz=320)
+    assert target == weights.with_suffix(".onnx")
+    assert fake_ultralytics.exported == [(str(weights), "onnx", 320, True)]
+
+    # Export newer than the weights: reused
+    assert export_model(weights, "onnx", imgsz=320) == target
+    assert len(fake_ultralytics.exported) == 1
+
+    # Weights replaced after the export: exported again
+    os.utime(weights, (target.stat().st_mtime + 10, target.stat().st_mtime + 10))
+    export_model(weights, "onnx", imgsz=320)
+    assert len(fake_ultralytics.exported) == 2
+
+    export_model(weights, "onnx", imgsz=320, force=True)
+    assert len(fake_ultralytics.exported) == 3
+
+
+@pytest.mark.parametrize("backend, precision", [
+    ("tensorrt", "fp32"),
+    ("onnx", "fp8"),
+    ("torch", "int8-dynamic"),
+    ("openvino", "int8-static"),
+])
+def test_invalid_backend_or_precision(backend, precision):
+    with pytest.raises(ValueError):
+        ModelRegistry({}, backend=backend, precision=precision)
+
+
+def test_get_loads_each_model_once(weights, fake_ultralytics):
+    registry = ModelRegistry({"pothole": weights}, backend="onnx", precision="fp32")
+
+    assert not registry.is_loaded("pothole")
+    model = registry.get("pothole")
+    assert registry.get("pothole") is model
+    assert registry.is_loaded("pothole")
+    # Exported once, then loaded from the export rather than the .pt weights
+    assert len(fake_ultralytics.exported) == 1
+    assert fake_ultralytics.loaded[-1] == str(weights.with_suffix(".onnx"))
+    assert registry.device == "cpu"
+
+    with pytest.raises(KeyError):
+        registry.get("crack")
+
+
+def _confident_boxes(result, threshold):
+    boxes = result.boxes
+    keep = boxes.conf.cpu().numpy() >= threshold
+    return boxes.xyxy.cpu().numpy()[keep], boxes.cls.cpu().numpy()[keep]
+
+
+def _iou(box, boxes):
+    tl = np.maximum(box[:2], boxes[:, :2])
+    br = np.minimum(box[2:], boxes[:, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    return inter / np.maximum(np.prod(box[2:] - box[:2]) + areas - inter, 1e-9)
+
+
+def test_onnx_matches_torch(tmp_path):
+    pytest.importorskip("ultralytics")
+    pytest.importorskip("onnxruntime")
+    from app.core.config import POTHOLE_CONFIDENCE, POTHOLE_MODEL_PATH, VIDEO_DIR
+    from app.services.frames import VideoFrameSource
+
+    if not POTHOLE_MODEL_PATH.exists():
+        pytest.skip("model weights not available")
+    videos = sorted(VIDEO_DIR.glob("*.mp4"))
+    if not videos:
+        pytest.skip(f"no sample video in {VIDEO_DIR}")
+    frames = list(VideoFrameSource(videos[0]))
+    if not frames:
+        pytest.skip(f"could not decode {videos[0]}")
+    image = frames[len(frames) // 2].image
+
+    # Export next to a copy so the real weights directory is left alone
+    weights_copy = tmp_path / POTHOLE_MODEL_PATH.name
+    weights_copy.write_bytes(POTHOLE_MODEL_PATH.read_bytes())
+    torch_model = ModelRegistry({"pothole": weights_copy}, backend="torch").get("pothole")
+    onnx_model = ModelRegistry({"pothole": weights_copy}, backend="onnx").get("pothole")
+
+    # Boxes this far above the threshold must be found by both backends
+    threshold = POTHOLE_CONFIDENCE + 0.1
+    torch_boxes, torch_cls = _confident_boxes(torch_model(image, device="cpu", verbose=False)[0], threshold)
+    onnx_boxes, onnx_cls = _confident_boxes(onnx_model(image, device="cpu", verbose=False)[0], threshold)
+
+    for reference, reference_cls, candidate, candidate_cls in [
+        (torch_boxes, torch_cls, onnx_boxes, onnx_cls),
+        (onnx_boxes, onnx_cls, torch_boxes, torch_cls),
+    ]:
+        for box, class_id in zip(reference, reference_cls):
+            same_class = candidate[candidate_cls == class_id]
+            assert len(same_class) and _iou(box, same_class).max() >= 0.9
@@ -0,0 +1,190 @@
+"""
+INT8 quantization: which path a precision takes, caching, and the
+calibration data fed to static quantization.
+
+Tests that quantize need onnx and onnxruntime and are skipped without them;
+they run on a tiny two-block model shaped like an ultralytics export.
+"""
+import shutil
+import sys
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.quantization import (
+    _detect_head_nodes, load_calibration_frames, quantize_onnx_model, quantized_model_path
+)
+
+
+IMGSZ = 64
+
+
+def _write_video(path, frames, level=0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 10, (96, 54))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write mp4v")
+    for i in range(frames):
+        writer.write(np.full((54, 96, 3), level + i, dtype=np.uint8))
+    writer.release()
+
+
+def _tiny_export(path):
+    """Conv/Relu block /model.0/ and a Conv 'Detect head' /model.1/, with export metadata."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    w0 = numpy_helper.from_array(rng.normal(size=(4, 3, 3, 3)).astype(np.float32), "w0")
+    w1 = numpy_helper.from_array(rng.normal(size=(2, 4, 1, 1)).astype(np.float32), "w1")
+    nodes = [
+        helper.make_node("Conv", ["images", "w0"], ["c0"], name="/model.0/conv/Conv", pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["c0"], ["r0"], name="/model.0/act/Relu"),
+        helper.make_node("Conv", ["r0", "w1"], ["output0"], name="/model.1/conv/Conv"),
+    ]
+    graph = helper.make_graph(
+        nodes, "tiny",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, "height", "width"])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 2, "height", "width"])],
+        initializer=[w0, w1]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"names": "{0: 'pothole'}", "imgsz": f"[{IMGSZ}, {IMGSZ}]"})
+    onnx.save(model, str(path))
+    return path
+
+
+def test_quantized_model_path(tmp_path):
+    onnx_path = tmp_path / "best_Pothole.onnx"
+    assert quantized_model_path(onnx_path, "fp32") == onnx_path
+    assert quantized_model_path(onnx_path, "int8-dynamic") == tmp_path / "best_Pothole_int8_dynamic.onnx"
+    assert quantized_model_path(onnx_path, "int8-static") == tmp_path / "best_Pothole_int8_static.onnx"
+    with pytest.raises(ValueError):
+        quantized_model_path(onnx_path, "int4")
+
+
+def test_fp32_and_cached_variants_need_no_onnx(tmp_path, monkeypatch):
+    # Any import of onnx or onnxruntime would fail
+    monkeypatch.setitem(sys.modules, "onnx", None)
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)
+    onnx_path = tmp_path / "best_Pothole.onnx"
+    onnx_path.write_bytes(b"fp32")
+
+    assert quantize_onnx_model(onnx_path, "fp32") == onnx_path
+
+    cached = quantized_model_path(onnx_path, "int8-dynamic")
+    cached.write_bytes(b"int8")  # Written after the export: up to date
+    assert quantize_onnx_model(onnx_path, "int8-dynamic") == cached
+
+
+def test_detect_head_nodes():
+    names = ["/model.0/conv/Conv", "/model.22/dfl/conv/Conv", "/model.22/Concat_3", "/model.9/cv1/conv/Conv", "Identity"]
+    model = SimpleNamespace(graph=SimpleNamespace(node=[SimpleNamespace(name=name) for name in names]))
+
+    assert _detect_head_nodes(model) == ["/model.22/dfl/conv/Conv", "/model.22/Concat_3"]
+    assert _detect_head_nodes(SimpleNamespace(graph=SimpleNamespace(node=[]))) == []
+
+
+def test_calibration_frames_spread_over_videos(tmp_path):
+    _write_video(tmp_path / "a.mp4", 20, level=0)
+    _write_video(tmp_path / "b.mp4", 20, level=100)
+    (tmp_path / "notes.txt").write_text("not a video")
+
+    frames = load_calibration_frames(tmp_path, max_frames=6)
+
+    # 3 frames from each video, first to last
+    assert len(frames) == 6
+    means = [float(frame.mean()) for frame in frames]
+    assert means[:3] == sorted(means[:3]) and means[2] - means[0] > 10
+    assert all(mean < 50 for mean in means[:3]) and all(mean > 90 for mean in means[3:])
+
+    # Capped at max_frames even when the first video could supply them all
+    assert len(load_calibration_frames([tmp_path / "a.mp4", tmp_path / "b.mp4"], max_frames=5)) == 5
+
+
+@pytest.fixture
+def quantization_spy(monkeypatch):
+    """Replaces onnxruntime's quantizers with ones that record their call and copy the model."""
+    pytest.importorskip("onnx")
+    quantization = pytest.importorskip("onnxruntime.quantization")
+    calls = []
+
+    def quantize_dynamic(model_input, model_output, **kwargs):
+        calls.append(("dynamic", kwargs))
+        shutil.copy(model_input, model_output)
+
+    def quantize_static(model_input, model_output, calibration_data_reader, **kwargs):
+        batches = []
+        while (batch := calibration_data_reader.get_next()) is not None:
+            batches.append(batch)
+        calls.append(("static", {**kwargs, 'batches': batches}))
+        shutil.copy(model_input, model_output)
+
+    monkeypatch.setattr(quantization, "quantize_dynamic", quantize_dynamic)
+    monkeypatch.setattr(quantization, "quantize_static", quantize_static)
+    return calls
+
+
+def test_dynamic_path(tmp_path, quantization_spy):
+    onnx_path = _tiny_export(tmp_path / "best_Pothole.onnx")
+
+    target = quantize_onnx_model(onnx_path, "int8-dynamic")
+    assert target == quantized_model_path(onnx_path, "int8-dynamic")
+    assert [kind for kind, _ in quantization_spy] == ["dynamic"]
+
+    # Cached from now on, unless forced
+    quantize_onnx_model(onnx_path, "int8-dynamic")
+    quantize_onnx_model(onnx_path, "int8-dynamic", force=True)
+    assert [kind for kind, _ in quantization_spy] == ["dynamic", "dynamic"]
+
+
+def test_static_path_calibration_data(tmp_path, quantization_spy):
+    onnx_path = _tiny_export(tmp_path / "best_Pothole.onnx")
+    images = [np.full((54, 96, 3), level, dtype=np.uint8) for level in (0, 128, 255)]
+
+    quantize_onnx_model(onnx_path, "int8-static", calibration_images=images, imgsz=IMGSZ)
+
+    [(kind, kwargs)] = quantization_spy
+    assert kind == "static"
+    assert kwargs['nodes_to_exclude'] == ["/model.1/conv/Conv"]
+    # One letterboxed, normalised RGB batch of one per calibration frame
+    batches = kwargs['batches']
+    assert len(batches) == 3
+    for batch, image in zip(batches, images):
+        assert list(batch) == ["images"]
+        tensor = batch["images"]
+        assert tensor.dtype == np.float32
+        assert tensor.shape[:2] == (1, 3) and max(tensor.shape[2:]) == IMGSZ
+        assert tensor.shape[2] % 32 == 0 and tensor.shape[3] % 32 == 0
+        # The frame fills the full width; the rows at the centre are the frame
+        assert np.allclose(tensor[0, :, tensor.shape[2] // 2], image[0, 0, 0] / 255.0)
+
+
+def test_static_without_calibration_frames(tmp_path, quantization_spy):
+    onnx_path = _tiny_export(tmp_path / "best_Pothole.onnx")
+    with pytest.raises(ValueError):
+        quantize_onnx_model(onnx_path, "int8-static", calibration_images=[])
+    assert quantization_spy == []
+
+
+@pytest.mark.parametrize("precision", ["int8-dynamic", "int8-static"])
+def test_quantized_model_runs_and_keeps_metadata(tmp_path, precision):
+    onnx = pytest.importorskip("onnx")
+    ort = pytest.importorskip("onnxruntime")
+    onnx_path = _tiny_export(tmp_path / "best_Pothole.onnx")
+    rng = np.random.default_rng(1)
+    images = [rng.integers(0, 256, (54, 96, 3), dtype=np.uint8) for _ in range(4)]
+
+    target = quantize_onnx_model(onnx_path, precision, calibration_images=images, imgsz=IMGSZ)
+
+    metadata = {prop.key: prop.value for prop in onnx.load(str(target)).metadata_props}
+    assert metadata == {"names": "{0: 'pothole'}", "imgsz": f"[{IMGSZ}, {IMGSZ}]"}
+
+    session = ort.InferenceSession(str(target), providers=["CPUExecutionProvider"])
+    reference = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
+    batch = rng.random((1, 3, IMGSZ, IMGSZ), dtype=np.float32)
+    output = session.run(None, {"images": batch})[0]
+    expected = reference.run(None, {"images": batch})[0]
+    assert output.shape == expected.shape
@@ -0,0 +1,98 @@
+"""
+Velocity-adaptive sampling on synthetic CSV rows: resolving the velocity
+unit against GPS-derived speed, and the frames picked for a given speed.
+"""
+import numpy as np
+import pytest
+
+from app.services.sampling import road_speeds, velocity_adaptive_indices
+
+
+LAT, LON = 12.97, 77.59
+METRE_LAT = 1 / 111_195  # Degrees of latitude per metre
+DURATION = 60.0
+ROWS = 61
+VIDEO_FPS = 30.0
+TOTAL_FRAMES = int(DURATION * VIDEO_FPS)
+
+
+def _rows(speed_mps, csv_velocity=None):
+    """One CSV row per second of a drive north at a constant speed."""
+    step = DURATION / (ROWS - 1)
+    rows = []
+    for i in range(ROWS):
+        row = {'lat': LAT + i * step * speed_mps * METRE_LAT, 'lon': LON}
+        if csv_velocity is not None:
+            row['velocity'] = csv_velocity
+        rows.append(row)
+    return rows
+
+
+def _indices(rows, **kwargs):
+    kwargs = {'metres_per_frame': 5.0, 'min_fps': 0.5, 'max_fps': 4.0, **kwargs}
+    return velocity_adaptive_indices(rows, VIDEO_FPS, TOTAL_FRAMES, **kwargs)
+
+
+def test_auto_reads_metres_per_second():
+    speeds = road_speeds(_rows(10.0, csv_velocity=10.0), DURATION, unit='auto')
+    assert speeds == pytest.approx(np.full(ROWS, 10.0))
+
+
+def test_auto_reads_kilometres_per_hour():
+    speeds = road_speeds(_rows(10.0, csv_velocity=36.0), DURATION, unit='auto')
+    assert speeds == pytest.approx(np.full(ROWS, 10.0))
+
+
+def test_auto_without_velocity_uses_gps():
+    speeds = road_speeds(_rows(10.0), DURATION, unit='auto')
+    assert speeds == pytest.approx(np.full(ROWS, 10.0), rel=1e-3)
+
+
+def test_auto_when_barely_moving_keeps_csv_values():
+    # GPS shows no clear movement, so there is nothing to compare against
+    speeds = road_speeds(_rows(0.5, csv_velocity=1.8), DURATION, unit='auto')
+    assert speeds == pytest.approx(np.full(ROWS, 1.8))
+
+
+def test_explicit_unit():
+    rows = _rows(10.0, csv_velocity=36.0)
+    assert road_speeds(rows, DURATION, unit='km/h') == pytest.approx(np.full(ROWS, 10.0))
+    assert road_speeds(rows, DURATION, unit='m/s') == pytest.approx(np.full(ROWS, 36.0))
+    with pytest.raises(ValueError):
+        road_speeds(rows, DURATION, unit='mph')
+
+
+def test_frames_spaced_by_distance():
+    # 10 m/s at 5 m per frame: 2 sampled frames per second, 15 source frames apart
+    indices = _indices(_rows(10.0, csv_velocity=10.0))
+
+    assert len(indices) == pytest.approx(DURATION * 2, abs=1)
+    assert set(np.diff(indices)) == {15}
+
+
+def test_km_h_csv_samples_like_m_s():
+    assert _indices(_rows(10.0, csv_velocity=36.0)) == _indices(_rows(10.0, csv_velocity=10.0))
+
+
+def test_rate_clamped_to_min_and_max_fps():
+    stopped = _indices(_rows(0.0, csv_velocity=0.0))
+    assert set(np.diff(stopped)) == {60}  # min_fps 0.5
+
+    fast = _indices(_rows(40.0, csv_velocity=40.0))
+    assert len(fast) == pytest.approx(DURATION * 4, abs=1)  # max_fps 4, not 8
+
+
+def test_speeding_up_samples_more_often():
+    rows = _rows(0.0)
+    for i, row in enumerate(rows):
+        row['velocity'] = 2.0 if i < ROWS // 2 else 15.0
+
+    indices = np.array(_indices(rows))
+    first_half = (indices < TOTAL_FRAMES // 2).sum()
+    assert first_half < len(indices) - first_half
+
+
+def test_no_csv_or_no_video():
+    assert set(np.diff(_indices([]))) == {60}
+    assert velocity_adaptive_indices(_rows(10.0), 0.0, TOTAL_FRAMES) == []
+    assert velocity_adaptive_indices(_rows(10.0), VIDEO_FPS, 0) == []
@@ -0,0 +1,93 @@
+"""
+Shared letterbox preprocessing against per-model ultralytics preprocessing.
+
+Runs both detectors on a frame from the first sample video in VIDEO_DIR
+through _predict_shared and through _predict_batch (each model
+preprocessing the frame itself), and checks they find the same confident
+boxes. Skipped without torch, ultralytics, the weights or a sample video.
+"""
+import pytest
+
+import numpy as np
+
+pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+from app.core.config import (
+    CONGESTION_MODEL_PATH, POTHOLE_MODEL_PATH, VIDEO_DIR,
+    CONGESTION_CONFIDENCE, POTHOLE_CONFIDENCE
+)
+from app.services.frames import VideoFrameSource
+from app.services.road_roi import road_crop_offset
+from app.services.video_pipeline import _boxes_to_numpy, _predict_batch, _predict_shared
+
+
+# Boxes this far above the confidence threshold must be found by both paths
+CONFIDENCE_MARGIN = 0.15
+MIN_IOU = 0.7
+
+pytestmark = pytest.mark.skipif(
+    not (CONGESTION_MODEL_PATH.exists() and POTHOLE_MODEL_PATH.exists()),
+    reason="model weights not available"
+)
+
+
+@pytest.fixture(scope="module")
+def frame():
+    videos = sorted(VIDEO_DIR.glob("*.mp4"))
+    if not videos:
+        pytest.skip(f"no sample video in {VIDEO_DIR}")
+    source = VideoFrameSource(videos[0])
+    frames = list(source)
+    if not frames:
+        pytest.skip(f"could not decode {videos[0]}")
+    return frames[len(frames) // 2]
+
+
+def _boxes(result, letterbox=None, y_offset=0):
+    xyxy, class_ids, confidences = _boxes_to_numpy(result, letterbox)
+    xyxy[:, [1, 3]] += y_offset
+    return xyxy, class_ids, confidences
+
+
+def _iou(box, boxes):
+    tl = np.maximum(box[:2], boxes[:, :2])
+    br = np.minimum(box[2:], boxes[:, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+    area = np.prod(box[2:] - box[:2])
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def _unmatched(reference, candidate, min_confidence):
+    """Confident reference boxes without a same-class candidate box overlapping them."""
+    ref_xyxy, ref_cls, ref_conf = reference
+    cand_xyxy, cand_cls, _ = candidate
+    missing = []
+    for box, class_id, confidence in zip(ref_xyxy, ref_cls, ref_conf):
+        if confidence < min_confidence:
+            continue
+        same_class = cand_xyxy[cand_cls == class_id]
+        if not len(same_class) or _iou(box, same_class).max() < MIN_IOU:
+            missing.append((class_id, round(float(confidence), 3), box.round(1).tolist()))
+    return missing
+
+
+@pytest.mark.parametrize("roi_top", [0.0, 0.4])
+def test_shared_preprocess_matches_per_model(frame, roi_top):
+    congestion_raw, pothole_raw, congestion_lb, pothole_lb = _predict_shared([frame], roi_top)
+    shared_congestion = _boxes(congestion_raw[0], congestion_lb)
+    shared_pothole = _boxes(pothole_raw[0], pothole_lb)
+
+    reference_congestion = _boxes(_predict_batch("congestion", [frame], CONGESTION_CONFIDENCE)[0])
+    reference_pothole = _boxes(
+        _predict_batch("pothole", [frame], POTHOLE_CONFIDENCE, roi_top)[0],
+        y_offset=road_crop_offset(frame.height, roi_top)
+    )
+
+    for shared, reference, threshold in [
+        (shared_congestion, reference_congestion, CONGESTION_CONFIDENCE),
+        (shared_pothole, reference_pothole, POTHOLE_CONFIDENCE),
+    ]:
+        assert _unmatched(reference, shared, threshold + CONFIDENCE_MARGIN) == []
+        assert _unmatched(shared, reference, threshold + CONFIDENCE_MARGIN) == []
@@ -0,0 +1,153 @@
+"""
+Streaming S3 ingest: MP4 layout parsing, and decoding through a
+DownloadReader while ranged GETs arrive out of order.
+
+The S3 client is a stand-in serving an in-memory object; the video is
+written with cv2.VideoWriter, and the decode tests are skipped if this
+OpenCV build cannot write or stream-read MP4.
+"""
+import random
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.frames import VideoFrameSource
+from app.services.streaming import StreamingDownload, StreamingFrames, parse_mp4_layout
+
+
+CHUNK_SIZE = 512
+
+
+def _box(box_type, payload_size):
+    return struct.pack(">I4s", 8 + payload_size, box_type) + b"\0" * payload_size
+
+
+class _Body:
+    def __init__(self, data, delay):
+        self.data = data
+        self.delay = delay
+
+    def read(self):
+        time.sleep(self.delay)
+        return self.data
+
+
+class _FakeS3:
+    """Serves ranged GETs of one object, each after a random delay."""
+
+    def __init__(self, data, max_delay=0.02, fail_from=None, gate=None):
+        self.data = data
+        self.max_delay = max_delay
+        self.fail_from = fail_from
+        self.gate = gate or {}
+        self.rng = random.Random(0)
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.data)}
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = map(int, Range.split('=')[1].split('-'))
+        if start in self.gate:
+            self.gate[start].wait()
+        if self.fail_from is not None and start >= self.fail_from:
+            raise IOError(f"GET {Range} failed")
+        return {'Body': _Body(self.data[start:end + 1], self.rng.random() * self.max_delay)}
+
+
+def _download(client, tmp_path):
+    download = StreamingDownload(
+        client, 'bucket', 'videos/a.mp4', str(tmp_path / 'a.mp4'),
+        chunk_size=CHUNK_SIZE, workers=3
+    )
+    download.start()
+    return download
+
+
+def test_layout_faststart():
+    head = _box(b"ftyp", 16) + _box(b"moov", 100) + _box(b"mdat", 1000)
+    assert parse_mp4_layout(head[:200], len(head)) == (None, (24, 132))
+
+
+def test_layout_moov_at_end():
+    data = _box(b"ftyp", 16) + _box(b"mdat", 1000) + _box(b"moov", 100)
+    # Only the head is available: moov is taken to be everything after mdat
+    assert parse_mp4_layout(data[:64], len(data)) == (24, (1032, len(data)))
+
+
+def test_layout_64_bit_mdat_size():
+    mdat = struct.pack(">I4sQ", 1, b"mdat", 16 + 5000) + b"\0" * 48
+    head = _box(b"ftyp", 16) + mdat
+    assert parse_mp4_layout(head, 24 + 5016 + 300) == (24, (5040, 5340))
+
+
+def test_layout_unknown():
+    # mdat running to the end of the file (size 0): no moov to be found
+    head = _box(b"ftyp", 16) + struct.pack(">I4s", 0, b"mdat")
+    assert parse_mp4_layout(head, 10_000) == (24, None)
+    # Too short for a box header
+    assert parse_mp4_layout(b"\0\0\0", 10_000) == (None, None)
+
+
+def test_reader_blocks_until_chunk_is_downloaded(tmp_path):
+    data = bytes(range(256)) * 16
+    released = threading.Event()
+    download = _download(_FakeS3(data, max_delay=0, gate={2 * CHUNK_SIZE: released}), tmp_path)
+    reader = download.open_stream()
+    reader.seek(CHUNK_SIZE + 100)
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(data=reader.read(CHUNK_SIZE)))
+    thread.start()
+    thread.join(timeout=0.3)
+    assert thread.is_alive()  # Waiting on the gated chunk
+
+    released.set()
+    thread.join(timeout=5)
+    assert result['data'] == data[CHUNK_SIZE + 100:2 * CHUNK_SIZE + 100]
+    assert reader.tell() == 2 * CHUNK_SIZE + 100
+    reader.seek(-10, 2)
+    assert reader.read() == data[-10:]
+    download.cancel()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'source.mp4'
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 10, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write mp4v")
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        writer.write(rng.integers(0, 255, (48, 64, 3), dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_streamed_decode_matches_local_file(video, tmp_path):
+    data = video.read_bytes()
+    reference = [frame.image for frame in VideoFrameSource(video, fps=5)]
+    download = _download(_FakeS3(data), tmp_path)
+
+    source = VideoFrameSource(download, fps=5)
+    if not source.is_valid:
+        pytest.skip("OpenCV cannot decode from a Python stream")
+    frames = StreamingFrames(source, download)
+    decoded = [frame.image for frame in frames]
+
+    assert len(decoded) == len(reference) > 0
+    assert all(np.array_equal(a, b) for a, b in zip(decoded, reference))
+    assert frames.decode_started_at is not None
+    assert download.complete
+
+
+def test_failed_download_raises(video, tmp_path):
+    data = video.read_bytes()
+    download = _download(_FakeS3(data, fail_from=len(data) // 2), tmp_path)
+
+    with pytest.raises(IOError):
+        list(StreamingFrames(VideoFrameSource(download, fps=5), download))
+    download.cancel()
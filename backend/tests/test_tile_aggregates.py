@@ -0,0 +1,194 @@
+"""
+Tile windows: incremental maintenance against a rebuild from the events.
+
+A rebuild takes a tile's last N events ordered by detection time, then event
+id (see rebuild_tile_aggregates); _rebuilt does the same in Python.
+"""
+import asyncio
+import math
+import random
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.tile_aggregates import TileWindow, load_tile_windows, window_entry
+
+
+TILE = 'T_100_200'
+BASE = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def _entry(event_type='pothole', seconds=0, severity=50.0, confidence=0.5, event_id=None, **outputs):
+    return window_entry(
+        event_id or str(uuid.uuid4()), event_type, BASE + timedelta(seconds=seconds),
+        severity, confidence, outputs
+    )
+
+
+def _random_entry(rng):
+    event_type = rng.choice(['pothole', 'congestion', 'crack'])
+    return _entry(
+        event_type,
+        seconds=rng.randint(0, 5),  # Few distinct times: many ties
+        severity=rng.uniform(0, 100),
+        confidence=rng.random(),
+        event_id=str(uuid.UUID(int=rng.getrandbits(128))),
+        total_pothole_size=rng.random(),
+        vehicle_count=rng.randint(0, 12),
+        traffic_density_score=rng.random()
+    )
+
+
+def _rebuilt(events, size):
+    last_n = sorted(events, key=lambda e: (e['detected_at'], e['event_id']), reverse=True)[:size]
+    return TileWindow(TILE, last_n, size=size)
+
+
+def _assert_same_aggregate(a, b):
+    first, second = a.aggregate(), b.aggregate()
+    assert first.keys() == second.keys()
+    for key, value in first.items():
+        if isinstance(value, float):
+            assert math.isclose(value, second[key], abs_tol=1e-9), key
+        else:
+            assert value == second[key], key
+
+
+def test_window_entry_keeps_fields_for_its_type():
+    pothole = _entry('pothole', total_pothole_size=0.2, vehicle_count=4)
+    congestion = _entry('congestion', traffic_density_score=0.7, vehicle_count=4, total_pothole_size=0.2)
+
+    assert pothole['pothole_size'] == 0.2
+    assert pothole['vehicle_count'] is None
+    assert congestion['vehicle_count'] == 4.0
+    assert congestion['congestion_score'] == 0.7
+    assert congestion['pothole_size'] is None
+    # Booleans are not numbers here
+    assert _entry('pothole', total_pothole_size=True)['pothole_size'] is None
+
+
+def test_push_evicts_oldest_at_size():
+    window = TileWindow(TILE, size=3)
+    entries = [_entry(seconds=i) for i in range(5)]
+    for entry in entries:
+        assert window.push(entry)
+
+    assert [e['event_id'] for e in window.entries] == [e['event_id'] for e in entries[2:]]
+    # Older than the whole full window: ignored
+    assert not window.push(_entry(seconds=-1))
+    assert len(window.entries) == 3
+
+
+def test_push_out_of_order_keeps_window_sorted():
+    window = TileWindow(TILE, size=4)
+    for seconds in [5, 1, 3, 4, 2]:
+        window.push(_entry(seconds=seconds))
+
+    assert [(e['detected_at'] - BASE).seconds for e in window.entries] == [2, 3, 4, 5]
+
+
+def test_ties_break_on_event_id():
+    window = TileWindow(TILE, size=2)
+    ids = ['00000000-0000-0000-0000-00000000000%d' % i for i in (3, 1, 2)]
+    for event_id in ids:
+        window.push(_entry(seconds=0, event_id=event_id))
+
+    # Same detection time: the highest ids are the newest
+    assert [e['event_id'] for e in window.entries] == [ids[2], ids[0]]
+    # A tie with the oldest entry that orders after it still gets in
+    assert window.push(_entry(seconds=0, event_id='00000000-0000-0000-0000-000000000004'))
+    assert [e['event_id'][-1] for e in window.entries] == ['3', '4']
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_matches_rebuild_with_ties(seed):
+    rng = random.Random(seed)
+    size = 5
+    events = []
+    window = TileWindow(TILE, size=size)
+    for _ in range(60):
+        entry = _random_entry(rng)
+        events.append(entry)
+        window.push(entry)
+
+        rebuilt = _rebuilt(events, size)
+        assert [e['event_id'] for e in window.entries] == [e['event_id'] for e in rebuilt.entries]
+        _assert_same_aggregate(window, rebuilt)
+
+
+def test_aggregate_from_window():
+    window = TileWindow(TILE, size=3)
+    window.push(_entry('pothole', 0, severity=80, confidence=0.9, total_pothole_size=0.3))
+    window.push(_entry('congestion', 1, severity=40, confidence=0.5, traffic_density_score=0.6, vehicle_count=6))
+    window.push(_entry('pothole', 2, severity=20, confidence=0.7, total_pothole_size=0.1))
+
+    aggregate = window.aggregate()
+    assert aggregate['tile_id'] == TILE
+    assert aggregate['total_events'] == 3
+    assert aggregate['pothole_count'] == 2
+    assert aggregate['congestion_count'] == 1
+    assert aggregate['crack_count'] == 0
+    assert aggregate['avg_severity'] == pytest.approx(140 / 3)
+    assert aggregate['max_severity'] == 80
+    assert aggregate['avg_confidence'] == pytest.approx(0.7)
+    assert aggregate['avg_congestion_score'] == pytest.approx(0.6)
+    assert aggregate['avg_vehicle_count'] == pytest.approx(6)
+    assert aggregate['max_vehicle_count'] == 6
+    assert aggregate['avg_pothole_size'] == pytest.approx(0.2)
+    assert aggregate['max_pothole_size'] == pytest.approx(0.3)
+    assert aggregate['last_event_at'] == (BASE + timedelta(seconds=2)).isoformat()
+
+    # Evicting the maximum rescans the rest of the window
+    window.push(_entry('crack', 3, severity=10, confidence=0.1))
+    aggregate = window.aggregate()
+    assert aggregate['max_severity'] == 40
+    assert aggregate['max_pothole_size'] == pytest.approx(0.1)
+    assert aggregate['crack_count'] == 1
+
+
+def test_state_round_trip():
+    rng = random.Random(1)
+    window = TileWindow(TILE)
+    for _ in range(30):
+        window.push(_random_entry(rng))
+
+    restored = TileWindow.from_state(TILE, window.to_state())
+    assert restored.entries == window.entries
+    _assert_same_aggregate(restored, window)
+
+
+class _RecordingSession:
+    """Stands in for an AsyncSession, returning stored window_state rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        rows = self.rows if 'window_state' in str(statement) else []
+        return SimpleNamespace(fetchall=lambda: rows)
+
+
+def test_load_tile_windows_locks_in_order_without_writing():
+    stored = TileWindow('T_1_1')
+    stored.push(_entry(seconds=0))
+    session = _RecordingSession([
+        SimpleNamespace(tile_id='T_1_1', window_state=stored.to_state()),
+        SimpleNamespace(tile_id='T_1_3', window_state=None),
+    ])
+
+    windows = asyncio.run(load_tile_windows(['T_1_3', 'T_1_2', 'T_1_1', 'T_1_2'], session))
+
+    lock_sql, lock_params = session.statements[0]
+    assert 'pg_advisory_xact_lock' in lock_sql
+    assert lock_params['tile_ids'] == ['T_1_1', 'T_1_2', 'T_1_3']
+    assert not any('INSERT' in sql.upper() for sql, _ in session.statements)
+
+    assert windows['T_1_1'].entries == stored.entries
+    # No aggregate row yet: an empty window, not written until saved
+    assert windows['T_1_2'].entries == []
+    # Row from before window_state: needs a rebuild
+    assert windows['T_1_3'] is None
@@ -0,0 +1,78 @@
+"""
+Tracking over sensor-triggered pothole schedules.
+
+Frames are scheduled the way run_staged_detection does it: a frame the
+schedule skips gets an empty, non-inferred pothole result.
+
+Run from backend/:
+    python -m pytest tests
+"""
+from app.services.sampling import SensorTriggeredSchedule
+from app.services.tracking import track_detections
+from app.services.video_pipeline import _empty_pothole_result
+
+
+FPS = 4.0
+
+
+def _pothole(bbox):
+    result = _empty_pothole_result()
+    result["potholes"] = 1
+    result["detections"].append({'class': 'pothole', 'confidence': 0.8, 'bbox': bbox, 'size': 0.01})
+    return result
+
+
+def _scheduled_results(schedule, duration, visible):
+    """
+    Pothole results per sampled frame for one pothole that is in view during
+    each `visible` (start, end) interval in seconds, drifting slowly down the
+    image.
+    """
+    results = []
+    for frame_idx in range(int(duration * FPS)):
+        timestamp = frame_idx / FPS
+        if not schedule(timestamp):
+            results.append(_empty_pothole_result(inferred=False))
+        elif any(start <= timestamp <= end for start, end in visible):
+            results.append(_pothole([100.0, 300.0 + frame_idx, 160.0, 340.0 + frame_idx]))
+        else:
+            results.append(_empty_pothole_result())
+    return results
+
+
+def test_sparse_schedule_keeps_one_track():
+    # 1 inferred frame per second at 4 FPS: 3 skipped frames between inferred
+    # ones, more than TRACK_MAX_GAP_FRAMES, must not split the track
+    schedule = SensorTriggeredSchedule(windows=[], sparse_fps=1.0)
+    results = _scheduled_results(schedule, duration=20.0, visible=[(3.0, 15.0)])
+
+    tracks = track_detections(results, max_gap=2)
+
+    assert len(tracks) == 1
+    assert tracks[0].first_frame_idx == 12
+    assert tracks[0].last_frame_idx == 60
+    assert tracks[0].frames_seen == 13
+
+
+def test_dense_window_and_sparse_frames_join():
+    # The pothole is seen densely inside a trigger window and sparsely after it
+    schedule = SensorTriggeredSchedule(windows=[(2.0, 6.0)], sparse_fps=1.0)
+    results = _scheduled_results(schedule, duration=12.0, visible=[(3.0, 9.0)])
+
+    tracks = track_detections(results, max_gap=2)
+
+    # Every frame from 3.0s to 6.0s, then 6.25s (first frame of the next
+    # sparse second), 7s, 8s and 9s
+    assert len(tracks) == 1
+    assert tracks[0].frames_seen == 13 + 4
+
+
+def test_track_closes_after_inferred_misses():
+    # Missed by the 4 inferred frames at 5-8s, more than max_gap: two tracks
+    schedule = SensorTriggeredSchedule(windows=[], sparse_fps=1.0)
+    results = _scheduled_results(schedule, duration=15.0, visible=[(0.0, 4.0), (9.0, 13.0)])
+
+    tracks = track_detections(results, max_gap=2)
+
+    assert len(tracks) == 2
+    assert [track.frames_seen for track in tracks] == [5, 5]